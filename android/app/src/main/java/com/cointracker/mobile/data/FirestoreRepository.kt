@@ -439,9 +439,9 @@ class FirestoreRepository @Inject constructor() {
         "expense_categories" to settings.expenseCategories
     )
 
+    // previousBalance is derived by recalcBalances after every read, so it isn't stored.
     private fun transactionToMap(tx: Transaction): Map<String, Any> = mapOf(
-        "id" to tx.id, "date" to tx.date, "amount" to tx.amount,
-        "source" to tx.source, "previous_balance" to tx.previousBalance
+        "id" to tx.id, "date" to tx.date, "amount" to tx.amount, "source" to tx.source
     )
 
     private fun recalcBalances(transactions: List<Transaction>): List<Transaction> {
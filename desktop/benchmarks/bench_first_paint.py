@@ -0,0 +1,90 @@
+"""Time from process start to the main window's first paint.
+
+Run from desktop/:  python benchmarks/bench_first_paint.py [--runs 5] [--latency-ms 100]
+
+Each run starts a fresh Python process that builds MainWindow, shows it and exits
+on the first paint event. The report shows when `coin_tracker` finished importing,
+when MainWindow() returned and when the window first painted. Runs use the
+in-memory Firestore (FIRESTORE_BACKEND=memory) with `--latency-ms` per round trip,
+so the cost of blocking cloud reads before the first paint shows up, and a
+throwaway HOME so no real profile is touched.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+DESKTOP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import json, os, sys, time
+started = float(os.environ['BENCH_STARTED'])
+from PyQt5.QtCore import QEvent, QObject
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv)
+import coin_tracker
+imported = time.time()
+window = coin_tracker.MainWindow()
+constructed = time.time()
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            timings = {'import': imported - started, 'constructed': constructed - started,
+                       'first_paint': time.time() - started}
+            with open(os.environ['BENCH_RESULT'], 'w') as f:
+                json.dump(timings, f)
+            os._exit(0)
+        return False
+
+first_paint = FirstPaint()
+window.installEventFilter(first_paint)
+window.show()
+app.exec_()
+'''
+
+
+def run_once(args, env):
+    with tempfile.TemporaryDirectory() as home:
+        result_file = os.path.join(home, 'first_paint.json')
+        env = dict(env, HOME=home, USERPROFILE=home, BENCH_RESULT=result_file, BENCH_STARTED=repr(time.time()))
+        result = subprocess.run([sys.executable, '-c', CHILD], cwd=DESKTOP_DIR, env=env,
+                                capture_output=True, text=True, timeout=args.timeout)
+        if not os.path.exists(result_file):
+            raise RuntimeError(f"No paint reported:\n{result.stdout}\n{result.stderr}")
+        with open(result_file) as f:
+            return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--latency-ms', type=float, default=100.0, help='simulated Firestore round trip')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='extra environment for the app (repeatable)')
+    parser.add_argument('--timeout', type=float, default=60.0, help='seconds to wait for each run')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('FIRESTORE_BACKEND', 'memory')
+    env['FIRESTORE_FAKE_LATENCY_MS'] = str(args.latency_ms)
+    for item in args.env:
+        key, _, value = item.partition('=')
+        env[key] = value
+
+    runs = [run_once(args, env) for _ in range(args.runs)]
+
+    print(f"FIRESTORE_BACKEND={env['FIRESTORE_BACKEND']}, {args.latency_ms:g} ms round trips, "
+          f"{args.runs} runs (median / max ms)")
+    for name, label in (('import', 'coin_tracker imported'), ('constructed', 'MainWindow() returned'),
+                        ('first_paint', 'first paint')):
+        values = [run[name] * 1000 for run in runs]
+        print(f"  {label:<24} {statistics.median(values):>9.1f} {max(values):>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Time to refresh the History page for a large profile.
+
+Run from desktop/:  python benchmarks/bench_history.py [--rows 50000] [--runs 5]
+
+Seeds a throwaway profile with `--rows` transactions spread over two years (offline,
+in a temporary home directory), opens the window on the History page, and times
+filter_history (waiting for it if it filters in the background) plus the repaint
+that follows, for a few typical filters and for typing a search one key at a time.
+"first" is a fresh filter; repeats of the same one reuse the previous matches.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+DESKTOP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = ['Login', 'Ads', 'Daily Games', 'Event Reward', 'Campaign Reward', 'Box Draw (Single Spin)', 'Shop']
+
+
+def seed(store, rows):
+    start = datetime.now() - timedelta(days=730)
+    transactions = []
+    for i in range(rows):
+        source = random.choice(SOURCES)
+        amount = -random.randint(10, 900) if source.startswith(('Box', 'Shop')) else random.randint(5, 100)
+        date = start + timedelta(seconds=i * 730 * 86400 // rows)
+        transactions.append({'id': str(uuid.uuid4()), 'date': date.isoformat(), 'amount': amount, 'source': source})
+    store.save_profile('Default', transactions, {}, datetime.now().isoformat(), schema_version=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    home = tempfile.mkdtemp()
+    os.environ.update(HOME=home, USERPROFILE=home, FIRESTORE_BACKEND='none',
+                      QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    sys.path.insert(0, DESKTOP_DIR)
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication(sys.argv)
+    import coin_tracker
+    from local_store import local_store
+
+    random.seed(1)
+    seed(local_store(), args.rows)
+    window = coin_tracker.MainWindow()
+    window.show()
+    window.show_history()
+    app.processEvents()
+
+    def everything():
+        window.date_from.setDate(window.date_from.date().addYears(-5))
+
+    def one_source():
+        window.history_source_filter.setCurrentText('Ads')
+
+    def search():
+        window.history_source_filter.setCurrentIndex(0)
+        window.history_search.setText('10')
+
+    def last_month():
+        window.history_search.clear()
+        window.date_from.setDate(window.date_to.date().addMonths(-1))
+
+    def timed_filter():
+        started = time.perf_counter()
+        window.filter_history()
+        # Long scans finish on a background thread.
+        while window.period_summary.text() == "Filtering…":
+            app.processEvents()
+            time.sleep(0.001)
+        window.history_table.viewport().repaint()
+        app.processEvents()
+        return (time.perf_counter() - started) * 1000
+
+    print(f"{args.rows:,} transactions, {args.runs} runs (first / median of repeats, ms)")
+    for name, apply in (('all dates', everything), ('one source', one_source),
+                        ('search "10"', search), ('last month', last_month)):
+        apply()
+        timings = [timed_filter() for _ in range(args.runs)]
+        print(f"  {name:<16} {window.history_model.result_count():>7} matches  "
+              f"{timings[0]:8.1f}  {statistics.median(timings[1:] or timings):8.1f}")
+
+    everything()
+    timed_filter()
+    for text in ('a', 'ad', 'ads'):
+        window.history_search.setText(text)
+        elapsed = timed_filter()
+        print(f"  typed {text!r:<10} {window.history_model.result_count():>7} matches  {elapsed:8.1f}")
+    window.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Import-time profile of `coin_tracker` (python -X importtime).
+
+Run from desktop/:  python benchmarks/bench_imports.py [--runs 5] [--top 15] [--max-ms 400]
+
+Reports the median time to import coin_tracker over fresh processes, and the slowest
+modules by cumulative import time from the median run. Exits non-zero if a module that
+should load lazily (Firebase, grpc, google-cloud, QtChart) is imported at start-up, or
+if `--max-ms` is given and the import takes longer.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+DESKTOP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on demand: Firebase when cloud sync starts, QtChart on the first Analytics visit.
+DEFERRED = ('firebase_admin', 'grpc', 'google.cloud', 'PyQt5.QtChart')
+
+
+def profile_once():
+    """Returns {module: (self_us, cumulative_us)} for one fresh `import coin_tracker`."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import coin_tracker'],
+                            cwd=DESKTOP_DIR, capture_output=True, text=True,
+                            env=dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen')))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='slowest modules to list')
+    parser.add_argument('--max-ms', type=float, help='fail if importing coin_tracker takes longer')
+    args = parser.parse_args()
+
+    runs = sorted((profile_once() for _ in range(args.runs)), key=lambda m: m['coin_tracker'][1])
+    median = runs[len(runs) // 2]
+    total_ms = statistics.median(run['coin_tracker'][1] for run in runs) / 1000
+
+    print(f"import coin_tracker: {total_ms:.1f} ms median over {args.runs} runs")
+    print(f"  {'module':<40} {'self ms':>9} {'cumul. ms':>10}")
+    slowest = sorted(median.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    for name, (self_us, cumulative_us) in slowest:
+        print(f"  {name:<40} {self_us / 1000:>9.1f} {cumulative_us / 1000:>10.1f}")
+
+    failures = [name for name in median if any(name == d or name.startswith(d + '.') for d in DEFERRED)]
+    if failures:
+        print(f"\nImported at start-up but should be deferred: {', '.join(sorted(failures))}")
+    if args.max_ms is not None and total_ms > args.max_ms:
+        print(f"\nImport took {total_ms:.1f} ms, over the {args.max_ms:g} ms budget")
+    if failures or (args.max_ms is not None and total_ms > args.max_ms):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
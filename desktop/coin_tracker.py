@@ -1,41 +1,139 @@
 import sys
+import copy
+import importlib.util
 import json
 import os
+import threading
 import uuid
 from datetime import datetime, date, timedelta
-from collections import defaultdict
+from collections import Counter, defaultdict
 
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QLabel, QPushButton, QLineEdit, QComboBox, QTableWidget,
+    QLabel, QPushButton, QLineEdit, QComboBox, QTableWidget, QTableView, QAbstractItemView,
     QTableWidgetItem, QHeaderView, QMessageBox, QFrame, QFileDialog,
-    QInputDialog, QDialog, QTabWidget, QDateEdit, QProgressBar,
+    QInputDialog, QDialog, QTabWidget, QDateEdit, QDateTimeEdit, QProgressBar,
     QStackedWidget, QGridLayout, QScrollArea, QMenu, QGraphicsOpacityEffect,
     QDialogButtonBox # Added for QuickActionsDialog
 )
-from PyQt5.QtCore import Qt, QSize, QDate, QDateTime, QTimer, QPropertyAnimation, QRect, QEasingCurve
+from PyQt5.QtCore import Qt, QSize, QDate, QDateTime, QTimer, QPropertyAnimation, QRect, QEasingCurve, pyqtSignal
 from PyQt5.QtGui import QFont, QColor, QIcon, QPixmap, QIntValidator, QPainter, QPen, QBrush, QRadialGradient
 
-# Charts
-try:
-    from PyQt5.QtChart import (
-        QChart, QChartView, QPieSeries, QBarSeries, QBarSet,
-        QBarCategoryAxis, QValueAxis, QPieSlice, QLineSeries, QDateTimeAxis
-    )
-    QTCHART_AVAILABLE = True
-except ImportError:
-    QTCHART_AVAILABLE = False
+# Heavy optional modules are only located here; they are imported on first use.
+# Charts: load_qtchart(), on the first visit to the Analytics page
+QTCHART_AVAILABLE = importlib.util.find_spec('PyQt5.QtChart') is not None
+QtChart = None
+if not QTCHART_AVAILABLE:
     print("QtCharts not available - charts will be disabled")
 
-# Firebase
-try:
-    import firebase_admin
-    from firebase_admin import credentials, firestore
-    FIREBASE_AVAILABLE = True
-except ImportError:
-    FIREBASE_AVAILABLE = False
+# Firebase: load_firebase(), when cloud sync starts (firebase_admin pulls in grpc and google-cloud)
+FIREBASE_AVAILABLE = importlib.util.find_spec('firebase_admin') is not None
+firebase_admin = credentials = firestore = None
+_firebase_lock = threading.Lock()
+if not FIREBASE_AVAILABLE:
     print("Firebase not available - using local storage only")
 
+
+def load_qtchart():
+    """Imports PyQt5.QtChart into the module global `QtChart`; returns False if PyQtChart is missing."""
+    global QTCHART_AVAILABLE, QtChart
+    if QTCHART_AVAILABLE and QtChart is None:
+        try:
+            from PyQt5 import QtChart
+        except ImportError:
+            QTCHART_AVAILABLE = False
+            print("QtCharts not available - charts will be disabled")
+    return QTCHART_AVAILABLE
+
+
+def load_firebase():
+    global FIREBASE_AVAILABLE, firebase_admin, credentials, firestore
+    if FIREBASE_AVAILABLE and firebase_admin is None:
+        try:
+            import firebase_admin as admin
+            from firebase_admin import credentials as creds, firestore as store
+        except ImportError as e:
+            FIREBASE_AVAILABLE = False
+            print(f"Firebase not available - using local storage only ({e})")
+        else:
+            firebase_admin, credentials, firestore = admin, creds, store
+    return FIREBASE_AVAILABLE
+
+
+import fake_firestore
+import sync
+from local_store import local_store
+import history_model
+from history_model import HistoryModel
+from persistence import PersistenceWorker
+from profile_pool import TrackerPool
+from range_index import RangeIndex
+
+# FIRESTORE_BACKEND=memory swaps in the in-process fake so the Firestore code paths
+# can be exercised without a key or network access.
+FIRESTORE_BACKEND = os.environ.get('FIRESTORE_BACKEND', 'firebase')
+_memory_db = None
+
+def firestore_client():
+    """Returns the configured Firestore client, or None when running on local storage.
+
+    Doesn't import or initialize Firebase itself; until connect_firestore() has run
+    the real backend reports None.
+    """
+    global _memory_db
+    if FIRESTORE_BACKEND == 'memory':
+        if _memory_db is None:
+            _memory_db = fake_firestore.from_environment()
+            print("🧪 Using in-memory Firestore (data is lost on exit)")
+        return _memory_db
+    if firebase_admin is not None and firebase_admin._apps:
+        return firestore.client()
+    return None
+
+
+def firebase_key_path():
+    if getattr(sys, 'frozen', False):
+        base_path = os.path.dirname(sys.executable)
+    else:
+        base_path = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_path, "firebase-key.json")
+
+
+def cloud_configured():
+    """Whether cloud sync is set up, checked without importing Firebase."""
+    return FIRESTORE_BACKEND == 'memory' or (FIREBASE_AVAILABLE and os.path.exists(firebase_key_path()))
+
+
+def connect_firestore():
+    """Imports firebase_admin, initializes the app from firebase-key.json and returns a client.
+
+    Returns None when Firebase isn't installed, there is no key or setup fails.
+    Safe to call from any thread.
+    """
+    if FIRESTORE_BACKEND == 'memory':
+        return firestore_client()
+    with _firebase_lock:
+        if not load_firebase():
+            return None
+        try:
+            if not firebase_admin._apps:
+                key_file = firebase_key_path()
+                if not os.path.exists(key_file):
+                    print(f"Firebase key file not found at: {key_file}")
+                    return None
+                cred = credentials.Certificate(key_file)
+                firebase_admin.initialize_app(cred)
+            db = firestore.client()
+            print("✅ Firebase initialized successfully")
+            return db
+        except Exception as e:
+            print(f"❌ Firebase init error: {e}")
+            return None
+
+
+def firestore_delete_field():
+    return fake_firestore.DELETE_FIELD if FIRESTORE_BACKEND == 'memory' else firestore.DELETE_FIELD
+
 # --------------------------
 # COLOR PALETTES (FIXED)
 # --------------------------
@@ -96,12 +194,38 @@ def dt_now_iso():
 # DATA HANDLER
 # --------------------------
 
+# Version of the checks in validate_and_fix_data: ids present, date/amount/source
+# present, integer amounts, no stored previous_balance, quick_actions a list. Stored
+# profiles carry the version they were last checked against; loading only runs the
+# full check when that is older, then writes the profile once. Bump it when the
+# checks change.
+SCHEMA_VERSION = 1
+
 class OnlineCoinTracker:
-    def __init__(self, profile_name="Default", user_id="default_user"):
+    def __init__(self, profile_name="Default", user_id="default_user", refresh=True, connect=True):
         self.profile_name = profile_name
         self.user_id = user_id
         self.db = None
+        # Changes are queued for the cloud whenever sync is set up, even before (or
+        # without) a connection; connect=False leaves attaching `db` to the caller.
+        self.sync_enabled = cloud_configured()
+        # Optional PersistenceWorker; when set, saves run in the background (see persistence.py).
+        self.saver = None
+        # The store's change_version for this profile when it was last loaded (see is_stale).
+        self.version = 0
+        # Schema version of the data as loaded; older than SCHEMA_VERSION means unchecked.
+        self.schema_version = SCHEMA_VERSION
+        # A profile that isn't stored yet is stamped along with its first write.
+        self.stamp_on_write = False
         self.transactions = []
+        # Running balance after each transaction id, derived from the sorted list (never stored).
+        self.balance_after = {}
+        # Earned/spent prefix sums for date-window totals (see range_index.py).
+        self.range_index = RangeIndex()
+        # Transactions per source, for the History source filter.
+        self.source_counts = Counter()
+        # Bumped on every change to the transactions, so views can tell their results are stale.
+        self.revision = 0
         self.settings = {
             "goal": 13500,
             "dark_mode": False,
@@ -116,50 +240,43 @@ class OnlineCoinTracker:
             ]
         }
 
-        if FIREBASE_AVAILABLE:
+        if connect and self.sync_enabled:
             self.initialize_firebase()
-        self.load_data()
+        self.load_data(refresh=refresh)
 
     def initialize_firebase(self):
-        try:
-            if not firebase_admin._apps:
-                if getattr(sys, 'frozen', False):
-                    base_path = os.path.dirname(sys.executable)
-                else:
-                    base_path = os.path.dirname(os.path.abspath(__file__))
-                
-                key_file = os.path.join(base_path, "firebase-key.json")
-                
-                if not os.path.exists(key_file):
-                    print(f"Firebase key file not found at: {key_file}")
-                    self.db = None
-                    return
-                    
-                cred = credentials.Certificate(key_file)
-                firebase_admin.initialize_app(cred)
-            self.db = firestore.client()
-            print("✅ Firebase initialized successfully")
-        except Exception as e:
-            print(f"❌ Firebase init error: {e}")
-            self.db = None
+        self.db = connect_firestore()
 
     @staticmethod
     def get_last_active_profile(user_id="default_user"):
         """Reads the last active profile name from the database."""
-        if FIREBASE_AVAILABLE and firebase_admin._apps:
+        db = firestore_client()
+        if db:
             try:
-                db = firestore.client()
                 doc_ref = db.collection('users').document(user_id)
-                doc = doc_ref.get()
+                # Field mask: only the one field comes over the wire, not every profile.
+                doc = doc_ref.get(field_paths=['last_active_profile'])
                 if doc.exists:
-                    return doc.to_dict().get('last_active_profile', 'Default')
+                    profile = doc.to_dict().get('last_active_profile', 'Default')
+                    local_store().set_meta(f'last_active_profile:{user_id}', profile)
+                    return profile
             except Exception as e:
                 print(f"Error fetching last active profile: {e}")
         return 'Default'
 
+    @staticmethod
+    def cached_profile_state(user_id="default_user"):
+        """(last active profile, profile names) as last seen, read from the local store without any network."""
+        store = local_store()
+        names = set(json.loads(store.get_meta(f'profile_names:{user_id}') or '[]'))
+        names.update(store.profile_names())
+        names.add('Default')
+        return store.get_meta(f'last_active_profile:{user_id}') or 'Default', sorted(names)
+
     def set_last_active_profile(self):
         """Saves the current profile name as the last active one in the database."""
-        if self.db and FIREBASE_AVAILABLE:
+        local_store().set_meta(f'last_active_profile:{self.user_id}', self.profile_name)
+        if self.db:
             try:
                 doc_ref = self.db.collection('users').document(self.user_id)
                 doc_ref.set({'last_active_profile': self.profile_name}, merge=True)
@@ -200,6 +317,10 @@ class OnlineCoinTracker:
             except (ValueError, TypeError):
                 needs_save = True
                 continue
+            if 'previous_balance' in transaction:
+                # Older versions stored the running balance in every row; it is derived now.
+                del transaction['previous_balance']
+                needs_save = True
             valid_transactions.append(transaction)
 
         self.transactions = valid_transactions
@@ -207,113 +328,167 @@ class OnlineCoinTracker:
             self.settings = loaded_settings
             needs_save = True
 
+        self.recalculate_balances()
+        self.schema_version = SCHEMA_VERSION
         if needs_save:
             print("Data validated, saving...")
-            self.save_data(recalculate=True)
+            self.save_data(recalculate=False)
+        return needs_save
+
+    def validate_if_outdated(self):
+        """Runs the full check only on data stamped with an older schema version.
+
+        Current data is trusted as stored, so a load is just the read and the balance
+        index. Outdated data costs one write: the repaired profile, or only the new
+        stamp when nothing needed fixing.
+        """
+        if self.schema_version >= SCHEMA_VERSION:
+            self.recalculate_balances()
+        elif not self.validate_and_fix_data():
+            self.persist('set_schema_version', SCHEMA_VERSION)
 
     def recalculate_balances(self):
+        """Sorts by date and rebuilds the running-balance index (prefix sums of the amounts)."""
         self.transactions.sort(key=lambda x: x.get('date', ''))
         balance = 0
+        self.balance_after = {}
         for t in self.transactions:
-            t['previous_balance'] = balance
             balance += t.get('amount', 0)
+            self.balance_after[t.get('id')] = balance
+        self.range_index = RangeIndex(self.transactions)
+        self.source_counts = Counter(t.get('source', 'N/A') for t in self.transactions)
+        self.revision += 1
 
-    def load_data(self):
+    def load_data(self, refresh=True):
         default_settings = self.settings.copy()
         loaded_settings = {}
 
-        if self.db and FIREBASE_AVAILABLE:
+        # The local store is the working copy; with Firestore, remote changes are merged into it
+        # first, unless refresh=False leaves that to the sync worker.
+        if self.db and refresh:
             try:
-                doc_ref = self.db.collection('users').document(self.user_id)
-                doc = doc_ref.get()
-                if doc.exists:
-                    data = doc.to_dict()
-                    profiles_data = data.get('profiles', {})
-                    profile_data = profiles_data.get(self.profile_name, {})
-                    self.transactions = profile_data.get('transactions', [])
-                    loaded_settings = profile_data.get('settings', {})
+                sync.pull(self.db, self.user_id, local_store(), self.profile_name)
             except Exception as e:
                 print(f"Online load error for profile '{self.profile_name}': {e}")
-                self.load_local_data() 
-        else:
-            self.load_local_data() 
+        loaded_settings = self.load_local_data()
 
         default_settings.update(loaded_settings)
         self.settings = default_settings
         
-        self.validate_and_fix_data()
+        self.validate_if_outdated()
 
     def save_data(self, recalculate=True):
         if recalculate:
             self.recalculate_balances()
+        if self.saver:
+            self.saver.schedule(self, None)
+            return
+        try:
+            self.write_profile(self.transactions, self.settings)
+        except Exception as e:
+            print(f"❌ Save error for profile '{self.profile_name}': {e}")
 
-        if self.db and FIREBASE_AVAILABLE:
-            try:
-                doc_ref = self.db.collection('users').document(self.user_id)
-                doc = doc_ref.get()
-
-                profiles_data = doc.to_dict().get('profiles', {}) if doc.exists else {}
-
-                profile_data = {
-                    'transactions': self.transactions,
-                    'settings': self.settings,
-                    'last_updated': dt_now_iso()
-                }
+    def write_profile(self, transactions, settings):
+        """Replaces the whole profile in the local store, queued for a full cloud push when syncing.
 
-                profiles_data[self.profile_name] = profile_data
-                doc_ref.set({'profiles': profiles_data, 'last_updated': dt_now_iso()}, merge=True)
-            except Exception as e:
-                print(f"❌ Online save error for profile '{self.profile_name}': {e}")
-                self.save_local_data(recalculate=False)
-        else:
-            self.save_local_data(recalculate=False)
+        Only touches the lists it is given, so the persistence worker can pass copies.
+        """
+        local_store().save_profile(self.profile_name, transactions, settings, dt_now_iso(), sync=self.sync_enabled,
+                                   schema_version=SCHEMA_VERSION)
 
     def load_local_data(self):
         default_settings = self.settings.copy()
         loaded_settings = {}
-        data_dir = os.path.join(os.path.expanduser('~'), 'Documents', 'CoinTracker')
-        data_file = os.path.join(data_dir, f"{self.profile_name}.json")
         try:
-            with open(data_file, 'r') as f:
-                data = json.load(f)
-                self.transactions = data.get('transactions', [])
-                loaded_settings = data.get('settings', {})
-        except (FileNotFoundError, json.JSONDecodeError):
+            # Read before loading: a pull landing in between makes the tracker stale, not wrong.
+            self.version = local_store().change_version(self.profile_name)
+            stored = local_store().load_profile(self.profile_name)
+            # Nothing stored yet means nothing to check.
+            self.schema_version = local_store().schema_version(self.profile_name) if stored else SCHEMA_VERSION
+            self.stamp_on_write = not stored
+        except Exception as e:
+            print(f"Error loading local data for profile '{self.profile_name}': {e}")
+            stored = None
+        if stored:
+            self.transactions, loaded_settings = stored
+        else:
             self.transactions = []
-        
+
         default_settings.update(loaded_settings)
         self.settings = default_settings
+        return loaded_settings
 
-    def save_local_data(self, recalculate=True):
-        if recalculate:
-            self.recalculate_balances()
-        data_dir = os.path.join(os.path.expanduser('~'), 'Documents', 'CoinTracker')
-        os.makedirs(data_dir, exist_ok=True)
-        data_file = os.path.join(data_dir, f"{self.profile_name}.json")
-        data = {
-            "profile_name": self.profile_name,
-            "last_updated": dt_now_iso(),
-            "transactions": self.transactions,
-            "settings": self.settings
-        }
-        try:
-            with open(data_file, 'w') as f:
-                json.dump(data, f, indent=2)
-        except Exception as e:
-            print(f"Error saving data locally for profile '{self.profile_name}': {e}")
+    def is_stale(self):
+        """True if cloud changes were written to the local store since this tracker loaded it."""
+        return self.version != local_store().change_version(self.profile_name)
+
+    def reload_local(self):
+        """Reloads from the local store, validating only if the stored data is outdated.
+
+        Queued saves must be written first (PersistenceWorker.flush) or they are lost from memory.
+        """
+        self.load_local_data()
+        self.validate_if_outdated()
+
+    def persist(self, op, *args):
+        """Saves one change as a single-row write to the local store (add_transaction,
+        update_transaction, delete_transaction or set_setting). With Firestore the change
+        is also queued in the outbox, and sync.py pushes it. Balances must already be current."""
+        if self.saver:
+            # Copied now: the rows may be edited again before the worker gets to them.
+            self.saver.schedule(self, (op, copy.deepcopy(args)))
+        else:
+            try:
+                self.save_job([(op, args)])()
+            except Exception as e:
+                print(f"❌ Save error for profile '{self.profile_name}': {e}")
+        if self.stamp_on_write:
+            # Every row of a new profile comes through here, so it starts out current.
+            self.stamp_on_write = False
+            self.persist('set_schema_version', SCHEMA_VERSION)
+
+    def save_job(self, changes):
+        """Turns a batch of changes from persist/save_data into one callable.
+
+        Runs on the GUI thread and takes whatever snapshot the save needs, so the
+        callable itself can run on the persistence worker's thread. `changes` holds
+        (op, args) pairs, or None where a full save was asked for.
+        """
+        if None in changes:
+            transactions = [dict(t) for t in self.transactions]
+            settings = copy.deepcopy(self.settings)
+            return lambda: self.write_profile(transactions, settings)
+        store, profile, updated_at, sync_enabled = local_store(), self.profile_name, dt_now_iso(), self.sync_enabled
+        def job():
+            for op, args in changes:
+                getattr(store, op)(profile, *args, updated_at=updated_at, sync=sync_enabled)
+        return job
+
+    def save_setting(self, key):
+        self.persist('set_setting', key, self.settings[key])
 
     def add_transaction(self, amount, source, date=None):
         if amount == 0: return False
         transaction = {"id": str(uuid.uuid4()), "date": date or dt_now_iso(), "amount": amount, "source": source}
-        self.transactions.append(transaction)
-        self.save_data(recalculate=True)
+        if not self.transactions or transaction['date'] >= self.transactions[-1].get('date', ''):
+            # Still in date order: extend the indexes instead of rebuilding them.
+            self.balance_after[transaction['id']] = self.get_balance() + amount
+            self.transactions.append(transaction)
+            self.range_index.append(transaction)
+            self.source_counts[source] += 1
+            self.revision += 1
+        else:
+            self.transactions.append(transaction)
+            self.recalculate_balances()
+        self.persist('add_transaction', transaction)
         return True
 
     def update_transaction(self, transaction_id, new_data):
         for t in self.transactions:
             if t.get('id') == transaction_id:
                 t.update(new_data)
-                self.save_data(recalculate=True)
+                self.recalculate_balances()
+                self.persist('update_transaction', t)
                 return True
         return False
 
@@ -321,14 +496,14 @@ class OnlineCoinTracker:
         initial_len = len(self.transactions)
         self.transactions = [t for t in self.transactions if t.get('id') != transaction_id]
         if len(self.transactions) < initial_len:
-            self.save_data(recalculate=True)
+            self.recalculate_balances()
+            self.persist('delete_transaction', transaction_id)
             return True
         return False
 
     def get_balance(self):
         if self.transactions:
-            last_t = self.transactions[-1]
-            return last_t.get('previous_balance', 0) + last_t.get('amount', 0)
+            return self.balance_after.get(self.transactions[-1].get('id'), 0)
         return 0
 
     def get_transaction_history(self):
@@ -351,7 +526,7 @@ class OnlineCoinTracker:
         if not self.transactions: return timeline
         for t in self.transactions:
             try:
-                timeline.append({'date': datetime.fromisoformat(t['date']), 'balance': t.get('previous_balance', 0) + t.get('amount', 0)})
+                timeline.append({'date': datetime.fromisoformat(t['date']), 'balance': self.balance_after.get(t.get('id'), 0)})
             except ValueError:
                  print(f"Skipping timeline point due to invalid date: {t.get('date')}")
         return timeline
@@ -369,20 +544,22 @@ class OnlineCoinTracker:
                 data = json.load(f)
                 self.transactions = data.get('transactions', [])
                 self.settings.update(data.get('settings', {}))
-                self.validate_and_fix_data()
+                # Imported files are always checked, and saved even when nothing needed fixing.
+                if not self.validate_and_fix_data():
+                    self.save_data(recalculate=False)
             return True
         except Exception as e: print(f"Import error: {e}"); return False
 
     def set_goal(self, goal_value: int):
         self.settings["goal"] = max(0, int(goal_value))
-        self.save_data(recalculate=False)
+        self.save_setting("goal")
 
     def get_goal(self) -> int:
         return int(self.settings.get("goal", 13500))
 
     def set_dark_mode(self, enabled: bool):
         self.settings["dark_mode"] = bool(enabled)
-        self.save_data(recalculate=False)
+        self.save_setting("dark_mode")
 
     def get_dark_mode(self) -> bool:
         return bool(self.settings.get("dark_mode", False))
@@ -390,20 +567,22 @@ class OnlineCoinTracker:
     @staticmethod
     def get_profile_names(user_id="default_user"):
         profiles = ['Default']
-        if FIREBASE_AVAILABLE and firebase_admin._apps:
+        db = firestore_client()
+        if db:
             try:
-                db = firestore.client()
-                if not db: raise Exception("Firebase client not available")
-                doc = db.collection('users').document(user_id).get()
-                if doc.exists:
-                    profiles.extend([p for p in doc.to_dict().get('profiles', {}).keys() if p != 'Default'])
+                doc_ref = db.collection('users').document(user_id)
+                doc = doc_ref.get(field_paths=['profile_names'])
+                names = doc.to_dict().get('profile_names') if doc.exists else []
+                if names is None:
+                    # Saved before profile_names existed: read everything once and backfill it.
+                    names = sorted(doc_ref.get().to_dict().get('profiles', {}))
+                    doc_ref.set({'profile_names': names}, merge=True)
+                profiles.extend([p for p in names if p != 'Default'])
+                local_store().set_meta(f'profile_names:{user_id}', json.dumps(names))
             except Exception as e: print(f"Firebase profiles error: {e}")
         try:
-            data_dir = os.path.join(os.path.expanduser('~'), 'Documents', 'CoinTracker')
-            if os.path.exists(data_dir):
-                local_profiles = [f[:-5] for f in os.listdir(data_dir) if f.endswith('.json')]
-                for lp in local_profiles:
-                    if lp not in profiles: profiles.append(lp)
+            for lp in local_store().profile_names():
+                if lp not in profiles: profiles.append(lp)
         except Exception as e: print(f"Error reading local profiles: {e}")
         return sorted(list(set(profiles)))
 
@@ -865,21 +1044,45 @@ class QuickActionsDialog(QDialog):
 # --------------------------
 
 class MainWindow(QMainWindow):
+    # Profile names fetched from the cloud in the background (see refresh_profiles)
+    profiles_refreshed = pyqtSignal(list)
+    # Firestore client from start_cloud_sync, or None if it couldn't connect
+    cloud_connected = pyqtSignal(object)
+    # Tracker for a recently used profile, loaded in the background (see prefetch_profiles)
+    tracker_prefetched = pyqtSignal(object)
+    # History filter finished on a background thread: generation, cache key, search, (rows, earned)
+    history_filtered = pyqtSignal(int, object, str, object)
+
     def __init__(self):
         super().__init__()
 
         # --- THIS INITIALIZATION LOGIC IS MODIFIED ---
-        # 1. Get the primary profile from the database first
-        primary_profile = OnlineCoinTracker.get_last_active_profile()
+        # 1. Last active profile and profile list as of the last run, from the local store
+        #    (no network), so the window can appear at once; refresh_profiles() updates them.
+        primary_profile, self.profiles = OnlineCoinTracker.cached_profile_state()
 
-        # 2. Get all available profiles
-        self.profiles = self.get_profile_names()
-        
-        # 3. Set current profile, with a fallback to 'Default'
+        # 2. Set current profile, with a fallback to 'Default'
         self.current_profile = primary_profile if primary_profile in self.profiles else "Default"
         
-        # 4. Initialize the tracker with the determined profile
-        self.tracker = OnlineCoinTracker(self.current_profile)
+        # 3. Initialize the tracker from the local copy; the sync worker pulls cloud changes
+        self.tracker = OnlineCoinTracker(self.current_profile, refresh=False, connect=False)
+
+        # Saves run on a background thread so clicks never wait on disk or network
+        self.saver = PersistenceWorker(parent=self)
+        self.saver.failed.connect(self.on_save_failed)
+        self.saver.saved.connect(self.on_saved)
+        self.tracker.saver = self.saver
+
+        # Loaded trackers of recently used profiles, so switching back doesn't load again
+        self.trackers = TrackerPool()
+        self.trackers.add(self.tracker)
+
+        # Firestore is connected after the window is up (start_cloud_sync); then a background
+        # worker pushes queued local changes and pulls remote ones
+        self.cloud_db = None
+        self.cloud_state = 'connecting' if self.tracker.sync_enabled else 'offline'
+        self.sync_worker = None
+        self.sync_error = ''
         # --- END OF MODIFIED LOGIC ---
 
         self.palette_colors = DARK if self.tracker.get_dark_mode() else LIGHT
@@ -921,10 +1124,81 @@ class MainWindow(QMainWindow):
         self.apply_modern_theme()
         self.update_active_nav("Dashboard")
 
+        self.profiles_refreshed.connect(self.on_profiles_refreshed)
+        self.cloud_connected.connect(self.on_cloud_connected)
+        self.tracker_prefetched.connect(self.on_tracker_prefetched)
+        QTimer.singleShot(0, self.start_cloud_sync)
+        QTimer.singleShot(0, self.prefetch_profiles)
+
     @staticmethod
     def get_profile_names():
         return OnlineCoinTracker.get_profile_names()
 
+    def start_cloud_sync(self):
+        """Imports and connects Firebase on a background thread (it pulls in grpc and google-cloud)."""
+        if not self.tracker.sync_enabled:
+            return
+        threading.Thread(target=lambda: self.cloud_connected.emit(connect_firestore()),
+                         name='connect-firestore', daemon=True).start()
+
+    def on_cloud_connected(self, db):
+        if db is None:
+            self.cloud_state = 'failed'
+            self.update_online_status_display()
+            return
+        self.cloud_db = db
+        self.cloud_state = 'connected'
+        for tracker in self.trackers:
+            tracker.db = db
+        self.sync_worker = sync.SyncWorker(db, self.tracker.user_id, local_store(), firestore_delete_field(), self)
+        self.sync_worker.status_changed.connect(self.on_sync_status)
+        self.sync_worker.remote_changed.connect(self.on_remote_changed)
+        self.sync_worker.watch(self.current_profile)
+        self.refresh_profiles()
+        self.update_online_status_display()
+
+    def refresh_profiles(self):
+        """Fetches the profile list (and caches the last active profile) off the GUI thread."""
+        if not self.tracker.db:
+            return
+        def fetch():
+            OnlineCoinTracker.get_last_active_profile()
+            self.profiles_refreshed.emit(self.get_profile_names())
+        threading.Thread(target=fetch, name='refresh-profiles', daemon=True).start()
+
+    def prefetch_profiles(self):
+        """Loads the other recently used profiles on a background thread, ready for switching."""
+        recent = json.loads(local_store().get_meta(f'recent_profiles:{self.tracker.user_id}') or '[]')
+        wanted = [p for p in recent if p in self.profiles and p not in self.trackers][:self.trackers.capacity - 1]
+        if not wanted:
+            return
+        def load():
+            for profile in wanted:
+                try:
+                    self.tracker_prefetched.emit(OnlineCoinTracker(profile, refresh=False, connect=False))
+                except Exception as e:
+                    print(f"Error prefetching profile '{profile}': {e}")
+        threading.Thread(target=load, name='prefetch-profiles', daemon=True).start()
+
+    def on_tracker_prefetched(self, tracker):
+        # Already loaded by a switch while this one was on its way.
+        if tracker.profile_name in self.trackers:
+            return
+        tracker.db = self.cloud_db
+        tracker.saver = self.saver
+        # Behind everything the user has actually opened this session.
+        self.trackers.add(tracker, recent=False)
+
+    def on_profiles_refreshed(self, profiles):
+        if profiles == self.profiles:
+            return
+        self.profiles = profiles
+        self.profile_combo.blockSignals(True)
+        self.profile_combo.clear()
+        self.profile_combo.addItems(self.profiles)
+        self.profile_combo.setCurrentText(self.current_profile)
+        self.profile_combo.blockSignals(False)
+
     def create_modern_sidebar(self):
         sidebar = QFrame()
         sidebar.setFixedWidth(280)
@@ -997,7 +1271,20 @@ class MainWindow(QMainWindow):
         if not profile_name or profile_name == self.current_profile: return
         print(f"Changing profile to: {profile_name}")
         self.current_profile = profile_name
-        self.tracker = OnlineCoinTracker(self.current_profile)
+        tracker = self.trackers.get(profile_name)
+        if tracker is None:
+            tracker = OnlineCoinTracker(self.current_profile, refresh=False, connect=False)
+            tracker.saver = self.saver
+            self.trackers.add(tracker)
+        elif tracker.is_stale():
+            # Loaded earlier and cloud changes have landed since: reread the store, no full load.
+            self.saver.flush()
+            tracker.reload_local()
+        tracker.db = self.cloud_db
+        self.tracker = tracker
+        local_store().set_meta(f'recent_profiles:{self.tracker.user_id}', json.dumps(self.trackers.profiles()))
+        if self.sync_worker:
+            self.sync_worker.watch(self.current_profile)
         
         # --- NEWLY ADDED LINE ---
         # Save the new profile choice to the database
@@ -1334,12 +1621,15 @@ class MainWindow(QMainWindow):
         self.analytics_content_layout = QVBoxLayout(self.analytics_content_widget)
         self.analytics_layout.addWidget(self.analytics_content_widget)
         self.analytics_layout.addStretch()
-        self.rebuild_analytics_page()
+        # Content (and QtChart) is built on the first visit; see show_page
+        self.analytics_visited = False
         return page
 
 
     def rebuild_analytics_page(self):
         # ... (Rebuild logic largely the same, ensures charts are created) ...
+        if not self.analytics_visited:
+            return
         while self.analytics_content_layout.count():
             item = self.analytics_content_layout.takeAt(0)
             widget = item.widget()
@@ -1423,8 +1713,8 @@ class MainWindow(QMainWindow):
          card_layout = QVBoxLayout(card)
          card_layout.addWidget(QLabel(card_title, objectName="ModernCardTitle"))
 
-         chart = QChart()
-         chart_view = QChartView(chart)
+         chart = QtChart.QChart()
+         chart_view = QtChart.QChartView(chart)
          chart_view.setRenderHint(QPainter.Antialiasing)
          chart_view.setMinimumHeight(400)
          
@@ -1494,7 +1784,7 @@ class MainWindow(QMainWindow):
             self.apply_chart_theme(chart) # Apply theme even if empty
             return
         chart.setTitle("")
-        series = QPieSeries()
+        series = QtChart.QPieSeries()
         series.setHoleSize(0.4)
         colors = [self.palette_colors['primary'], self.palette_colors['success'], self.palette_colors['warning'], self.palette_colors['danger'], self.palette_colors['accent']]
         colors = [QColor(c) for c in colors]
@@ -1503,7 +1793,7 @@ class MainWindow(QMainWindow):
         for i, (source, amount) in enumerate(breakdown.items()):
             percentage = (amount / total) * 100 if total > 0 else 0
             slice_label = f"{source} ({percentage:.0f}%)"
-            pie_slice = QPieSlice(slice_label, amount)
+            pie_slice = QtChart.QPieSlice(slice_label, amount)
             pie_slice.setColor(colors[i % len(colors)])
             pie_slice.setLabelVisible(True)
             pie_slice.setLabelBrush(QColor(self.palette_colors['text']))
@@ -1528,8 +1818,8 @@ class MainWindow(QMainWindow):
             self.apply_chart_theme(chart)
             return
         chart.setTitle("")
-        series = QBarSeries()
-        bar_set = QBarSet("Spending")
+        series = QtChart.QBarSeries()
+        bar_set = QtChart.QBarSet("Spending")
         categories = []
         max_val = 0
         amounts = []
@@ -1541,11 +1831,11 @@ class MainWindow(QMainWindow):
         bar_set.setColor(QColor(self.palette_colors['danger']))
         series.append(bar_set)
         chart.addSeries(series)
-        axis_x = QBarCategoryAxis()
+        axis_x = QtChart.QBarCategoryAxis()
         axis_x.append(categories)
         chart.addAxis(axis_x, Qt.AlignBottom)
         series.attachAxis(axis_x)
-        axis_y = QValueAxis()
+        axis_y = QtChart.QValueAxis()
         axis_y.setRange(0, max(10, max_val * 1.1))
         axis_y.setLabelFormat("%d")
         chart.addAxis(axis_y, Qt.AlignLeft)
@@ -1568,7 +1858,7 @@ class MainWindow(QMainWindow):
             self.apply_chart_theme(chart)
             return
         chart.setTitle("")
-        series = QLineSeries()
+        series = QtChart.QLineSeries()
         series.setName("Balance")
         series.setPen(QPen(QColor(self.palette_colors['primary']), 2))
         min_balance, max_balance = 0, 100
@@ -1582,12 +1872,12 @@ class MainWindow(QMainWindow):
                 balance = point['balance']
                 series.append(dt.timestamp() * 1000, balance)
         chart.addSeries(series)
-        axis_x = QDateTimeAxis()
+        axis_x = QtChart.QDateTimeAxis()
         axis_x.setTickCount(min(len(timeline), 7))
         axis_x.setFormat("MMM dd")
         chart.addAxis(axis_x, Qt.AlignBottom)
         series.attachAxis(axis_x)
-        axis_y = QValueAxis()
+        axis_y = QtChart.QValueAxis()
         y_min = min_balance * 0.95 if min_balance > 0 else min_balance * 1.05
         y_max = max_balance * 1.05 if max_balance > 0 else max_balance * 0.95
         # Prevent zero range
@@ -1641,24 +1931,37 @@ class MainWindow(QMainWindow):
         table_card = ModernCard(self.palette_colors)
         self.themed_widgets.append(table_card)
         table_layout = QVBoxLayout(table_card)
-        self.history_table = QTableWidget()
-        self.history_table.setColumnCount(6)
-        self.history_table.setHorizontalHeaderLabels(["Date", "Type", "Source/Category", "Amount", "Balance After", "ID"])
+        # Model/view: rows are formatted on demand and handed to the view in batches (see history_model.py)
+        self.history_model = HistoryModel(self)
+        self.history_model.set_palette(self.palette_colors)
+        self.history_table = QTableView()
+        self.history_table.setModel(self.history_model)
         self.history_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.history_table.setColumnHidden(5, True)
+        self.history_table.setColumnHidden(HistoryModel.ID_COLUMN, True)
         self.history_table.verticalHeader().setVisible(False)
-        self.history_table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.history_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.history_table.setSelectionMode(QTableWidget.SingleSelection)
+        # Every row is the same height, so the view never measures rows it doesn't show.
+        self.history_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.history_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.history_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.history_table.setSelectionMode(QAbstractItemView.SingleSelection)
         self.history_table.setAlternatingRowColors(True)
         self.history_table.setContextMenuPolicy(Qt.CustomContextMenu)
         self.history_table.customContextMenuRequested.connect(self.show_history_context_menu)
         table_layout.addWidget(self.history_table)
         layout.addWidget(table_card)
-        self.date_from.dateChanged.connect(self.filter_history)
-        self.date_to.dateChanged.connect(self.filter_history)
-        self.history_source_filter.currentTextChanged.connect(self.filter_history)
-        self.history_search.textChanged.connect(self.filter_history)
+        # Filter edits are debounced; changes to the data refilter straight away.
+        self.history_filter_timer = QTimer(self)
+        self.history_filter_timer.setSingleShot(True)
+        self.history_filter_timer.setInterval(history_model.FILTER_DELAY_MS)
+        self.history_filter_timer.timeout.connect(self.filter_history)
+        self.history_sources = []
+        self.history_result = None
+        self.history_generation = 0
+        self.history_filtered.connect(self.on_history_filtered)
+        self.date_from.dateChanged.connect(self.history_filter_timer.start)
+        self.date_to.dateChanged.connect(self.history_filter_timer.start)
+        self.history_source_filter.currentTextChanged.connect(self.history_filter_timer.start)
+        self.history_search.textChanged.connect(self.history_filter_timer.start)
         return page
 
 
@@ -1761,7 +2064,11 @@ class MainWindow(QMainWindow):
         self.stacked_widget.setCurrentIndex(index)
         self.update_active_nav(name)
         # Only rebuild analytics if necessary and charts are available
-        if name == "Analytics":
+        if name == "Analytics" and not self.analytics_visited:
+            self.analytics_visited = True
+            load_qtchart()
+            self.rebuild_analytics_page()
+        elif name == "Analytics":
             # Check if analytics page needs rebuild (e.g., if data was previously empty)
             # Rebuild only if the content widget is currently holding the empty state card
             current_content = self.analytics_content_layout.itemAt(0).widget() if self.analytics_content_layout.count() > 0 else None
@@ -1814,9 +2121,24 @@ class MainWindow(QMainWindow):
     # ... (update_online_status_display, update_quick_stats, update_recent_transactions remain the same) ...
     def update_online_status_display(self):
          if hasattr(self, 'status_icon') and hasattr(self, 'status_text'):
-             is_online = FIREBASE_AVAILABLE and self.tracker.db is not None
-             self.status_icon.setText("✅" if is_online else "❌")
-             self.status_text.setText("Connected to Firebase" if is_online else "Offline (using local storage)")
+             state = getattr(self, 'cloud_state', 'offline')
+             is_online = state == 'connected' and not self.sync_error
+             self.status_icon.setText("✅" if is_online else "⏳" if state == 'connecting' else "❌")
+             if state == 'offline':
+                 self.status_text.setText("Offline (using local storage)")
+                 return
+             if state == 'connecting':
+                 text = "Connecting to Firebase..."
+             elif state == 'failed':
+                 text = "Firebase unavailable (using local storage)"
+             elif FIRESTORE_BACKEND == 'memory':
+                 text = "In-memory Firestore (test mode)"
+             else:
+                 text = "Connected to Firebase" if is_online else "Can't reach Firebase, retrying"
+             pending = local_store().pending_count()
+             if pending:
+                 text += f" · {pending} change{'s' if pending != 1 else ''} waiting to sync"
+             self.status_text.setText(text)
 
     def update_quick_stats(self):
         today = datetime.now().date()
@@ -1861,9 +2183,12 @@ class MainWindow(QMainWindow):
             self.recent_table.setItem(row, 1, amount_item)
             self.recent_table.setItem(row, 2, QTableWidgetItem(source))
 
-    def filter_history(self):
-        # ... (filter_history remains the same) ...
-        sources = sorted(list(set(t.get('source', 'N/A') for t in self.tracker.transactions)))
+    def update_history_sources(self):
+        """Refills the source filter, only when the tracker's set of sources has changed."""
+        sources = sorted(self.tracker.source_counts)
+        if sources == self.history_sources:
+            return
+        self.history_sources = sources
         current_filter = self.history_source_filter.currentText()
         self.history_source_filter.blockSignals(True)
         self.history_source_filter.clear()
@@ -1871,54 +2196,67 @@ class MainWindow(QMainWindow):
         index = self.history_source_filter.findText(current_filter)
         self.history_source_filter.setCurrentIndex(index if index != -1 else 0)
         self.history_source_filter.blockSignals(False)
+
+    def filter_history(self):
+        """Refilters the History table for the current inputs.
+
+        The date range is a slice of the tracker's range index, so dates are never
+        parsed. When only the search text grew, the previous matches are filtered
+        again instead of the whole range. Scans longer than THREAD_ROWS run on a
+        background thread; starting another filter makes a running one stale, and it
+        stops and its result is dropped.
+        """
+        self.history_filter_timer.stop()
+        self.update_history_sources()
         search_text = self.history_search.text().lower()
         source_filter = self.history_source_filter.currentText()
-        from_date = self.date_from.date().toPyDate()
-        to_date = self.date_to.date().toPyDate()
-        filtered_transactions = []
-        period_earned = 0
-        for t in self.tracker.get_transaction_history():
-            try: transaction_date = datetime.fromisoformat(t['date']).date()
-            except ValueError: continue
-            date_match = from_date <= transaction_date <= to_date
-            source_match = (source_filter == "All Sources" or t.get('source') == source_filter)
-            search_match = (search_text in t.get('source', '').lower() or search_text in str(t.get('amount', '')))
-            if date_match and source_match and search_match:
-                filtered_transactions.append(t)
-                if t.get('amount', 0) > 0: period_earned += t['amount']
-        self.period_summary.setText(f"Earned in Period: {period_earned:,} coins")
-        self.history_table.setRowCount(len(filtered_transactions))
-        for row, t in enumerate(reversed(filtered_transactions)):
-            try: dt_obj = datetime.fromisoformat(t['date']); date_str = dt_obj.strftime("%b %d, %Y, %I:%M %p")
-            except ValueError: date_str = "Invalid Date"
-            amount = t.get('amount', 0)
-            source = t.get('source', 'N/A')
-            balance_after = t.get('previous_balance', 0) + amount
-            trans_id = t.get('id', '')
-            date_item = QTableWidgetItem(date_str)
-            amount_item = QTableWidgetItem(f"{'+' if amount >= 0 else ''}{amount:,}")
-            type_icon = "💰" if amount >= 0 else "💸"
-            type_item = QTableWidgetItem(f"{type_icon} {'Income' if amount >= 0 else 'Expense'}")
-            source_item = QTableWidgetItem(source)
-            balance_item = QTableWidgetItem(f"{balance_after:,}")
-            id_item = QTableWidgetItem(trans_id)
-            if amount >= 0: amount_item.setForeground(QColor(self.palette_colors['success']))
-            else: amount_item.setForeground(QColor(self.palette_colors['danger']))
-            self.history_table.setItem(row, 0, date_item)
-            self.history_table.setItem(row, 1, type_item)
-            self.history_table.setItem(row, 2, source_item)
-            self.history_table.setItem(row, 3, amount_item)
-            self.history_table.setItem(row, 4, balance_item)
-            self.history_table.setItem(row, 5, id_item)
+        source = None if source_filter == "All Sources" else source_filter
+        from_date = self.date_from.date().toPyDate().isoformat()
+        to_date = self.date_to.date().toPyDate().isoformat()
+        index = self.tracker.range_index
+        lo, hi = index.window(from_date, to_date)
+        key = (self.tracker, self.tracker.revision, lo, hi, source)
+        self.history_generation += 1
+
+        if source is None and not search_text:
+            # Nothing to test per row: the window is the result, and the index has its total.
+            earned, _, _ = index.totals(from_date, to_date)
+            self.apply_history_result(key, search_text, index.rows[lo:hi], earned)
+            return
+        previous = self.history_result
+        if previous and previous['key'] == key and search_text.startswith(previous['search']):
+            rows = previous['rows']
+        else:
+            rows = index.rows[lo:hi]
+        if len(rows) <= history_model.THREAD_ROWS:
+            self.apply_history_result(key, search_text, *history_model.filter_rows(rows, source, search_text))
+            return
+
+        generation = self.history_generation
+        def run():
+            result = history_model.filter_rows(rows, source, search_text,
+                                               cancelled=lambda: generation != self.history_generation)
+            if result is not None:
+                self.history_filtered.emit(generation, key, search_text, result)
+        self.period_summary.setText("Filtering…")
+        threading.Thread(target=run, name='history-filter', daemon=True).start()
+
+    def on_history_filtered(self, generation, key, search_text, result):
+        if generation == self.history_generation:
+            self.apply_history_result(key, search_text, *result)
+
+    def apply_history_result(self, key, search_text, rows, earned):
+        """Shows matching `rows` (oldest first) and keeps them for the next, narrower search."""
+        self.history_result = {'key': key, 'search': search_text, 'rows': rows}
+        self.period_summary.setText(f"Earned in Period: {earned:,} coins")
+        self.history_model.set_rows(rows[::-1], self.tracker.balance_after)
 
     def show_history_context_menu(self, position):
         # ... (Context menu logic remains the same) ...
-        selected_indexes = self.history_table.selectedIndexes()
-        if not selected_indexes: return
-        row = selected_indexes[0].row()
-        id_item = self.history_table.item(row, 5)
-        if not id_item: return
-        transaction_id = id_item.text()
+        selected_rows = self.history_table.selectionModel().selectedRows()
+        if not selected_rows: return
+        transaction_id = self.history_model.transaction_id(selected_rows[0].row())
+        if not transaction_id: return
         menu = QMenu(self)
         edit_action = menu.addAction("✎ Edit Transaction")
         delete_action = menu.addAction("🗑️ Delete Transaction")
@@ -1957,7 +2295,7 @@ class MainWindow(QMainWindow):
         chart.setTitleBrush(QBrush(QColor(p['text'])))
         chart.setTitleFont(QFont("Segoe UI", 10, QFont.Bold))
 
-        chart.setAnimationOptions(QChart.SeriesAnimations)        
+        chart.setAnimationOptions(QtChart.QChart.SeriesAnimations)        
     
     def apply_modern_theme(self):
         """
@@ -2029,11 +2367,11 @@ class MainWindow(QMainWindow):
                 QPushButton:hover {{ background-color: {p['bg']}; border-color: {p['muted']}; }}
 
                 /* --- Table Styling --- */
-                QTableWidget {{
+                QTableView {{
                     background-color: {p['card']}; color: {p['text']}; border: 1px solid {p['border']};
                     gridline-color: {p['border']}; alternate-background-color: {p['bg']}; border-radius: 8px;
                 }}
-                QTableWidget::item:selected {{ background-color: {p['primaryLight']}; color: {p['primary']}; }}
+                QTableView::item:selected {{ background-color: {p['primaryLight']}; color: {p['primary']}; }}
                 QHeaderView::section {{
                     background-color: {p['tableHeader']}; color: {p['muted']}; padding: 10px;
                     border: none; font-weight: 600; text-transform: uppercase; font-size: 11px;
@@ -2116,7 +2454,7 @@ class MainWindow(QMainWindow):
             if hasattr(self, 'recent_table'): self.update_recent_transactions()
             if hasattr(self, 'today_stat'): self.update_quick_stats()
             if hasattr(self, 'balance_label'): self.update_balance_and_goal()
-            if hasattr(self, 'history_table'): self.filter_history()
+            if hasattr(self, 'history_model'): self.history_model.set_palette(p)
             try:
                 current_index = self.stacked_widget.currentIndex() if hasattr(self, 'stacked_widget') else 0
                 name = 'Dashboard' if current_index == 0 else ('Analytics' if current_index == 1 else ('History' if current_index == 2 else 'Settings'))
@@ -2262,7 +2600,7 @@ class MainWindow(QMainWindow):
          if dialog.exec_() == QDialog.Accepted:
               updated_actions = dialog.get_updated_actions()
               self.tracker.settings['quick_actions'] = updated_actions
-              self.tracker.save_data(recalculate=False)
+              self.tracker.save_setting('quick_actions')
               self.update_modern_quick_actions()
               self.show_toast("Quick actions updated successfully", "success")
 
@@ -2352,6 +2690,35 @@ class MainWindow(QMainWindow):
         else:
             self.show_toast("Backup failed!", "error")
 
+    def on_saved(self, profile_name):
+        if self.sync_worker:
+            self.sync_worker.nudge()
+        self.update_online_status_display()
+
+    def on_sync_status(self, pending, error):
+        self.sync_error = error
+        self.update_online_status_display()
+
+    def on_remote_changed(self, profile_name):
+        if profile_name != self.current_profile:
+            return
+        # Write out queued local edits first so the reload from the store includes them.
+        self.saver.flush()
+        self.tracker.reload_local()
+        self.update_all_data()
+
+    def on_save_failed(self, profile_name, error):
+        self.show_toast(f"Couldn't save '{profile_name}': {error}", "error")
+
+    def closeEvent(self, event):
+        # Nothing queued for saving may be lost on exit.
+        if not self.saver.flush():
+            print("⚠️ Timed out waiting for background saves to finish")
+        if self.sync_worker:
+            # Anything not pushed yet stays in the outbox for next time.
+            self.sync_worker.stop()
+        super().closeEvent(event)
+
     def show_toast(self, message, type="success"):
         """Shows a non-blocking toast notification."""
         if hasattr(self, 'toast_widget') and self.toast_widget:
@@ -2375,21 +2742,9 @@ if __name__ == "__main__":
     app.setStyle("Fusion")
     app.setFont(QFont("Segoe UI", 10))
 
-    if FIREBASE_AVAILABLE:
-        try:
-            if getattr(sys, 'frozen', False): base_path = os.path.dirname(sys.executable)
-            else: base_path = os.path.dirname(os.path.abspath(__file__))
-            key_file = os.path.join(base_path, "firebase-key.json")
-            if os.path.exists(key_file) and not firebase_admin._apps:
-                cred = credentials.Certificate(key_file)
-                firebase_admin.initialize_app(cred)
-                print("✅ Firebase initialized successfully (pre-app)")
-            elif not os.path.exists(key_file):
-                print("Firebase key not found, proceeding offline.")
-                FIREBASE_AVAILABLE = False
-        except Exception as e:
-            print(f"❌ Firebase init error (pre-app): {e}")
-            FIREBASE_AVAILABLE = False
+    # Firebase is initialized by MainWindow.start_cloud_sync once the window is up.
+    if FIREBASE_AVAILABLE and FIRESTORE_BACKEND != 'memory' and not os.path.exists(firebase_key_path()):
+        print("Firebase key not found, proceeding offline.")
 
     try:
         window = MainWindow()
@@ -0,0 +1,471 @@
+"""In-process stand-in for the slice of the Firestore client API Coin Tracker uses.
+
+Select it with FIRESTORE_BACKEND=memory to run the Firestore code paths without
+network access or credentials (benchmarks, load tests, demos). Data lives in this
+process only. FIRESTORE_FAKE_LATENCY_MS adds a sleep to every round trip so timings
+look like a real deployment.
+
+This file is the original; desktop/fake_firestore.py is a copy, checked by
+desktop/tests/test_shared_modules.py. Edit this one and copy it over.
+"""
+import copy
+import os
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+# Firestore rejects documents larger than 1 MiB.
+MAX_DOCUMENT_BYTES = 1024 * 1024
+
+
+class _Sentinel:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+
+DELETE_FIELD = _Sentinel('DELETE_FIELD')
+
+
+class NotFound(Exception):
+    pass
+
+
+class DocumentTooLarge(ValueError):
+    pass
+
+
+# --- Size accounting ---
+# Follows https://firebase.google.com/docs/firestore/storage-size
+
+def value_size(value):
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float, datetime)):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode('utf-8')) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(str(k).encode('utf-8')) + 1 + value_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(value_size(v) for v in value)
+    return len(str(value).encode('utf-8')) + 1
+
+
+def document_name_size(path):
+    return sum(len(part.encode('utf-8')) + 1 for part in path.split('/')) + 16
+
+
+def document_size(path, data):
+    return document_name_size(path) + value_size(data) + 32
+
+
+# --- Field helpers ---
+
+_MISSING = object()
+
+
+def _get_field(data, field_path):
+    value = data
+    for part in field_path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _set_field(data, field_path, value):
+    parts = field_path.split('.')
+    for part in parts[:-1]:
+        child = data.get(part)
+        if not isinstance(child, dict):
+            child = data[part] = {}
+        data = child
+    if value is DELETE_FIELD:
+        data.pop(parts[-1], None)
+    else:
+        data[parts[-1]] = value
+
+
+def _merge(target, updates):
+    """Applies `set(..., merge=True)` semantics: maps merge recursively, DELETE_FIELD removes."""
+    for key, value in updates.items():
+        if value is DELETE_FIELD:
+            target.pop(key, None)
+        elif isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = _strip_sentinels(value)
+
+
+def _strip_sentinels(value):
+    if isinstance(value, dict):
+        return {k: _strip_sentinels(v) for k, v in value.items() if v is not DELETE_FIELD}
+    return copy.deepcopy(value)
+
+
+def _type_rank(value):
+    # Firestore orders values of different types by type first.
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, datetime):
+        return 3
+    if isinstance(value, str):
+        return 4
+    if isinstance(value, bytes):
+        return 5
+    if isinstance(value, (list, tuple)):
+        return 8
+    return 9
+
+
+def _sort_key(value):
+    rank = _type_rank(value)
+    if rank in (8, 9):
+        return (rank, str(value))
+    return (rank, value)
+
+
+def _matches(value, op, operand):
+    # Documents without the field never match, not even `!=` or `not-in`.
+    if value is _MISSING:
+        return False
+    if op == '==':
+        return value == operand
+    if op == '!=':
+        return value != operand
+    if op == 'in':
+        return value in operand
+    if op == 'not-in':
+        return value not in operand
+    if op == 'array-contains':
+        return isinstance(value, list) and operand in value
+    if op == 'array-contains-any':
+        return isinstance(value, list) and any(v in value for v in operand)
+    if _type_rank(value) != _type_rank(operand):
+        return False
+    if op == '<':
+        return value < operand
+    if op == '<=':
+        return value <= operand
+    if op == '>':
+        return value > operand
+    if op == '>=':
+        return value >= operand
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+# --- API objects ---
+
+class FakeSnapshot:
+    def __init__(self, reference, data, update_time=None):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self.update_time = update_time
+        self._data = data
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path):
+        value = _get_field(self._data or {}, field_path)
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+
+class FakeQuery:
+    ASCENDING = 'ASCENDING'
+    DESCENDING = 'DESCENDING'
+
+    def __init__(self, client, path, filters=(), orders=(), limit_count=None, fields=None, all_descendants=False):
+        self._client = client
+        self._path = path
+        self._filters = filters
+        self._orders = orders
+        self._limit = limit_count
+        self._fields = fields
+        # Collection group queries match every collection named path[-1], at any depth.
+        self._all_descendants = all_descendants
+
+    def _copy(self, **changes):
+        state = {
+            'filters': self._filters, 'orders': self._orders,
+            'limit_count': self._limit, 'fields': self._fields,
+            'all_descendants': self._all_descendants,
+        }
+        state.update(changes)
+        return FakeQuery(self._client, self._path, **state)
+
+    def where(self, field_path=None, op_string=None, value=None, *, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path, direction=ASCENDING):
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count):
+        return self._copy(limit_count=count)
+
+    def select(self, field_paths):
+        return self._copy(fields=tuple(field_paths))
+
+    def stream(self, transaction=None):
+        return iter(self._client._run_query(self))
+
+    def get(self, transaction=None):
+        return list(self.stream())
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, client, path):
+        super().__init__(client, path)
+        self.id = path[-1]
+
+    @property
+    def parent(self):
+        return FakeDocument(self._client, self._path[:-1]) if len(self._path) > 1 else None
+
+    def document(self, document_id=None):
+        if document_id is None:
+            document_id = ''.join(random.choices('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789', k=20))
+        return FakeDocument(self._client, self._path + (document_id,))
+
+    def add(self, document_data, document_id=None):
+        ref = self.document(document_id)
+        return ref.set(document_data), ref
+
+    def list_documents(self):
+        return [FakeDocument(self._client, path) for path in self._client._children(self._path)]
+
+
+class FakeDocument:
+    def __init__(self, client, path):
+        self._client = client
+        self._path = path
+        self.id = path[-1]
+
+    @property
+    def path(self):
+        return '/'.join(self._path)
+
+    @property
+    def parent(self):
+        return FakeCollection(self._client, self._path[:-1])
+
+    def collection(self, name):
+        return FakeCollection(self._client, self._path + (name,))
+
+    def get(self, field_paths=None, transaction=None):
+        return self._client._get(self, field_paths)
+
+    def set(self, document_data, merge=False):
+        return self._client._write(self, document_data, 'merge' if merge else 'set')
+
+    def update(self, field_updates):
+        return self._client._write(self, field_updates, 'update')
+
+    def create(self, document_data):
+        return self._client._write(self, document_data, 'create')
+
+    def delete(self):
+        return self._client._delete(self)
+
+
+class FakeWriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference, document_data, merge=False):
+        self._writes.append(('merge' if merge else 'set', reference, document_data))
+
+    def update(self, reference, field_updates):
+        self._writes.append(('update', reference, field_updates))
+
+    def delete(self, reference):
+        self._writes.append(('delete', reference, None))
+
+    def commit(self):
+        self._client._commit(self._writes)
+        self._writes = []
+
+
+class FakeFirestore:
+    """Thread-safe in-memory document store with Firestore's semantics for the calls the apps make.
+
+    `latency` (seconds) and `jitter` (fraction of latency) are slept once per round
+    trip: one per get/set/delete, one per query, one per batch commit. Pass
+    `max_document_bytes=None` to store documents over the real size limit.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, max_document_bytes=MAX_DOCUMENT_BYTES):
+        self.latency = latency
+        self.jitter = jitter
+        self.max_document_bytes = max_document_bytes
+        self.ops = Counter()
+        self._docs = {}
+        self._sizes = {}
+        self._lock = threading.RLock()
+
+    # --- Public API ---
+
+    def collection(self, name):
+        return FakeCollection(self, tuple(name.split('/')))
+
+    def document(self, path):
+        return FakeDocument(self, tuple(path.split('/')))
+
+    def collection_group(self, collection_id):
+        return FakeQuery(self, (collection_id,), all_descendants=True)
+
+    def batch(self):
+        return FakeWriteBatch(self)
+
+    def get_all(self, references, field_paths=None, transaction=None):
+        self._round_trip()
+        with self._lock:
+            return [self._snapshot(ref, field_paths) for ref in references]
+
+    def document_bytes(self, path):
+        with self._lock:
+            return self._sizes.get(tuple(path.split('/')), 0)
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def document_count(self):
+        with self._lock:
+            return len(self._docs)
+
+    def clear(self):
+        with self._lock:
+            self._docs.clear()
+            self._sizes.clear()
+            self.ops.clear()
+
+    # --- Internals ---
+
+    def _round_trip(self):
+        if self.latency > 0:
+            spread = self.latency * self.jitter
+            time.sleep(max(0.0, self.latency + random.uniform(-spread, spread)))
+
+    def _snapshot(self, ref, field_paths=None):
+        self.ops['read'] += 1
+        entry = self._docs.get(ref._path)
+        if entry is None:
+            return FakeSnapshot(ref, None)
+        data, update_time = entry
+        if field_paths is not None:
+            projected = {}
+            for field_path in field_paths:
+                value = _get_field(data, field_path)
+                if value is not _MISSING:
+                    _set_field(projected, field_path, value)
+            data = projected
+        return FakeSnapshot(ref, copy.deepcopy(data), update_time)
+
+    def _get(self, ref, field_paths):
+        self._round_trip()
+        with self._lock:
+            return self._snapshot(ref, field_paths)
+
+    def _apply(self, ref, data, mode):
+        existing = self._docs.get(ref._path)
+        if mode == 'create' and existing is not None:
+            raise ValueError(f"Document already exists: {ref.path}")
+        if mode == 'update':
+            if existing is None:
+                raise NotFound(f"No document to update: {ref.path}")
+            new_data = copy.deepcopy(existing[0])
+            for field_path, value in data.items():
+                _set_field(new_data, field_path, _strip_sentinels(value) if value is not DELETE_FIELD else value)
+        elif mode == 'merge':
+            new_data = copy.deepcopy(existing[0]) if existing else {}
+            _merge(new_data, data)
+        else:
+            new_data = _strip_sentinels(data)
+
+        size = document_size(ref.path, new_data)
+        if self.max_document_bytes is not None and size > self.max_document_bytes:
+            raise DocumentTooLarge(
+                f"Document {ref.path} is {size} bytes, over the {self.max_document_bytes} byte limit")
+        self._docs[ref._path] = (new_data, datetime.now(timezone.utc))
+        self._sizes[ref._path] = size
+        self.ops['write'] += 1
+
+    def _write(self, ref, data, mode):
+        self._round_trip()
+        with self._lock:
+            self._apply(ref, data, mode)
+
+    def _delete(self, ref):
+        self._round_trip()
+        with self._lock:
+            self._docs.pop(ref._path, None)
+            self._sizes.pop(ref._path, None)
+            self.ops['delete'] += 1
+
+    def _commit(self, writes):
+        self._round_trip()
+        with self._lock:
+            # All-or-nothing, like a real batch: validate against a copy first.
+            docs, sizes, ops = dict(self._docs), dict(self._sizes), self.ops.copy()
+            try:
+                for mode, ref, data in writes:
+                    if mode == 'delete':
+                        self._docs.pop(ref._path, None)
+                        self._sizes.pop(ref._path, None)
+                        self.ops['delete'] += 1
+                    else:
+                        self._apply(ref, data, mode)
+            except Exception:
+                self._docs, self._sizes, self.ops = docs, sizes, ops
+                raise
+
+    def _children(self, collection_path):
+        depth = len(collection_path) + 1
+        with self._lock:
+            return [path for path in self._docs if len(path) == depth and path[:-1] == collection_path]
+
+    def _run_query(self, query):
+        self._round_trip()
+        with self._lock:
+            rows = []
+            if query._all_descendants:
+                paths = [p for p in self._docs if p[-2] == query._path[-1]]
+            else:
+                paths = self._children(query._path)
+            for path in paths:
+                data = self._docs[path][0]
+                if all(_matches(_get_field(data, f), op, v) for f, op, v in query._filters):
+                    rows.append(path)
+
+            for field_path, direction in reversed(query._orders):
+                rows = [p for p in rows if _get_field(self._docs[p][0], field_path) is not _MISSING]
+                rows.sort(key=lambda p: _sort_key(_get_field(self._docs[p][0], field_path)),
+                          reverse=direction == FakeQuery.DESCENDING)
+            if query._limit is not None:
+                rows = rows[:query._limit]
+            return [self._snapshot(FakeDocument(self, path), query._fields) for path in rows]
+
+
+def from_environment():
+    """Builds a FakeFirestore configured from FIRESTORE_FAKE_LATENCY_MS / FIRESTORE_FAKE_JITTER."""
+    latency_ms = float(os.environ.get('FIRESTORE_FAKE_LATENCY_MS', 0))
+    jitter = float(os.environ.get('FIRESTORE_FAKE_JITTER', 0.2 if latency_ms else 0))
+    return FakeFirestore(latency=latency_ms / 1000, jitter=jitter)
@@ -0,0 +1,130 @@
+from datetime import datetime
+from functools import lru_cache
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtGui import QColor
+
+# Rows handed to the view per fetchMore; the view asks for more as it scrolls.
+FETCH_BATCH = 200
+# Quiet time after the last filter edit (typing, picking a date) before the table is refiltered.
+FILTER_DELAY_MS = 250
+# Filters that have to scan more rows than this run on a background thread.
+THREAD_ROWS = 20000
+# How often (in rows) a background filter checks whether it has been superseded.
+CANCEL_CHECK_ROWS = 4096
+
+
+@lru_cache(maxsize=4096)
+def format_date(value):
+    try:
+        return datetime.fromisoformat(value).strftime("%b %d, %Y, %I:%M %p")
+    except (TypeError, ValueError):
+        return "Invalid Date"
+
+
+def filter_rows(rows, source=None, search='', cancelled=None):
+    """(matching rows, coins earned by them) for a source and a lower-case search text.
+
+    `rows` are the date window's rows (or the previous, broader result). Returns None
+    as soon as `cancelled()` says a newer filter has replaced this one.
+    """
+    matches, earned = [], 0
+    for i, t in enumerate(rows):
+        if cancelled and not i % CANCEL_CHECK_ROWS and cancelled():
+            return None
+        if source is not None and t.get('source') != source:
+            continue
+        amount = t.get('amount', 0)
+        if search and search not in t.get('source', '').lower() and search not in str(amount):
+            continue
+        matches.append(t)
+        if amount > 0:
+            earned += amount
+    return matches, earned
+
+
+class HistoryModel(QAbstractTableModel):
+    """The History table: the transactions matching the current filters, newest first.
+
+    The model keeps references to the tracker's rows and formats a cell only when the
+    view asks for it, so nothing per row is created up front. The view is told about
+    FETCH_BATCH rows at a time (canFetchMore / fetchMore) and only lays out and paints
+    those it shows. Filtering happens before `set_rows`, over the date window of the
+    tracker's range index, rather than in a proxy that would test every row.
+    """
+
+    COLUMNS = ["Date", "Type", "Source/Category", "Amount", "Balance After", "ID"]
+    ID_COLUMN = 5
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._loaded = 0
+        self._balance_after = {}
+        self._colors = {}
+
+    def set_rows(self, rows, balance_after):
+        """Replaces the result set; `rows` newest first, `balance_after` the tracker's running balances."""
+        self.beginResetModel()
+        self._rows = rows
+        self._balance_after = balance_after
+        self._loaded = min(len(rows), FETCH_BATCH)
+        self.endResetModel()
+
+    def set_palette(self, palette):
+        self._colors = {'success': QColor(palette['success']), 'danger': QColor(palette['danger'])}
+        if self._loaded:
+            self.dataChanged.emit(self.index(0, 3), self.index(self._loaded - 1, 3), [Qt.ForegroundRole])
+
+    def result_count(self):
+        """Rows matching the filters, including those not fetched by the view yet."""
+        return len(self._rows)
+
+    def transaction_id(self, row):
+        return self._rows[row].get('id', '') if 0 <= row < self._loaded else None
+
+    # --- QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self._loaded < len(self._rows)
+
+    def fetchMore(self, parent):
+        count = min(FETCH_BATCH, len(self._rows) - self._loaded)
+        if parent.isValid() or count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        t = self._rows[index.row()]
+        column = index.column()
+        amount = t.get('amount', 0)
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return format_date(t.get('date'))
+            if column == 1:
+                return f"{'💰' if amount >= 0 else '💸'} {'Income' if amount >= 0 else 'Expense'}"
+            if column == 2:
+                return t.get('source', 'N/A')
+            if column == 3:
+                return f"{'+' if amount >= 0 else ''}{amount:,}"
+            if column == 4:
+                return f"{self._balance_after.get(t.get('id'), 0):,}"
+            return t.get('id', '')
+        if role == Qt.ForegroundRole and column == 3:
+            return self._colors.get('success' if amount >= 0 else 'danger')
+        return None
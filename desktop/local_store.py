@@ -0,0 +1,594 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+
+
+def data_dir():
+    return os.path.join(os.path.expanduser('~'), 'Documents', 'CoinTracker')
+
+
+def utc_now_iso():
+    # Outbox stamps are compared with other devices' changes, so they are always UTC.
+    return datetime.now(timezone.utc).isoformat()
+
+
+def row_fields(t):
+    return {'id': t['id'], 'date': t['date'], 'amount': int(t['amount']), 'source': t['source']}
+
+
+def schema_key(profile):
+    # Meta key holding the schema version the profile was checked against; profiles
+    # imported from older versions have none, so they are checked on first load.
+    return f"schema_version:{profile}"
+
+
+# --- Sync outbox ---
+# With sync=True, every write also records a pending change for the cloud sync
+# (sync.py), keyed by (profile, kind, key) so only the latest change per row or
+# setting is kept:
+#   ('transaction', id) -> the row, or None once deleted
+#   ('setting', key)    -> the value
+#   ('profile', '')     -> None; the whole profile was replaced and is pushed in full
+# Each change carries `at`, a UTC timestamp used to merge with remote changes.
+
+
+class SQLiteStore:
+    """Offline storage for every profile in one SQLite file.
+
+    One row per transaction, indexed by date and by source, and one row per setting,
+    so each change is a single-row statement instead of a rewrite of the profile.
+    Profiles saved as `<profile>.json` by older versions are imported the first
+    time the store is opened; the JSON files are left in place.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._versions = {}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        with self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.executescript(
+                'CREATE TABLE IF NOT EXISTS profiles ('
+                ' name TEXT PRIMARY KEY,'
+                ' last_updated TEXT);'
+                'CREATE TABLE IF NOT EXISTS transactions ('
+                ' profile TEXT NOT NULL,'
+                ' id TEXT NOT NULL,'
+                ' date TEXT NOT NULL,'
+                ' amount INTEGER NOT NULL,'
+                ' source TEXT NOT NULL,'
+                ' PRIMARY KEY (profile, id));'
+                'CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (profile, date);'
+                'CREATE INDEX IF NOT EXISTS idx_transactions_source ON transactions (profile, source);'
+                'CREATE TABLE IF NOT EXISTS settings ('
+                ' profile TEXT NOT NULL,'
+                ' key TEXT NOT NULL,'
+                ' value TEXT NOT NULL,'
+                ' PRIMARY KEY (profile, key));'
+                'CREATE TABLE IF NOT EXISTS meta ('
+                ' key TEXT PRIMARY KEY,'
+                ' value TEXT);'
+                'CREATE TABLE IF NOT EXISTS outbox ('
+                ' profile TEXT NOT NULL,'
+                ' kind TEXT NOT NULL,'
+                ' key TEXT NOT NULL,'
+                ' value TEXT,'
+                ' at TEXT NOT NULL,'
+                ' PRIMARY KEY (profile, kind, key));'
+            )
+        self.import_json_profiles(os.path.dirname(os.path.abspath(path)))
+
+    # --- Reads ---
+
+    def profile_names(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute('SELECT name FROM profiles ORDER BY name')]
+
+    def load_profile(self, profile):
+        """(transactions oldest first, settings), or None if the profile has never been saved."""
+        with self._lock:
+            if self._conn.execute('SELECT 1 FROM profiles WHERE name = ?', (profile,)).fetchone() is None:
+                return None
+            transactions = [
+                {'id': row[0], 'date': row[1], 'amount': row[2], 'source': row[3]}
+                for row in self._conn.execute(
+                    'SELECT id, date, amount, source FROM transactions WHERE profile = ? ORDER BY date', (profile,))
+            ]
+            settings = {key: json.loads(value) for key, value in self._conn.execute(
+                'SELECT key, value FROM settings WHERE profile = ?', (profile,))}
+        return transactions, settings
+
+    def change_version(self, profile):
+        """Bumped whenever changes pulled from the cloud are written to the profile.
+
+        Lets a tracker that loaded the profile earlier tell whether it is still current.
+        Kept in memory only; a new process loads everything fresh anyway.
+        """
+        with self._lock:
+            return self._versions.get(profile, 0)
+
+    # --- Writes ---
+    # Each write runs in its own SQLite transaction, together with the profile's
+    # last_updated stamp.
+
+    def _touch(self, profile, updated_at):
+        self._conn.execute(
+            'INSERT INTO profiles (name, last_updated) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET last_updated = COALESCE(excluded.last_updated, last_updated)',
+            (profile, updated_at))
+
+    @staticmethod
+    def _row(profile, t):
+        return profile, t['id'], t['date'], int(t['amount']), t['source']
+
+    def _queue(self, profile, kind, key, value):
+        self._conn.execute('INSERT OR REPLACE INTO outbox VALUES (?, ?, ?, ?, ?)',
+                           (profile, kind, key, None if value is None else json.dumps(value), utc_now_iso()))
+
+    def add_transaction(self, profile, t, updated_at=None, sync=False):
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO transactions VALUES (?, ?, ?, ?, ?)', self._row(profile, t))
+            self._touch(profile, updated_at)
+            if sync:
+                self._queue(profile, 'transaction', t['id'], row_fields(t))
+
+    def update_transaction(self, profile, t, updated_at=None, sync=False):
+        with self._lock, self._conn:
+            self._conn.execute('UPDATE transactions SET date = ?, amount = ?, source = ? WHERE profile = ? AND id = ?',
+                               (t['date'], int(t['amount']), t['source'], profile, t['id']))
+            self._touch(profile, updated_at)
+            if sync:
+                self._queue(profile, 'transaction', t['id'], row_fields(t))
+
+    def delete_transaction(self, profile, transaction_id, updated_at=None, sync=False):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM transactions WHERE profile = ? AND id = ?', (profile, transaction_id))
+            self._touch(profile, updated_at)
+            if sync:
+                self._queue(profile, 'transaction', transaction_id, None)
+
+    def set_setting(self, profile, key, value, updated_at=None, sync=False):
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO settings VALUES (?, ?, ?)', (profile, key, json.dumps(value)))
+            self._touch(profile, updated_at)
+            if sync:
+                # json 'null' rather than NULL, so a None setting isn't read back as a delete.
+                self._conn.execute('INSERT OR REPLACE INTO outbox VALUES (?, ?, ?, ?, ?)',
+                                   (profile, 'setting', key, json.dumps(value), utc_now_iso()))
+
+    def save_profile(self, profile, transactions, settings, updated_at=None, sync=False, schema_version=0):
+        """Replaces a whole profile (imports and repairs), stamped with the schema version
+        it was checked against; still one SQLite transaction."""
+        with self._lock, self._conn:
+            self._write_profile(profile, transactions, settings, updated_at)
+            self._conn.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', (schema_key(profile), str(schema_version)))
+            if sync:
+                self._conn.execute('DELETE FROM outbox WHERE profile = ?', (profile,))
+                self._queue(profile, 'profile', '', None)
+
+    def apply_remote(self, profile, upserts, deletes, settings):
+        """Writes changes pulled from the cloud; they are not queued for sync again."""
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO transactions VALUES (?, ?, ?, ?, ?)',
+                                   [self._row(profile, t) for t in upserts])
+            self._conn.executemany('DELETE FROM transactions WHERE profile = ? AND id = ?',
+                                   [(profile, transaction_id) for transaction_id in deletes])
+            self._conn.executemany('INSERT OR REPLACE INTO settings VALUES (?, ?, ?)',
+                                   [(profile, key, json.dumps(value)) for key, value in settings.items()])
+            self._touch(profile, None)
+            self._versions[profile] = self._versions.get(profile, 0) + 1
+
+    def set_schema_version(self, profile, version, updated_at=None, sync=False):
+        """Stamps a profile that was checked and needed no changes. Not synced: each copy is checked where it is loaded."""
+        self.set_meta(schema_key(profile), str(version))
+
+    def _write_profile(self, profile, transactions, settings, updated_at):
+        self._conn.execute('DELETE FROM transactions WHERE profile = ?', (profile,))
+        self._conn.execute('DELETE FROM settings WHERE profile = ?', (profile,))
+        self._conn.executemany('INSERT OR REPLACE INTO transactions VALUES (?, ?, ?, ?, ?)',
+                               [self._row(profile, t) for t in transactions])
+        self._conn.executemany('INSERT INTO settings VALUES (?, ?, ?)',
+                               [(profile, key, json.dumps(value)) for key, value in settings.items()])
+        self._touch(profile, updated_at)
+
+    # --- Sync state ---
+
+    def queue_full_push(self, profile):
+        with self._lock, self._conn:
+            self._queue(profile, 'profile', '', None)
+
+    def pending_changes(self):
+        with self._lock:
+            return [
+                {'profile': row[0], 'kind': row[1], 'key': row[2],
+                 'value': None if row[3] is None else json.loads(row[3]), 'at': row[4]}
+                for row in self._conn.execute('SELECT profile, kind, key, value, at FROM outbox ORDER BY at')
+            ]
+
+    def clear_changes(self, changes):
+        """Drops pushed changes, unless the same row or setting changed again meanwhile."""
+        with self._lock, self._conn:
+            self._conn.executemany('DELETE FROM outbox WHERE profile = ? AND kind = ? AND key = ? AND at = ?',
+                                   [(c['profile'], c['kind'], c['key'], c['at']) for c in changes])
+
+    def pending_count(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM outbox').fetchone()[0]
+
+    def schema_version(self, profile):
+        """Schema version the stored profile was last checked against; 0 if never."""
+        return int(self.get_meta(schema_key(profile)) or 0)
+
+    def get_meta(self, key):
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', (key, value))
+
+    # --- Migration ---
+
+    @staticmethod
+    def _importable_rows(rows):
+        """Rows of an old JSON profile that fit the table: missing ids get a uuid, rows
+        without a date, source or whole-number amount are dropped. The rest of the repair
+        is left to the load-time check, since imported profiles are not stamped."""
+        importable = []
+        for t in rows:
+            if not isinstance(t, dict) or not all(t.get(k) is not None for k in ('date', 'amount', 'source')):
+                continue
+            try:
+                amount = int(t['amount'])
+            except (ValueError, TypeError):
+                continue
+            importable.append({**t, 'id': t.get('id') or str(uuid.uuid4()), 'amount': amount})
+        return importable
+
+    def import_json_profiles(self, directory):
+        """One-time import of `<profile>.json` files written by older versions.
+
+        Each imported file is recorded, so if one fails the next start retries only
+        the files that haven't been imported yet.
+        """
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone():
+                return
+        imported = failed = 0
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith('.json'):
+                continue
+            marker = f"json_imported:{filename}"
+            if self.get_meta(marker):
+                continue
+            try:
+                with open(os.path.join(directory, filename), 'r') as f:
+                    data = json.load(f)
+                transactions = self._importable_rows(data.get('transactions', []))
+                with self._lock, self._conn:
+                    self._write_profile(filename[:-5], transactions, data.get('settings', {}), data.get('last_updated'))
+                    self._conn.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', (marker, '1'))
+                imported += 1
+            except (OSError, ValueError, TypeError, AttributeError, sqlite3.Error) as e:
+                failed += 1
+                print(f"Could not import local profile file {filename}, will retry next start: {e}")
+        if not failed:
+            with self._lock, self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('json_imported', ?)", (str(imported),))
+        if imported:
+            print(f"Imported {imported} local JSON profiles into {self.path}")
+
+
+
+class JournalStore:
+    """Offline storage as plain files: a snapshot plus an append-only journal per profile.
+
+    `<profile>.json` is the snapshot, in the same format older versions wrote.
+    Every change appends one JSON line to `<profile>.journal` (flushed and fsynced),
+    and loading replays the journal over the snapshot. A torn last line from a crash
+    is ignored and cut off. Once the journal grows past `compact_bytes`, a background
+    thread folds it into a new snapshot, written to a temp file and renamed into place.
+    The sync outbox and cursors live in `sync.state`, rewritten the same way.
+    """
+
+    def __init__(self, directory, compact_bytes=256 * 1024):
+        self.directory = directory
+        self.compact_bytes = compact_bytes
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self._compacting = set()
+        self._versions = {}
+        # Bumped by save_profile, so a compaction that started earlier knows its snapshot is stale.
+        self._generations = {}
+        os.makedirs(directory, exist_ok=True)
+        self._sync_lock = threading.Lock()
+        self._sync_path = os.path.join(directory, 'sync.state')
+        try:
+            with open(self._sync_path, 'r') as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            state = {}
+        self._changes = {(c['profile'], c['kind'], c['key']): c for c in state.get('changes', [])}
+        self._meta = state.get('meta', {})
+
+    def _lock(self, profile):
+        with self._locks_lock:
+            return self._locks.setdefault(profile, threading.Lock())
+
+    def _path(self, profile, suffix):
+        return os.path.join(self.directory, profile + suffix)
+
+    # --- Reads ---
+
+    def profile_names(self):
+        return sorted({f.rsplit('.', 1)[0] for f in os.listdir(self.directory)
+                       if f.endswith('.json') or f.endswith('.journal')})
+
+    def _read_snapshot(self, profile):
+        try:
+            with open(self._path(profile, '.json'), 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        transactions = {t['id']: t for t in data.get('transactions', []) if isinstance(t, dict) and t.get('id')}
+        return transactions, data.get('settings', {})
+
+    def _replay(self, path, transactions, settings):
+        """Applies the journal at `path`; returns False if there is none."""
+        try:
+            with open(path, 'rb') as f:
+                lines = f.read().split(b'\n')
+        except FileNotFoundError:
+            return False
+        # Everything after the last newline is a write that never completed.
+        if lines[-1]:
+            print(f"Ignoring torn journal entry in {path}")
+            with open(path, 'r+b') as f:
+                f.truncate(sum(len(line) + 1 for line in lines[:-1]))
+        for line in lines[:-1]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                print(f"Skipping unreadable journal entry in {path}")
+                continue
+            op = entry.get('op')
+            if op in ('add', 'update'):
+                transactions[entry['t']['id']] = entry['t']
+            elif op == 'delete':
+                transactions.pop(entry['id'], None)
+            elif op == 'setting':
+                settings[entry['key']] = entry['value']
+        return True
+
+    def _load(self, profile):
+        snapshot = self._read_snapshot(profile)
+        transactions, settings = snapshot or ({}, {})
+        # Entries are absolute (full rows, deletes by id), so replaying one that a
+        # crashed compaction already folded in gives the same result.
+        found = self._replay(self._path(profile, '.journal.compacting'), transactions, settings)
+        found = self._replay(self._path(profile, '.journal'), transactions, settings) or found
+        if snapshot is None and not found:
+            return None
+        return sorted(transactions.values(), key=lambda t: t.get('date', '')), settings
+
+    def load_profile(self, profile):
+        """(transactions oldest first, settings), or None if the profile has never been saved."""
+        with self._lock(profile):
+            return self._load(profile)
+
+    def change_version(self, profile):
+        """Bumped whenever changes pulled from the cloud are written to the profile (see SQLiteStore)."""
+        with self._locks_lock:
+            return self._versions.get(profile, 0)
+
+    # --- Writes ---
+
+    def _append(self, profile, *entries):
+        data = ''.join(json.dumps(entry) + '\n' for entry in entries).encode()
+        path = self._path(profile, '.journal')
+        with self._lock(profile):
+            with open(path, 'ab') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            size = os.path.getsize(path)
+        if size >= self.compact_bytes:
+            self.compact_in_background(profile)
+
+    # The outbox entry is written before the journal line: after a crash in between,
+    # the change is pushed and comes back on the next pull instead of being lost.
+
+    def add_transaction(self, profile, t, updated_at=None, sync=False):
+        if sync:
+            self._queue(profile, 'transaction', t['id'], row_fields(t))
+        self._append(profile, {'op': 'add', 't': dict(t), 'at': updated_at})
+
+    def update_transaction(self, profile, t, updated_at=None, sync=False):
+        if sync:
+            self._queue(profile, 'transaction', t['id'], row_fields(t))
+        self._append(profile, {'op': 'update', 't': dict(t), 'at': updated_at})
+
+    def delete_transaction(self, profile, transaction_id, updated_at=None, sync=False):
+        if sync:
+            self._queue(profile, 'transaction', transaction_id, None)
+        self._append(profile, {'op': 'delete', 'id': transaction_id, 'at': updated_at})
+
+    def set_setting(self, profile, key, value, updated_at=None, sync=False):
+        if sync:
+            self._queue(profile, 'setting', key, value)
+        self._append(profile, {'op': 'setting', 'key': key, 'value': value, 'at': updated_at})
+
+    def apply_remote(self, profile, upserts, deletes, settings):
+        """Writes changes pulled from the cloud; they are not queued for sync again."""
+        entries = [{'op': 'add', 't': dict(t), 'at': None} for t in upserts]
+        entries += [{'op': 'delete', 'id': transaction_id, 'at': None} for transaction_id in deletes]
+        entries += [{'op': 'setting', 'key': key, 'value': value, 'at': None} for key, value in settings.items()]
+        if entries:
+            self._append(profile, *entries)
+            with self._locks_lock:
+                self._versions[profile] = self._versions.get(profile, 0) + 1
+
+    def _write_snapshot(self, profile, transactions, settings, updated_at, temp_suffix='.tmp'):
+        path = self._path(profile, '.json')
+        temp = path + temp_suffix
+        with open(temp, 'w') as f:
+            json.dump({
+                'profile_name': profile,
+                'last_updated': updated_at,
+                'transactions': transactions,
+                'settings': settings
+            }, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        return temp
+
+    def save_profile(self, profile, transactions, settings, updated_at=None, sync=False, schema_version=0):
+        """Replaces a whole profile with a fresh snapshot and an empty journal.
+
+        The schema stamp is written last, so a crash in between only means the
+        profile is checked again on the next load.
+        """
+        if sync:
+            self.queue_full_push(profile)
+        with self._lock(profile):
+            temp = self._write_snapshot(profile, transactions, settings, updated_at)
+            os.replace(temp, self._path(profile, '.json'))
+            self._generations[profile] = self._generations.get(profile, 0) + 1
+            for suffix in ('.journal', '.journal.compacting'):
+                if os.path.exists(self._path(profile, suffix)):
+                    os.remove(self._path(profile, suffix))
+        self.set_meta(schema_key(profile), str(schema_version))
+
+    def set_schema_version(self, profile, version, updated_at=None, sync=False):
+        """Stamps a profile that was checked and needed no changes (see SQLiteStore)."""
+        self.set_meta(schema_key(profile), str(version))
+
+    # --- Sync state ---
+
+    def _save_sync_state(self):
+        temp = self._sync_path + '.tmp'
+        with open(temp, 'w') as f:
+            json.dump({'changes': list(self._changes.values()), 'meta': self._meta}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self._sync_path)
+
+    def _queue(self, profile, kind, key, value):
+        with self._sync_lock:
+            if kind == 'profile':
+                self._changes = {k: c for k, c in self._changes.items() if k[0] != profile}
+            self._changes[(profile, kind, key)] = {'profile': profile, 'kind': kind, 'key': key,
+                                                   'value': value, 'at': utc_now_iso()}
+            self._save_sync_state()
+
+    def queue_full_push(self, profile):
+        self._queue(profile, 'profile', '', None)
+
+    def pending_changes(self):
+        with self._sync_lock:
+            return sorted((dict(c) for c in self._changes.values()), key=lambda c: c['at'])
+
+    def clear_changes(self, changes):
+        """Drops pushed changes, unless the same row or setting changed again meanwhile."""
+        with self._sync_lock:
+            for c in changes:
+                key = (c['profile'], c['kind'], c['key'])
+                if key in self._changes and self._changes[key]['at'] == c['at']:
+                    del self._changes[key]
+            self._save_sync_state()
+
+    def pending_count(self):
+        with self._sync_lock:
+            return len(self._changes)
+
+    def get_meta(self, key):
+        with self._sync_lock:
+            return self._meta.get(key)
+
+    def set_meta(self, key, value):
+        with self._sync_lock:
+            self._meta[key] = value
+            self._save_sync_state()
+
+    def schema_version(self, profile):
+        """Schema version the stored profile was last checked against; 0 if never."""
+        return int(self.get_meta(schema_key(profile)) or 0)
+
+    # --- Compaction ---
+
+    def compact_in_background(self, profile):
+        with self._locks_lock:
+            if profile in self._compacting:
+                return
+            self._compacting.add(profile)
+        threading.Thread(target=self.compact, args=(profile,), daemon=True).start()
+
+    def compact(self, profile):
+        """Folds the journal into the snapshot.
+
+        The journal is renamed aside first, so new changes keep appending to a fresh
+        one while the snapshot is written; only the final rename holds the lock. If
+        save_profile replaced the profile meanwhile, the folded snapshot is discarded.
+        """
+        journal = self._path(profile, '.journal')
+        compacting = self._path(profile, '.journal.compacting')
+        try:
+            with self._lock(profile):
+                # A `.compacting` file left by a crash is folded on its own first.
+                if not os.path.exists(compacting):
+                    if not os.path.exists(journal):
+                        return
+                    os.replace(journal, compacting)
+                snapshot = self._read_snapshot(profile)
+                generation = self._generations.get(profile, 0)
+            transactions, settings = snapshot or ({}, {})
+            self._replay(compacting, transactions, settings)
+            temp = self._write_snapshot(profile, sorted(transactions.values(), key=lambda t: t.get('date', '')),
+                                        settings, dt_now_iso(), temp_suffix='.compacting.tmp')
+            with self._lock(profile):
+                if self._generations.get(profile, 0) != generation:
+                    # save_profile wrote a newer snapshot and removed the journal being folded.
+                    os.remove(temp)
+                    return
+                os.replace(temp, self._path(profile, '.json'))
+                os.remove(compacting)
+        except Exception as e:
+            print(f"Journal compaction failed for profile '{profile}': {e}")
+        finally:
+            with self._locks_lock:
+                self._compacting.discard(profile)
+
+
+def dt_now_iso():
+    return datetime.now().isoformat()
+
+
+# COIN_TRACKER_STORAGE=journal keeps plain snapshot + journal files instead of SQLite.
+STORAGE_ENGINE = os.environ.get('COIN_TRACKER_STORAGE', 'sqlite').lower()
+JOURNAL_COMPACT_KB = int(os.environ.get('COIN_TRACKER_JOURNAL_COMPACT_KB', '256'))
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def local_store():
+    """The process-wide local store, opened on first use.
+
+    SQLite at ~/Documents/CoinTracker/coin_tracker.sqlite3 by default, or the
+    journal files in ~/Documents/CoinTracker/ with COIN_TRACKER_STORAGE=journal.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            if STORAGE_ENGINE == 'journal':
+                _store = JournalStore(data_dir(), JOURNAL_COMPACT_KB * 1024)
+            else:
+                _store = SQLiteStore(os.path.join(data_dir(), 'coin_tracker.sqlite3'))
+        return _store
@@ -0,0 +1,74 @@
+import queue
+import threading
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+class PersistenceWorker(QObject):
+    """Saves tracker changes on a background thread instead of the GUI thread.
+
+    Trackers hand their changes to `schedule()`. Changes arriving within `delay_ms`
+    of the first one are coalesced: when the timer fires (on the GUI thread), each
+    tracker turns its batch into one job via `save_job()`, taking any snapshot it
+    needs there, and the job runs on the worker thread. Jobs run one at a time, in
+    order. The outcome comes back through `saved` / `failed`, which Qt delivers on
+    the GUI thread. Call `flush()` before exiting so nothing queued is lost.
+    """
+
+    saved = pyqtSignal(str)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, delay_ms=300, parent=None):
+        super().__init__(parent)
+        self._pending = {}
+        self._jobs = queue.SimpleQueue()
+        # Jobs handed to the worker and not finished yet; flush() waits on `_idle` for zero.
+        self._outstanding = 0
+        self._idle = threading.Condition()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self.dispatch)
+        self._thread = threading.Thread(target=self._run, name='persistence', daemon=True)
+        self._thread.start()
+
+    def schedule(self, tracker, change):
+        """Queues one change; `change` is (op, args), or None for a full profile save."""
+        self._pending.setdefault(tracker, []).append(change)
+        # Not restarted on every change, so a steady stream of clicks still saves every delay_ms.
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def dispatch(self):
+        self._timer.stop()
+        pending, self._pending = self._pending, {}
+        for tracker, changes in pending.items():
+            job = tracker.save_job(changes)
+            with self._idle:
+                self._outstanding += 1
+            self._jobs.put((tracker.profile_name, job))
+
+    @property
+    def busy(self):
+        with self._idle:
+            return bool(self._pending) or self._outstanding > 0
+
+    def flush(self, timeout=10.0):
+        """Sends pending changes now and waits for the worker; returns False on timeout."""
+        self.dispatch()
+        with self._idle:
+            return self._idle.wait_for(lambda: self._outstanding == 0, timeout)
+
+    def _run(self):
+        while True:
+            profile, job = self._jobs.get()
+            try:
+                job()
+                self.saved.emit(profile)
+            except Exception as e:
+                print(f"❌ Background save failed for profile '{profile}': {e}")
+                self.failed.emit(profile, str(e))
+            finally:
+                with self._idle:
+                    self._outstanding -= 1
+                    self._idle.notify_all()
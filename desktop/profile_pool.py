@@ -0,0 +1,52 @@
+import os
+from collections import OrderedDict
+
+# How many loaded profiles are kept in memory for instant switching.
+PROFILE_CACHE_SIZE = max(1, int(os.environ.get('COIN_TRACKER_PROFILE_CACHE', '4')))
+
+
+class TrackerPool:
+    """Loaded trackers for the most recently used profiles, least recently used evicted first.
+
+    Only holds the trackers; whether a cached one is still current is up to the caller
+    (see OnlineCoinTracker.is_stale). An evicted tracker is just dropped: its changes
+    were already handed to the persistence worker, which keeps its own reference
+    until they are written.
+    """
+
+    def __init__(self, capacity=PROFILE_CACHE_SIZE):
+        self.capacity = capacity
+        self._trackers = OrderedDict()
+
+    def __contains__(self, profile):
+        return profile in self._trackers
+
+    def __iter__(self):
+        return iter(list(self._trackers.values()))
+
+    def get(self, profile):
+        """The cached tracker for `profile` (now the most recently used), or None."""
+        tracker = self._trackers.get(profile)
+        if tracker is not None:
+            self._trackers.move_to_end(profile)
+        return tracker
+
+    def add(self, tracker, recent=True):
+        """Caches a tracker; returns False if it was not added.
+
+        recent=False (for prefetches) files it as least recently used, and drops it
+        instead when the pool is full: evicting to make room would throw out either a
+        profile the user opened or the prefetch itself.
+        """
+        profile = tracker.profile_name
+        if not recent and profile not in self._trackers and len(self._trackers) >= self.capacity:
+            return False
+        self._trackers[profile] = tracker
+        self._trackers.move_to_end(profile, last=recent)
+        while len(self._trackers) > self.capacity:
+            self._trackers.popitem(last=False)
+        return True
+
+    def profiles(self):
+        """Cached profile names, most recently used first."""
+        return list(reversed(self._trackers))
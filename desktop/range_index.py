@@ -0,0 +1,91 @@
+# This file is the original; desktop/range_index.py is a copy, checked by
+# desktop/tests/test_shared_modules.py. Edit this one and copy it over.
+import bisect
+
+
+class RangeIndex:
+    """Fenwick trees over the date-ordered transactions of one profile.
+
+    Answers window totals ("earned/spent between two dates") and "balance as of a
+    timestamp" in O(log n) instead of a pass over every row. Rows are ordered by
+    their ISO date string, the same order the trackers store them in. A bare date
+    ('YYYY-MM-DD') used as an end bound covers that whole day. Rows without a date
+    sort first: they count towards balances but fall outside every window.
+    """
+
+    def __init__(self, transactions=()):
+        self.rows = sorted(transactions, key=lambda t: t.get('date', ''))
+        self.keys = [t.get('date', '') for t in self.rows]
+        self._earned = self._build([max(t.get('amount', 0), 0) for t in self.rows])
+        self._spent = self._build([min(t.get('amount', 0), 0) for t in self.rows])
+
+    def __len__(self):
+        return len(self.rows)
+
+    # --- Fenwick tree ---
+
+    @staticmethod
+    def _build(values):
+        tree = [0] + values
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        return tree
+
+    @staticmethod
+    def _prefix(tree, i):
+        total = 0
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    @classmethod
+    def _append(cls, tree, value):
+        i = len(tree)
+        # Node i covers (i - lowbit(i), i]: the new value plus the tail of what came before.
+        tree.append(value + cls._prefix(tree, i - 1) - cls._prefix(tree, i - (i & -i)))
+
+    def append(self, transaction):
+        """Adds a row; O(log n) when it is the newest, otherwise the trees are rebuilt."""
+        key = transaction.get('date', '')
+        if self.keys and key < self.keys[-1]:
+            self.__init__(self.rows + [transaction])
+            return
+        amount = transaction.get('amount', 0)
+        self.rows.append(transaction)
+        self.keys.append(key)
+        self._append(self._earned, max(amount, 0))
+        self._append(self._spent, min(amount, 0))
+
+    # --- Queries ---
+
+    @staticmethod
+    def _upper(end):
+        # A bare date sorts before any time on that day; extend it past them.
+        return end + '\uffff' if len(end) == 10 else end
+
+    def window(self, start=None, end=None):
+        """Positions [lo, hi) of the dated rows with start <= date <= end."""
+        lo = bisect.bisect_left(self.keys, start) if start else bisect.bisect_right(self.keys, '')
+        hi = bisect.bisect_right(self.keys, self._upper(end)) if end else len(self.keys)
+        return lo, max(lo, hi)
+
+    def totals(self, start=None, end=None):
+        """(earned, spent, count) for the window; spent is negative, as in /api/history."""
+        lo, hi = self.window(start, end)
+        earned = self._prefix(self._earned, hi) - self._prefix(self._earned, lo)
+        spent = self._prefix(self._spent, hi) - self._prefix(self._spent, lo)
+        return earned, spent, hi - lo
+
+    def balance_before_position(self, position):
+        return self._prefix(self._earned, position) + self._prefix(self._spent, position)
+
+    def balance_at(self, timestamp):
+        """Balance after every row dated at or before `timestamp`."""
+        return self.balance_before_position(bisect.bisect_right(self.keys, self._upper(timestamp)))
+
+    def balance_before(self, timestamp):
+        """Balance before the first row dated at or after `timestamp`."""
+        return self.balance_before_position(bisect.bisect_left(self.keys, timestamp))
@@ -0,0 +1,278 @@
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from local_store import utc_now_iso
+
+# Seconds between sync rounds when nothing nudges the worker, and the retry backoff.
+SYNC_INTERVAL = 60.0
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 300.0
+# Firestore allows at most 500 writes per batch.
+BATCH_LIMIT = 450
+# Pulls re-read this much before the cursor, so a device whose clock runs a little
+# behind doesn't push changes that sort before a cursor already taken.
+CURSOR_OVERLAP = timedelta(minutes=5)
+
+# --- Cloud layout ---
+# users/{user_id}                                    profile_names, last_active_profile
+# users/{user_id}/profiles/{profile}                 settings, last_updated, changed_at
+# users/{user_id}/profiles/{profile}/transactions/{id}
+#     id, date, amount, source, last_updated, changed_at, and deleted=True once removed
+# One document per transaction, so a change uploads that row and nothing else. Deletes
+# are kept as tombstones so other devices see them on their next pull.
+# `last_updated` is when the change was pushed; pulls page through it with a cursor,
+# so a change made offline and pushed late is still after every cursor taken before
+# the push. `changed_at` is when the change was made, and decides which side wins
+# when both changed the same row (documents from before it existed fall back to
+# last_updated). Older versions
+# kept every profile in a `profiles` map on the user document; it is moved over the
+# first time each profile syncs.
+
+
+def profile_doc_id(profile_name):
+    # Document ids can't contain '/' or be '.' / '..'.
+    return quote(profile_name, safe='').replace('.', '%2E')
+
+
+def user_ref(db, user_id):
+    return db.collection('users').document(user_id)
+
+
+def profile_ref(db, user_id, profile):
+    return user_ref(db, user_id).collection('profiles').document(profile_doc_id(profile))
+
+
+def cursor_key(user_id, profile):
+    return f"sync_cursor:{user_id}:{profile}"
+
+
+def commit_in_batches(db, writes):
+    for i in range(0, len(writes), BATCH_LIMIT):
+        batch = db.batch()
+        for ref, data in writes[i:i + BATCH_LIMIT]:
+            batch.set(ref, data, merge=True)
+        batch.commit()
+
+
+def push(db, user_id, store, delete_field, known_profiles=None):
+    """Uploads every pending change in the outbox; returns how many were pushed.
+
+    Changes are cleared only after their batch is committed, so a failure leaves them
+    queued for the next attempt.
+    """
+    changes = store.pending_changes()
+    by_profile = {}
+    for change in changes:
+        by_profile.setdefault(change['profile'], []).append(change)
+
+    for profile, profile_changes in by_profile.items():
+        ref = profile_ref(db, user_id, profile)
+        rows = ref.collection('transactions')
+        writes, settings = [], {}
+        pushed_at = utc_now_iso()
+        full = next((c for c in profile_changes if c['kind'] == 'profile'), None)
+        if full:
+            # The whole profile was replaced locally (import, repair, first sync of old
+            # data): upload every row and tombstone remote rows that are gone.
+            transactions, settings = store.load_profile(profile) or ([], {})
+            local_ids = {t['id'] for t in transactions}
+            stamp = {'last_updated': pushed_at, 'changed_at': full['at']}
+            writes += [(rows.document(t['id']), dict(t, **stamp)) for t in transactions]
+            for doc in rows.select(['deleted']).stream():
+                if doc.id not in local_ids and not (doc.to_dict() or {}).get('deleted'):
+                    writes.append((rows.document(doc.id), {'id': doc.id, 'deleted': True, **stamp}))
+        for change in profile_changes:
+            stamp = {'last_updated': pushed_at, 'changed_at': change['at']}
+            if change['kind'] == 'transaction':
+                if change['value'] is None:
+                    data = {'id': change['key'], 'deleted': True, **stamp}
+                else:
+                    data = dict(change['value'], deleted=False, **stamp)
+                writes.append((rows.document(change['key']), data))
+            elif change['kind'] == 'setting':
+                settings[change['key']] = change['value']
+        writes.append((ref, {'name': profile, 'settings': settings, 'last_updated': pushed_at,
+                             'changed_at': max(c['at'] for c in profile_changes)}))
+        commit_in_batches(db, writes)
+
+        if known_profiles is None or profile not in known_profiles:
+            register_profile(db, user_id, profile, delete_field)
+            if known_profiles is not None:
+                known_profiles.add(profile)
+        store.clear_changes(profile_changes)
+    return len(changes)
+
+
+def register_profile(db, user_id, profile, delete_field):
+    """Adds the profile to `profile_names` and drops its copy in the old `profiles` map."""
+    doc_ref = user_ref(db, user_id)
+    doc = doc_ref.get(field_paths=['profile_names'])
+    names = (doc.to_dict() or {}).get('profile_names') or [] if doc.exists else []
+    update = {'profiles': {profile: delete_field}}
+    if profile not in names:
+        update['profile_names'] = sorted(set(names) | {profile})
+    doc_ref.set(update, merge=True)
+
+
+def migrate_legacy_profile(db, user_id, store, profile):
+    """Moves a profile from the old `profiles` map into the local store and queues a full push.
+
+    Remote rows win over local ones with the same id; rows only saved locally (after
+    failed online saves in older versions) are kept.
+    """
+    doc = user_ref(db, user_id).get(field_paths=['profiles'])
+    legacy = ((doc.to_dict() or {}).get('profiles') or {}).get(profile) if doc.exists else None
+    if not legacy:
+        return False
+    rows = [t for t in legacy.get('transactions', [])
+            if isinstance(t, dict) and all(k in t for k in ('id', 'date', 'amount', 'source'))]
+    store.apply_remote(profile, [{k: t[k] for k in ('id', 'date', 'amount', 'source')} for t in rows], [],
+                       legacy.get('settings', {}))
+    # Rows from the old layout were never checked; the next load validates the profile.
+    store.set_schema_version(profile, 0)
+    store.queue_full_push(profile)
+    print(f"Moved profile '{profile}' to per-transaction cloud storage")
+    return True
+
+
+def changed_at(data):
+    return data.get('changed_at') or data.get('last_updated')
+
+
+def pull(db, user_id, store, profile):
+    """Merges remote changes to `profile` into the local store; returns True if anything changed.
+
+    Only documents pushed since the last pull (less CURSOR_OVERLAP) are read; rows
+    that already match the local copy are left alone. A remote change is skipped
+    when the same row (or setting) has a newer local change still waiting in the
+    outbox; that local change wins when it is pushed.
+    """
+    cursor = store.get_meta(cursor_key(user_id, profile))
+    ref = profile_ref(db, user_id, profile)
+    profile_doc = ref.get()
+    if cursor is None and not profile_doc.exists and migrate_legacy_profile(db, user_id, store, profile):
+        store.set_meta(cursor_key(user_id, profile), '')
+        return True
+    cursor = cursor or ''
+    since = (datetime.fromisoformat(cursor) - CURSOR_OVERLAP).isoformat() if cursor else ''
+
+    pending = {}
+    for change in store.pending_changes():
+        if change['profile'] == profile:
+            pending[(change['kind'], change['key'])] = change['at']
+    full_at = pending.get(('profile', ''), '')
+
+    def local_wins(kind, key, remote_at):
+        return max(pending.get((kind, key), ''), full_at) >= (remote_at or '')
+
+    docs = [doc.to_dict() for doc in ref.collection('transactions').where('last_updated', '>', since).stream()]
+    remote = profile_doc.to_dict() if profile_doc.exists else {}
+
+    local = {}
+    if docs:
+        transactions, _ = store.load_profile(profile) or ([], {})
+        local = {t['id']: t for t in transactions}
+    upserts, deletes = [], []
+    newest = cursor
+    for data in docs:
+        newest = max(newest, data.get('last_updated', ''))
+        transaction_id = data.get('id')
+        if not transaction_id or local_wins('transaction', transaction_id, changed_at(data)):
+            continue
+        if data.get('deleted'):
+            if transaction_id in local:
+                deletes.append(transaction_id)
+            continue
+        row = {k: data[k] for k in ('id', 'date', 'amount', 'source') if k in data}
+        if len(row) == 4 and local.get(transaction_id) != row:
+            upserts.append(row)
+
+    settings = {}
+    if remote.get('last_updated', '') > since:
+        newest = max(newest, remote['last_updated'])
+        settings = {key: value for key, value in (remote.get('settings') or {}).items()
+                    if not local_wins('setting', key, changed_at(remote))}
+        if settings:
+            current = (store.load_profile(profile) or ([], {}))[1]
+            settings = {key: value for key, value in settings.items() if current.get(key) != value}
+
+    if upserts or deletes or settings:
+        store.apply_remote(profile, upserts, deletes, settings)
+    store.set_meta(cursor_key(user_id, profile), newest)
+    return bool(upserts or deletes or settings)
+
+
+class SyncWorker(QObject):
+    """Background thread that keeps the local store and Firestore in step.
+
+    Each round pushes the outbox, then pulls remote changes for the watched profiles.
+    Rounds run every SYNC_INTERVAL seconds, or sooner after `nudge()`. After a failure
+    the next attempt waits BACKOFF_BASE * 2^n seconds (capped, with jitter), and nudges
+    don't cut that short. `status_changed` reports the pending count and the last
+    error ('' when the round worked); `remote_changed` names a profile whose local
+    copy was updated from the cloud.
+    """
+
+    status_changed = pyqtSignal(int, str)
+    remote_changed = pyqtSignal(str)
+
+    def __init__(self, db, user_id, store, delete_field, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.user_id = user_id
+        self.store = store
+        self.delete_field = delete_field
+        self.failures = 0
+        self.last_error = ''
+        self._profiles = set()
+        self._known_profiles = set()
+        self._retry_at = 0.0
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sync', daemon=True)
+        self._thread.start()
+
+    def watch(self, profile):
+        self._profiles.add(profile)
+        self.nudge()
+
+    def nudge(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+
+    def sync_once(self):
+        push(self.db, self.user_id, self.store, self.delete_field, self._known_profiles)
+        for profile in list(self._profiles):
+            if pull(self.db, self.user_id, self.store, profile):
+                self.remote_changed.emit(profile)
+        if self.store.pending_count():
+            # A first pull of old data queues a full push; send it in the same round.
+            push(self.db, self.user_id, self.store, self.delete_field, self._known_profiles)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wake.wait(SYNC_INTERVAL)
+            self._wake.clear()
+            wait = self._retry_at - time.monotonic()
+            # Backing off: a nudge only makes the retry happen as soon as it's due.
+            if self._stopping.wait(max(wait, 0)) or self._stopping.is_set():
+                break
+            try:
+                self.sync_once()
+                self.failures, self.last_error, self._retry_at = 0, '', 0.0
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (self.failures - 1)) * random.uniform(0.5, 1.0)
+                self._retry_at = time.monotonic() + delay
+                print(f"❌ Sync failed ({e}); retrying in {delay:.0f}s")
+                self._wake.set()
+            self.status_changed.emit(self.store.pending_count(), self.last_error)
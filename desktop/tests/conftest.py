@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the app's flat modules the same way coin_tracker.py does.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Read by coin_tracker at import time: no display, and no cloud sync.
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+os.environ.setdefault('FIRESTORE_BACKEND', 'none')
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def open_window(qapp, tmp_path, monkeypatch):
+    """Returns a function that seeds the Default profile in a throwaway home and opens the window on History."""
+    import local_store
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setenv('USERPROFILE', str(tmp_path))
+    monkeypatch.setattr(local_store, '_store', None)
+    windows = []
+
+    def open_with(transactions):
+        import coin_tracker
+        local_store.local_store().save_profile('Default', transactions, {}, coin_tracker.dt_now_iso(),
+                                               schema_version=coin_tracker.SCHEMA_VERSION)
+        window = coin_tracker.MainWindow()
+        windows.append(window)
+        window.show()
+        window.show_history()
+        qapp.processEvents()
+        return window
+
+    yield open_with
+    for window in windows:
+        window.close()
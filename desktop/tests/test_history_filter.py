@@ -0,0 +1,113 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import history_model
+from history_model import filter_rows
+
+SOURCES = ['Ads', 'Login', 'Shop', 'Box Draw (Single)']
+
+
+def rows(count, days=20):
+    start = datetime.now() - timedelta(days=days)
+    return [{'id': f't{i}', 'date': (start + timedelta(seconds=i * days * 86400 // count)).isoformat(),
+             'amount': -(i % 50 + 10) if SOURCES[i % 4] in ('Shop', 'Box Draw (Single)') else i % 90 + 10,
+             'source': SOURCES[i % 4]} for i in range(count)]
+
+
+def expected(data, source=None, search=''):
+    matches = [t for t in data if (source is None or t['source'] == source)
+               and (not search or search in t['source'].lower() or search in str(t['amount']))]
+    return matches, sum(t['amount'] for t in matches if t['amount'] > 0)
+
+
+@pytest.mark.parametrize('source,search', [(None, ''), ('Ads', ''), (None, 'box'), (None, '15'), ('Shop', '-1')])
+def test_filter_rows_matches_source_and_search(source, search):
+    data = rows(400)
+    assert filter_rows(data, source, search) == expected(data, source, search)
+
+
+def test_filter_rows_stops_once_cancelled():
+    checks = []
+
+    def cancelled():
+        checks.append(1)
+        return len(checks) > 1
+
+    assert filter_rows(rows(3 * history_model.CANCEL_CHECK_ROWS), cancelled=cancelled) is None
+    assert len(checks) == 2
+
+
+@pytest.fixture
+def window(open_window):
+    window = open_window(rows(2000))
+    window.date_from.setDate(window.date_from.date().addYears(-1))
+    window.filter_history()
+    return window
+
+
+def test_edits_are_debounced(window):
+    window.history_search.setText('ads')
+    assert window.history_filter_timer.isActive()
+    assert window.history_filter_timer.interval() == history_model.FILTER_DELAY_MS
+    assert window.history_model.result_count() == 2000
+
+    window.history_filter_timer.timeout.emit()
+    assert not window.history_filter_timer.isActive()
+    assert window.history_model.result_count() == 500
+
+
+def test_longer_search_only_rechecks_previous_matches(window, monkeypatch):
+    scanned = []
+    real_filter = history_model.filter_rows
+
+    def counting_filter(data, *args, **kwargs):
+        scanned.append(len(data))
+        return real_filter(data, *args, **kwargs)
+
+    monkeypatch.setattr(history_model, 'filter_rows', counting_filter)
+    for text in ('b', 'bo', 'box', 'bo'):
+        window.history_search.setText(text)
+        window.filter_history()
+    assert scanned == [2000, 500, 500, 2000]
+    assert window.history_model.result_count() == 500
+
+
+def test_source_list_is_rebuilt_only_when_sources_change(window, monkeypatch):
+    combo = window.history_source_filter
+    assert [combo.itemText(i) for i in range(combo.count())] == ['All Sources'] + sorted(SOURCES)
+    cleared = []
+    monkeypatch.setattr(combo, 'clear', lambda: cleared.append(1))
+
+    window.tracker.add_transaction(5, 'Ads')
+    window.filter_history()
+    assert cleared == []
+    monkeypatch.undo()
+
+    combo.setCurrentText('Ads')
+    window.tracker.add_transaction(5, 'Event Reward')
+    window.filter_history()
+    assert 'Event Reward' in [combo.itemText(i) for i in range(combo.count())]
+    assert combo.currentText() == 'Ads'
+
+
+def test_background_filter_result_is_dropped_when_superseded(window, qapp, monkeypatch):
+    monkeypatch.setattr(history_model, 'THREAD_ROWS', 100)
+    window.history_search.setText('ads')
+    window.filter_history()
+    assert window.period_summary.text() == "Filtering…"
+    window.history_search.setText('login')
+    window.filter_history()
+
+    deadline = time.monotonic() + 10
+    while window.period_summary.text() == "Filtering…" and time.monotonic() < deadline:
+        qapp.processEvents()
+        time.sleep(0.001)
+    # Let a late result from the first filter arrive; it must not replace the second.
+    time.sleep(0.05)
+    qapp.processEvents()
+
+    assert window.history_result['search'] == 'login'
+    assert window.history_model.result_count() == 500
+    assert {window.history_model.data(window.history_model.index(r, 2)) for r in range(200)} == {'Login'}
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+from PyQt5.QtCore import QModelIndex, Qt
+
+import history_model
+from history_model import FETCH_BATCH, HistoryModel
+
+PALETTE = {'success': '#00aa00', 'danger': '#aa0000'}
+
+
+def rows(count, start=None):
+    start = start or datetime.now() - timedelta(days=20)
+    return [{'id': f't{i}', 'date': (start + timedelta(minutes=i)).isoformat(),
+             'amount': -5 if i % 3 == 0 else 1200, 'source': 'Shop' if i % 3 == 0 else 'Ads'}
+            for i in range(count)]
+
+
+def test_rows_are_handed_to_the_view_in_batches(qapp):
+    model = HistoryModel()
+    model.set_rows(rows(450), {})
+    assert (model.rowCount(), model.result_count()) == (FETCH_BATCH, 450)
+    assert model.transaction_id(FETCH_BATCH) is None
+
+    while model.canFetchMore(QModelIndex()):
+        model.fetchMore(QModelIndex())
+    assert model.rowCount() == 450
+    assert model.transaction_id(449) == 't449'
+
+
+def test_cells_are_formatted_when_asked_for(qapp):
+    model = HistoryModel()
+    model.set_palette(PALETTE)
+    data = rows(2, start=datetime(2024, 3, 5, 14, 30))
+    model.set_rows(data, {'t0': 95, 't1': 1295})
+
+    def cell(row, column, role=Qt.DisplayRole):
+        return model.data(model.index(row, column), role)
+
+    assert cell(0, 0) == "Mar 05, 2024, 02:30 PM"
+    assert [cell(0, c) for c in (1, 2, 3, 4)] == ["💸 Expense", "Shop", "-5", "95"]
+    assert [cell(1, c) for c in (1, 3, 4)] == ["💰 Income", "+1,200", "1,295"]
+    assert cell(1, 3, Qt.ForegroundRole).name() == PALETTE['success']
+    assert cell(0, 3, Qt.ForegroundRole).name() == PALETTE['danger']
+    assert history_model.format_date('not a date') == "Invalid Date"
+
+
+def test_history_page_lists_newest_first_and_follows_changes(open_window, qapp):
+    window = open_window(rows(450))
+    window.date_from.setDate(window.date_from.date().addYears(-1))
+    window.filter_history()
+    model = window.history_model
+    assert model.result_count() == 450
+    assert model.rowCount() == FETCH_BATCH
+    assert model.transaction_id(0) == 't449'
+    balance_after = model.data(model.index(0, 4))
+
+    window.tracker.add_transaction(7, 'Ads')
+    window.update_all_data()
+    qapp.processEvents()
+    assert model.result_count() == 451
+    assert model.data(model.index(0, 3)) == "+7"
+    assert model.data(model.index(1, 4)) == balance_after
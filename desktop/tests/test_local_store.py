@@ -0,0 +1,87 @@
+import json
+import os
+
+from local_store import JournalStore, SQLiteStore
+
+
+def row(i, amount=10):
+    return {'id': f't{i}', 'date': f'2024-01-{i + 1:02d}T10:00:00', 'amount': amount, 'source': 'Ads'}
+
+
+def test_compaction_folds_journal_into_snapshot(tmp_path):
+    store = JournalStore(str(tmp_path))
+    store.save_profile('P', [row(0)], {'goal': 5})
+    store.add_transaction('P', row(1))
+    store.update_transaction('P', row(0, amount=20))
+    store.set_setting('P', 'goal', 7)
+
+    store.compact('P')
+
+    assert not os.path.exists(tmp_path / 'P.journal')
+    assert not os.path.exists(tmp_path / 'P.journal.compacting')
+    assert JournalStore(str(tmp_path)).load_profile('P') == ([row(0, amount=20), row(1)], {'goal': 7})
+
+
+def test_compaction_does_not_overwrite_a_concurrent_save(tmp_path, monkeypatch):
+    store = JournalStore(str(tmp_path))
+    store.save_profile('P', [row(0)], {})
+    store.add_transaction('P', row(1))
+
+    # save_profile runs while the compaction folds the journal outside the lock.
+    replay = store._replay
+    saved = []
+
+    def save_during_compaction(path, transactions, settings):
+        found = replay(path, transactions, settings)
+        if path.endswith('.journal.compacting') and not saved:
+            saved.append(True)
+            store.save_profile('P', [row(5)], {'goal': 1})
+        return found
+
+    monkeypatch.setattr(store, '_replay', save_during_compaction)
+    store.compact('P')
+
+    assert store.load_profile('P') == ([row(5)], {'goal': 1})
+    assert sorted(os.listdir(tmp_path)) == ['P.json', 'sync.state']
+
+
+def test_json_import_keeps_good_rows_and_retries_failed_files(tmp_path):
+    rows = [row(0), dict(row(1), amount='oops'), {k: v for k, v in row(2).items() if k != 'id'}, 'junk']
+    (tmp_path / 'Main.json').write_text(json.dumps({'transactions': rows, 'settings': {'goal': 3}}))
+    (tmp_path / 'Broken.json').write_text('{"transactions": [')
+
+    store = SQLiteStore(str(tmp_path / 'coin_tracker.sqlite3'))
+    transactions, settings = store.load_profile('Main')
+    assert [t['amount'] for t in transactions] == [10, 10]
+    assert transactions[0]['id'] == 't0' and transactions[1]['id']
+    assert settings == {'goal': 3}
+    # Left unstamped, so the first load runs the full check.
+    assert store.schema_version('Main') == 0
+    assert store.get_meta('json_imported') is None
+
+    store.add_transaction('Main', row(3))
+    (tmp_path / 'Broken.json').write_text(json.dumps({'transactions': [row(5)]}))
+    store = SQLiteStore(str(tmp_path / 'coin_tracker.sqlite3'))
+    assert len(store.load_profile('Main')[0]) == 3
+    assert store.load_profile('Broken')[0] == [row(5)]
+    assert store.get_meta('json_imported') == '1'
+
+
+def test_torn_last_journal_line_is_dropped_and_truncated(tmp_path):
+    store = JournalStore(str(tmp_path))
+    store.add_transaction('Main', row(0))
+    store.add_transaction('Main', row(1))
+    journal = tmp_path / 'Main.journal'
+    complete = journal.read_bytes()
+    # A crash in the middle of the third append.
+    with open(journal, 'ab') as f:
+        f.write(json.dumps({'op': 'add', 't': row(2)}).encode()[:25])
+
+    transactions, _ = JournalStore(str(tmp_path)).load_profile('Main')
+    assert [t['id'] for t in transactions] == ['t0', 't1']
+    assert journal.read_bytes() == complete
+
+    # Appends after the reload start on a line of their own.
+    reopened = JournalStore(str(tmp_path))
+    reopened.add_transaction('Main', row(3))
+    assert [t['id'] for t in reopened.load_profile('Main')[0]] == ['t0', 't1', 't3']
@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+
+
+class FakeTracker:
+    """Records the batches the worker asks for; each job appends its changes to `written`."""
+
+    def __init__(self, profile_name, written, job=None):
+        self.profile_name = profile_name
+        self.batches = []
+        self._written = written
+        self._job = job
+
+    def save_job(self, changes):
+        self.batches.append(changes)
+
+        def job():
+            if self._job:
+                self._job()
+            self._written.append((self.profile_name, changes))
+        return job
+
+
+@pytest.fixture
+def worker(qapp):
+    from persistence import PersistenceWorker
+    worker = PersistenceWorker(delay_ms=300)
+    yield worker
+    worker.flush()
+
+
+def test_changes_within_the_delay_are_saved_as_one_batch(qapp, worker):
+    from PyQt5.QtTest import QTest
+    written = []
+    tracker = FakeTracker('P', written)
+    worker.schedule(tracker, 'a')
+    QTest.qWait(100)
+    worker.schedule(tracker, 'b')
+    assert tracker.batches == []
+
+    QTest.qWait(400)
+    worker.flush()
+    assert tracker.batches == [['a', 'b']]
+    assert written == [('P', ['a', 'b'])]
+
+
+def test_jobs_run_one_at_a_time_in_order(worker):
+    written = []
+    release = threading.Event()
+    slow = FakeTracker('A', written, job=release.wait)
+    fast = FakeTracker('B', written)
+    worker.schedule(slow, 'a')
+    worker.dispatch()
+    worker.schedule(fast, 'b')
+    worker.dispatch()
+
+    # The first job is still blocked, so a short flush gives up.
+    assert not worker.flush(timeout=0.05)
+    assert worker.busy
+    release.set()
+    assert worker.flush()
+    assert written == [('A', ['a']), ('B', ['b'])]
+    assert not worker.busy
+
+
+def test_failed_save_is_shown_as_a_toast(qapp, open_window, monkeypatch):
+    window = open_window([])
+    toasts = []
+    monkeypatch.setattr(window, 'show_toast', lambda message, type='success': toasts.append((message, type)))
+
+    def fail():
+        raise OSError('disk full')
+
+    window.saver.schedule(FakeTracker('Default', [], job=fail), 'a')
+    assert window.saver.flush()
+    # `failed` is emitted on the worker thread and delivered on the GUI thread.
+    qapp.processEvents()
+    assert toasts == [("Couldn't save 'Default': disk full", 'error')]
+
+
+def test_closing_the_window_writes_queued_changes(open_window):
+    import local_store
+    window = open_window([])
+    window.tracker.add_transaction(25, 'Ads')
+    assert window.saver.busy
+
+    window.close()
+    transactions, _ = local_store.local_store().load_profile('Default')
+    assert [t['amount'] for t in transactions] == [25]
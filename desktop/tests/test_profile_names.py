@@ -0,0 +1,45 @@
+import pytest
+
+import fake_firestore
+
+
+@pytest.fixture
+def cloud(tmp_path, monkeypatch):
+    """An in-memory Firestore as the configured backend, with a throwaway local store."""
+    import coin_tracker
+    import local_store
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setenv('USERPROFILE', str(tmp_path))
+    monkeypatch.setattr(local_store, '_store', None)
+    db = fake_firestore.FakeFirestore()
+    monkeypatch.setattr(coin_tracker, 'FIRESTORE_BACKEND', 'memory')
+    monkeypatch.setattr(coin_tracker, '_memory_db', db)
+    return db
+
+
+def test_profile_names_are_backfilled_once(cloud, monkeypatch):
+    import coin_tracker
+    import local_store
+    user = cloud.collection('users').document('u')
+    # Saved before profile_names existed.
+    user.set({'profiles': {'Default': {'transactions': []}, 'Work': {'transactions': []}}})
+    reads = []
+    get = fake_firestore.FakeDocument.get
+
+    def recording_get(doc, field_paths=None, transaction=None):
+        reads.append(field_paths)
+        return get(doc, field_paths=field_paths, transaction=transaction)
+
+    monkeypatch.setattr(fake_firestore.FakeDocument, 'get', recording_get)
+
+    assert coin_tracker.OnlineCoinTracker.get_profile_names('u') == ['Default', 'Work']
+    assert reads == [['profile_names'], None]
+    assert user.get().to_dict()['profile_names'] == ['Default', 'Work']
+
+    del reads[:]
+    writes = cloud.ops['write']
+    assert coin_tracker.OnlineCoinTracker.get_profile_names('u') == ['Default', 'Work']
+    assert reads == [['profile_names']]
+    assert cloud.ops['write'] == writes
+    # Cached for the next start, which opens before the network is up.
+    assert local_store.local_store().get_meta('profile_names:u') == '["Default", "Work"]'
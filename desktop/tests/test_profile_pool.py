@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+from profile_pool import TrackerPool
+
+
+def tracker(profile):
+    return SimpleNamespace(profile_name=profile)
+
+
+def test_least_recently_used_tracker_is_evicted_first():
+    pool = TrackerPool(capacity=3)
+    for profile in ('A', 'B', 'C'):
+        pool.add(tracker(profile))
+    pool.get('A')
+    pool.add(tracker('D'))
+    assert pool.profiles() == ['D', 'A', 'C']
+    assert 'B' not in pool
+
+
+def test_prefetch_is_filed_last_and_never_evicts_an_opened_profile():
+    pool = TrackerPool(capacity=3)
+    pool.add(tracker('A'))
+    assert pool.add(tracker('P'), recent=False)
+    pool.add(tracker('B'))
+    assert pool.profiles() == ['B', 'A', 'P']
+
+    # Full: a further prefetch is dropped rather than pushing out A, B or P.
+    assert not pool.add(tracker('Q'), recent=False)
+    assert pool.profiles() == ['B', 'A', 'P']
+    # A profile the user opens still takes the least recently used slot.
+    pool.add(tracker('C'))
+    assert pool.profiles() == ['C', 'B', 'A']
+
+
+def test_switching_back_to_a_stale_profile_reloads_it_from_the_store(open_window):
+    import coin_tracker
+    import local_store
+    window = open_window([])
+    store = local_store.local_store()
+    store.save_profile('Side', [{'id': 's1', 'date': '2024-01-01T10:00:00', 'amount': 5, 'source': 'Ads'}], {},
+                       schema_version=coin_tracker.SCHEMA_VERSION)
+    window.change_profile('Side')
+    side = window.tracker
+    window.change_profile('Default')
+
+    # A pull lands while Side sits in the pool.
+    store.apply_remote('Side', [{'id': 's2', 'date': '2024-01-02T10:00:00', 'amount': 7, 'source': 'Ads'}], [], {})
+    assert side.is_stale()
+    window.change_profile('Side')
+
+    assert window.tracker is side
+    assert not side.is_stale()
+    assert sorted(t['amount'] for t in side.transactions) == [5, 7]
@@ -0,0 +1,113 @@
+import json
+
+import pytest
+
+WRITES = ('save_profile', 'set_schema_version', 'add_transaction', 'update_transaction', 'delete_transaction',
+          'set_setting')
+
+
+def row(i):
+    return {'id': f't{i}', 'date': f'2024-01-{i + 1:02d}T10:00:00', 'amount': 10, 'source': 'Ads'}
+
+
+def recording(store, name):
+    method = getattr(store, name)
+
+    def record(*args, **kwargs):
+        store.writes.append(name)
+        return method(*args, **kwargs)
+    return record
+
+
+@pytest.fixture(params=['sqlite', 'journal'])
+def store(request, tmp_path, monkeypatch):
+    """The local store in a throwaway home, with its writes recorded in `store.writes`."""
+    import local_store
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setenv('USERPROFILE', str(tmp_path))
+    monkeypatch.setattr(local_store, 'STORAGE_ENGINE', request.param)
+    monkeypatch.setattr(local_store, '_store', None)
+    store = local_store.local_store()
+    store.writes = []
+    for name in WRITES:
+        monkeypatch.setattr(store, name, recording(store, name))
+    return store
+
+
+@pytest.fixture
+def validations(monkeypatch):
+    """Counts full checks run by trackers."""
+    import coin_tracker
+    calls = []
+    check = coin_tracker.OnlineCoinTracker.validate_and_fix_data
+
+    def counting(self):
+        calls.append(self.profile_name)
+        return check(self)
+
+    monkeypatch.setattr(coin_tracker.OnlineCoinTracker, 'validate_and_fix_data', counting)
+    return calls
+
+
+def load(profile='Default'):
+    import coin_tracker
+    return coin_tracker.OnlineCoinTracker(profile, refresh=False, connect=False)
+
+
+def test_stamped_profile_is_trusted_as_stored(store, validations):
+    import coin_tracker
+    # Validation would replace these quick actions; a current stamp means it never looks.
+    store.save_profile('Default', [row(0), row(1)], {'quick_actions': 'broken'},
+                       schema_version=coin_tracker.SCHEMA_VERSION)
+    store.writes.clear()
+
+    tracker = load()
+    assert validations == []
+    assert store.writes == []
+    assert tracker.settings['quick_actions'] == 'broken'
+    assert tracker.balance_after == {'t0': 10, 't1': 20}
+
+
+@pytest.mark.parametrize('stamp', ['outdated', 'missing'])
+def test_clean_unstamped_profile_is_checked_and_only_stamped(store, validations, stamp):
+    import coin_tracker
+    if stamp == 'outdated':
+        store.save_profile('Default', [row(0)], {}, schema_version=coin_tracker.SCHEMA_VERSION - 1)
+    else:
+        store.add_transaction('Default', row(0))
+    store.writes.clear()
+
+    load()
+    assert validations == ['Default']
+    assert store.writes == ['set_schema_version']
+    assert store.schema_version('Default') == coin_tracker.SCHEMA_VERSION
+
+    load()
+    assert validations == ['Default']
+
+
+def test_outdated_profile_needing_repairs_is_written_once(store, validations):
+    import coin_tracker
+    store.save_profile('Default', [row(0)], {'quick_actions': 'broken'}, schema_version=0)
+    store.writes.clear()
+
+    tracker = load()
+    assert validations == ['Default']
+    assert store.writes == ['save_profile']
+    assert isinstance(tracker.settings['quick_actions'], list)
+    assert store.schema_version('Default') == coin_tracker.SCHEMA_VERSION
+
+
+def test_clean_import_is_written_to_the_store(store, validations, tmp_path):
+    import coin_tracker
+    path = tmp_path / 'export.json'
+    path.write_text(json.dumps({'transactions': [row(0), row(1)], 'settings': {'goal': 500}}))
+    tracker = load()
+    store.writes.clear()
+
+    assert tracker.import_data(str(path))
+    assert store.writes == ['save_profile']
+    transactions, settings = store.load_profile('Default')
+    assert [t['id'] for t in transactions] == ['t0', 't1']
+    assert settings['goal'] == 500
+    assert store.schema_version('Default') == coin_tracker.SCHEMA_VERSION
@@ -0,0 +1,17 @@
+import os
+
+import pytest
+
+DESKTOP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WEB_DIR = os.path.join(os.path.dirname(DESKTOP_DIR), 'web')
+
+# Copied from web/ so the desktop build stays self-contained; web/ is the one to edit.
+SHARED_MODULES = ['fake_firestore.py', 'range_index.py']
+
+
+@pytest.mark.parametrize('name', SHARED_MODULES)
+def test_copy_matches_web(name):
+    if not os.path.isdir(WEB_DIR):
+        pytest.skip("web/ is not checked out")
+    with open(os.path.join(WEB_DIR, name), 'rb') as web, open(os.path.join(DESKTOP_DIR, name), 'rb') as desktop:
+        assert desktop.read() == web.read(), f"desktop/{name} differs from web/{name}; copy web/{name} over it"
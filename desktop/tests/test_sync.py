@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import fake_firestore
+import local_store
+import sync
+from local_store import SQLiteStore
+
+
+@pytest.fixture
+def db():
+    return fake_firestore.FakeFirestore()
+
+
+@pytest.fixture
+def device(tmp_path):
+    def open_store(name):
+        return SQLiteStore(str(tmp_path / name / 'coin_tracker.sqlite3'))
+    return open_store
+
+
+def row(transaction_id, amount=1, date='2024-01-01T00:00:00'):
+    return {'id': transaction_id, 'date': date, 'amount': amount, 'source': 'Ads'}
+
+
+def sync_round(db, store, profile='Default'):
+    sync.push(db, 'u', store, fake_firestore.DELETE_FIELD)
+    sync.pull(db, 'u', store, profile)
+
+
+def ids(store, profile='Default'):
+    return sorted(t['id'] for t in store.load_profile(profile)[0])
+
+
+def test_offline_edit_pushed_late_reaches_device_that_synced_since(db, device, monkeypatch):
+    a, b = device('a'), device('b')
+    a.add_transaction('Default', row('t0'), sync=True)
+    sync_round(db, a)
+    sync_round(db, b)
+
+    # A edits offline, an hour before B's next change is synced.
+    an_hour_ago = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+    monkeypatch.setattr(local_store, 'utc_now_iso', lambda: an_hour_ago)
+    a.add_transaction('Default', row('tA'), sync=True)
+    monkeypatch.undo()
+
+    b.add_transaction('Default', row('tB'), sync=True)
+    sync_round(db, b)
+    # A comes back online and pushes its old edit.
+    sync_round(db, a)
+    sync_round(db, b)
+
+    assert ids(a) == ['t0', 'tA', 'tB']
+    assert ids(b) == ['t0', 'tA', 'tB']
+
+
+def test_newer_pending_local_edit_beats_remote_change(db, device):
+    a, b = device('a'), device('b')
+    a.add_transaction('Default', row('t0', 1), sync=True)
+    sync_round(db, a)
+    sync_round(db, b)
+
+    a.update_transaction('Default', row('t0', 2), sync=True)
+    sync_round(db, a)
+    b.update_transaction('Default', row('t0', 3), sync=True)
+    # B's edit is newer and still in its outbox: the pull must not overwrite it.
+    sync.pull(db, 'u', b, 'Default')
+    assert b.load_profile('Default')[0][0]['amount'] == 3
+    sync_round(db, b)
+    sync_round(db, a)
+    assert a.load_profile('Default')[0][0]['amount'] == 3
+
+
+def test_delete_travels_as_tombstone(db, device):
+    a, b = device('a'), device('b')
+    a.add_transaction('Default', row('t0'), sync=True)
+    a.add_transaction('Default', row('t1'), sync=True)
+    sync_round(db, a)
+    sync_round(db, b)
+
+    a.delete_transaction('Default', 't0', sync=True)
+    sync_round(db, a)
+    sync_round(db, b)
+
+    assert ids(b) == ['t1']
+    doc = sync.profile_ref(db, 'u', 'Default').collection('transactions').document('t0').get()
+    assert doc.to_dict()['deleted'] is True
+
+
+def test_settings_sync_and_failed_push_stays_queued(db, device, monkeypatch):
+    a, b = device('a'), device('b')
+    a.set_setting('Default', 'goal', 900, sync=True)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('network down')
+    monkeypatch.setattr(sync, 'commit_in_batches', fail)
+    with pytest.raises(RuntimeError):
+        sync.push(db, 'u', a, fake_firestore.DELETE_FIELD)
+    assert a.pending_count() == 1
+    monkeypatch.undo()
+
+    sync_round(db, a)
+    assert a.pending_count() == 0
+    sync_round(db, b)
+    assert b.load_profile('Default')[1] == {'goal': 900}
+
+
+def test_legacy_profile_is_moved_and_pushed(db, device):
+    sync.user_ref(db, 'u').set({'profiles': {'Old': {
+        'transactions': [row('legacy', 5), {'id': 'broken'}], 'settings': {'goal': 50}}}})
+    a = device('a')
+    a.set_schema_version('Old', 1)
+
+    worker = sync.SyncWorker(db, 'u', a, fake_firestore.DELETE_FIELD)
+    try:
+        worker._profiles.add('Old')
+        worker.sync_once()
+    finally:
+        worker.stop()
+
+    assert ids(a, 'Old') == ['legacy']
+    # Old-layout rows were never checked, so the next load validates them.
+    assert a.schema_version('Old') == 0
+    assert a.pending_count() == 0
+    assert 'Old' not in (sync.user_ref(db, 'u').get().to_dict().get('profiles') or {})
+    remote = sync.profile_ref(db, 'u', 'Old').collection('transactions').document('legacy').get()
+    assert remote.to_dict()['amount'] == 5
@@ -1,18 +1,33 @@
 import os
+import importlib.util
+import threading
+import time
 import uuid
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from urllib.parse import quote, unquote
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, Response
 from datetime import datetime, date, timedelta, timezone
 from collections import defaultdict
 from functools import wraps
 from werkzeug.security import generate_password_hash, check_password_hash
+from session_store import init_session_store, regenerate_session, session_byte_limit, session_payload_size
+from config_cache import AppConfigCache
+from json_provider import init_json_provider
+from compression import init_compression
+from instrumented_firestore import InstrumentedClient
+from metrics import MetricsRegistry, init_metrics
+from firestore_trace import init_firestore_trace
+from write_coalescer import AppendCoalescer
+from range_index import RangeIndex
+from lazy_client import LazyClient
+import compaction
+import fake_firestore
 
 # --- Firebase Initialization ---
-try:
-    import firebase_admin
-    from firebase_admin import credentials, firestore
-    FIREBASE_AVAILABLE = True
-except ImportError:
-    FIREBASE_AVAILABLE = False
+# firebase_admin pulls in grpc and google-cloud, which takes a large share of the
+# start-up time, so it is only imported when the client is first needed.
+FIREBASE_LIBRARY_FOUND = importlib.util.find_spec('firebase_admin') is not None
 
 app = Flask(__name__,
     template_folder='templates',
@@ -20,12 +35,53 @@ app = Flask(__name__,
 )
 app.secret_key = os.environ.get('SECRET_KEY', 'a-very-secret-key-for-dev')
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=7)
+init_json_provider(app)
+
+metrics_registry = MetricsRegistry()
+init_metrics(app, metrics_registry)
+init_compression(app)
+init_firestore_trace(app)
+
+# FIRESTORE_BACKEND=memory swaps in the in-process fake (no credentials or network needed);
+# FIRESTORE_BACKEND=none forces offline mode even when credentials are present.
+FIRESTORE_BACKEND = os.environ.get('FIRESTORE_BACKEND', 'firebase')
+FIREBASE_REQUIRED_ENV_VARS = ['FIREBASE_PROJECT_ID', 'FIREBASE_PRIVATE_KEY', 'FIREBASE_CLIENT_EMAIL']
+DELETE_FIELD = fake_firestore.DELETE_FIELD
+
+
+def firebase_configured():
+    return all(os.getenv(key) for key in FIREBASE_REQUIRED_ENV_VARS) or os.path.exists('firebase-key.json')
+
+
+if FIRESTORE_BACKEND == 'memory':
+    FIREBASE_AVAILABLE = True
+elif FIRESTORE_BACKEND != 'firebase':
+    FIREBASE_AVAILABLE = False
+    print(f"⚠️ FIRESTORE_BACKEND={FIRESTORE_BACKEND}. Running in offline mode.")
+elif not FIREBASE_LIBRARY_FOUND:
+    FIREBASE_AVAILABLE = False
+    print("⚠️ Firebase library not found. Running in offline mode.")
+elif not firebase_configured():
+    FIREBASE_AVAILABLE = False
+    print("❌ Firebase init error: No Firebase configuration found. Set environment variables or provide firebase-key.json.")
+else:
+    FIREBASE_AVAILABLE = True
+
+
+def connect_firestore():
+    """Creates the Firestore client; called once, on first use of `db`."""
+    global FIREBASE_AVAILABLE, DELETE_FIELD
+    if not FIREBASE_AVAILABLE:
+        return None
+    if FIRESTORE_BACKEND == 'memory':
+        print("🧪 Using in-memory Firestore (data is lost on restart)")
+        return InstrumentedClient(fake_firestore.from_environment())
 
-db = None
-if FIREBASE_AVAILABLE:
     try:
-        required_env_vars = ['FIREBASE_PROJECT_ID', 'FIREBASE_PRIVATE_KEY', 'FIREBASE_CLIENT_EMAIL']
-        if all(os.getenv(key) for key in required_env_vars):
+        import firebase_admin
+        from firebase_admin import credentials, firestore
+
+        if all(os.getenv(key) for key in FIREBASE_REQUIRED_ENV_VARS):
             print("Attempting to initialize Firebase with environment variables...")
             private_key = os.getenv('FIREBASE_PRIVATE_KEY').replace('\\n', '\n')
             firebase_config = {
@@ -41,24 +97,46 @@ if FIREBASE_AVAILABLE:
             }
             cred = credentials.Certificate(firebase_config)
             print("Firebase credentials loaded from environment.")
-        elif os.path.exists('firebase-key.json'):
+        else:
             print("Attempting to initialize Firebase with firebase-key.json...")
             cred = credentials.Certificate('firebase-key.json')
             print("Firebase credentials loaded from file.")
-        else:
-            raise Exception("No Firebase configuration found. Set environment variables or provide firebase-key.json.")
-        
+
         if not firebase_admin._apps:
             firebase_admin.initialize_app(cred)
-        
-        db = firestore.client()
+
+        client = InstrumentedClient(firestore.client())
+        DELETE_FIELD = firestore.DELETE_FIELD
         print("✅ Firebase initialized successfully")
+        return client
     except Exception as e:
         print(f"❌ Firebase init error: {e}")
-        db = None
         FIREBASE_AVAILABLE = False
-else:
-    print("⚠️ Firebase library not found. Running in offline mode.")
+        if not SESSION_BACKEND:
+            # The session backend stays as configured: swapping it now would drop the
+            # sessions of requests already in flight.
+            print("⚠️ Offline profiles are kept in the session; set SESSION_BACKEND=sqlite if they outgrow the cookie")
+        return None
+
+
+# Falsy when offline; the client is built by whichever request touches it first.
+db = LazyClient(connect_firestore)
+
+# --- Session Storage ---
+# Offline mode keeps whole profiles in the session, which outgrows a signed cookie
+# after a few dozen transactions, so it defaults to the server-side store. The backend
+# is chosen once, here, from the configuration; a Firestore client that later fails to
+# connect doesn't change it.
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND')
+init_session_store(app, SESSION_BACKEND or ('cookie' if FIREBASE_AVAILABLE else 'sqlite'))
+
+# --- App Config Cache ---
+# Broadcast and other app_config documents change only when an admin edits them.
+app_config = AppConfigCache(db.get, ttl=int(os.environ.get('APP_CONFIG_TTL', 300)))
+metrics_registry.register_cache('app_config', app_config)
+
+# Small pool for independent Firestore reads that one request can overlap.
+io_pool = ThreadPoolExecutor(max_workers=int(os.environ.get('IO_POOL_WORKERS', 8)), thread_name_prefix='io')
 
 # --- Login Decorator ---
 def login_required(f):
@@ -90,7 +168,8 @@ def dt_now_iso():
     return datetime.now(timezone.utc).isoformat()
 
 # --- Achievement Calculation Function ---
-def calculate_achievements(transactions, balance, goal):
+def calculate_achievements(transactions, balance, goal, checkpoints=()):
+    """`checkpoints` stand in for compacted months (see compaction.summarize_month)."""
     achievements = []
     today = datetime.now(timezone.utc).date()
 
@@ -132,6 +211,8 @@ def calculate_achievements(transactions, balance, goal):
         login_dates = set()
         for t in login_transactions:
             login_dates.add(datetime.fromisoformat(t['date'].replace('Z', '+00:00')).date())
+        for cp in checkpoints:
+            login_dates.update(date.fromisoformat(day) for day in cp.get('login_days', []))
 
         streak = 0
         if today in login_dates:
@@ -160,14 +241,21 @@ def calculate_achievements(transactions, balance, goal):
             if t.get('amount', 0) < 0:
                 last_spend_date = datetime.fromisoformat(t['date'].replace('Z', '+00:00')).date()
                 break
+        if last_spend_date is None:
+            archived_spends = [cp['last_spend_date'] for cp in checkpoints if cp.get('last_spend_date')]
+            if archived_spends:
+                last_spend_date = datetime.fromisoformat(max(archived_spends).replace('Z', '+00:00')).date()
         
         no_spend_days = 0
         if last_spend_date:
             no_spend_days = (today - last_spend_date).days
         else:
             # Never spent? That's a full streak!
+            first_dates = [cp['first_date'] for cp in checkpoints if cp.get('first_date')]
             if sorted_tx: # Check if there are any transactions at all
-                 first_tx_date = datetime.fromisoformat(sorted_tx[0]['date'].replace('Z', '+00:00')).date()
+                first_dates.append(sorted_tx[0]['date'])
+            if first_dates:
+                 first_tx_date = datetime.fromisoformat(min(first_dates).replace('Z', '+00:00')).date()
                  no_spend_days = (today - first_tx_date).days
             
         if no_spend_days >= 7:
@@ -183,6 +271,64 @@ def calculate_achievements(transactions, balance, goal):
 # --- END NEW FUNCTION ---
 
 
+def make_transaction(amount, source, date=None):
+    return {"id": str(uuid.uuid4()), "date": date or dt_now_iso(), "amount": int(amount), "source": source}
+
+# --- Running Balances ---
+# previous_balance is derived from prefix sums when rows are read and never stored:
+# a stored copy meant an insert or edit with an old date rewrote every later row.
+DERIVED_FIELDS = ('previous_balance',)
+
+def stored_row(t):
+    if any(field in t for field in DERIVED_FIELDS):
+        return {k: v for k, v in t.items() if k not in DERIVED_FIELDS}
+    return t
+
+def balances_before(transactions, opening=0):
+    """Maps each transaction id to the balance just before it, in date order."""
+    balances = {}
+    balance = opening
+    for t in sorted(transactions, key=lambda x: x.get('date', '')):
+        balances[t.get('id')] = balance
+        balance += t.get('amount', 0)
+    return balances
+
+# --- Schema Version ---
+# Saved profiles are stamped with the schema_version they were checked against.
+# get_data only runs validate_data on profiles with an older (or no) stamp, then
+# writes them back once with the current one; stamped profiles are trusted as read.
+# Bump it when validate_data learns something new, so every profile is checked again.
+SCHEMA_VERSION = 1
+
+# --- Profile Storage Layout ---
+# 'nested' keeps every profile inside user_data/{uid}.profiles (what the Android app
+# reads). 'split' stores each profile in user_data/{uid}/profiles/{name} and keeps
+# only the profile names and last_active_profile in user_data/{uid}; users are moved
+# over the first time one of their profiles is read.
+PROFILE_LAYOUT = os.environ.get('PROFILE_LAYOUT', 'nested')
+
+# Small fields of user_data/{uid} that can be read with a field mask instead of
+# downloading every profile's history.
+METADATA_FIELDS = ['last_active_profile', 'profile_names']
+
+def profile_doc_id(profile_name):
+    # Document ids can't contain '/' or be '.' / '..'.
+    return quote(profile_name, safe='').replace('.', '%2E')
+
+# --- Checkpoint Compaction ---
+# With COMPACTION_HORIZON_DAYS > 0, saving a profile folds transactions from months
+# older than the horizon into one checkpoint per month (totals, per-source totals,
+# opening/closing balance) stored with the profile, and moves the rows themselves to
+# a cold archive. 0 (the default) leaves every transaction in the profile.
+COMPACTION_HORIZON_DAYS = int(os.environ.get('COMPACTION_HORIZON_DAYS', 0))
+
+def profile_totals(profile):
+    """(transaction count, balance) of a stored profile, compacted months included."""
+    txns = profile.get('transactions', [])
+    checkpoints = profile.get('checkpoints', [])
+    count = len(txns) + sum(cp['count'] for cp in checkpoints)
+    return count, sum(t.get('amount', 0) for t in txns) + compaction.archived_balance(checkpoints)
+
 # --- Data Access Class ---
 class WebCoinTracker:
     def __init__(self, profile_name="Default", user_id="default_user"):
@@ -190,6 +336,12 @@ class WebCoinTracker:
         self.user_id = user_id
         self.db = db
         self.doc_ref = self.db.collection('user_data').document(self.user_id) if self.db and FIREBASE_AVAILABLE else None
+        self._user_doc = None
+        # Split layout: this profile's document, cached like _user_doc for the life of the tracker.
+        self._profile_doc = None
+        # Monthly checkpoints of the archived part of the profile, oldest first (set by get_data).
+        self.checkpoints = []
+        self._range_index = None
 
     def get_default_settings(self):
         return {
@@ -205,26 +357,141 @@ class WebCoinTracker:
             ]
         }
 
-    def get_data(self):
-        transactions, settings = [], self.get_default_settings()
-        if self.doc_ref:
+    def read_user_doc(self):
+        """Reads user_data/{uid} once per tracker; later reads reuse the snapshot until the next save."""
+        if self._user_doc is None:
+            doc = self.doc_ref.get()
+            self._user_doc = (doc.to_dict() or {}) if doc.exists else {}
+            self.backfill_profile_names(self._user_doc)
+        return self._user_doc
+
+    @staticmethod
+    def stored_profile_names(data):
+        if PROFILE_LAYOUT == 'split':
+            return sorted(set(data.get('profiles', {})) | set(data.get('profile_names', [])))
+        if 'profiles' in data:
+            return sorted(data['profiles'])
+        return data.get('profile_names', [])
+
+    def backfill_profile_names(self, data):
+        """Keeps the precomputed profile_names in step with the nested map, which other clients edit directly."""
+        # The split layout rewrites the whole index when it migrates the user.
+        if PROFILE_LAYOUT == 'split' or 'profiles' not in data:
+            return
+        names = self.stored_profile_names(data)
+        if data.get('profile_names') != names:
             try:
-                doc = self.doc_ref.get()
-                if doc.exists:
-                    data = doc.to_dict()
+                self.doc_ref.set({'profile_names': names}, merge=True)
+                data['profile_names'] = names
+            except Exception as e:
+                print(f"Error updating profile names for user {self.user_id}: {e}")
+
+    def read_metadata(self):
+        """last_active_profile and profile_names without transferring any profile history.
+
+        Uses the full snapshot if this tracker already has one, and otherwise a
+        field-masked read. Documents written before profile_names existed fall back to
+        one full read, which also backfills the field.
+        """
+        if self._user_doc is None:
+            doc = self.doc_ref.get(field_paths=METADATA_FIELDS)
+            metadata = (doc.to_dict() or {}) if doc.exists else {}
+            if not doc.exists or 'profile_names' in metadata:
+                return metadata
+        data = self.read_user_doc()
+        return {
+            'last_active_profile': data.get('last_active_profile', 'Default'),
+            'profile_names': self.stored_profile_names(data)
+        }
+
+    def profile_ref(self, profile_name=None):
+        return self.doc_ref.collection('profiles').document(profile_doc_id(profile_name or self.profile_name))
+
+    @staticmethod
+    def needs_migration(index):
+        return any(key in index for key in ('profiles', 'transactions', 'settings'))
+
+    def read_profile_doc(self):
+        """Split layout: reads only this profile's document, migrating the user on first use."""
+        if self._profile_doc is not None:
+            return self._profile_doc
+        doc = self.profile_ref().get()
+        if doc.exists:
+            self._profile_doc = doc.to_dict() or {}
+            return self._profile_doc
+        index = self.read_user_doc()
+        if not self.needs_migration(index):
+            return {}
+        try:
+            return self.migrate_to_split(index).get(self.profile_name, {})
+        except Exception as e:
+            # Serve the nested copy; the migration is retried on the next read.
+            print(f"Profile migration error for user {self.user_id}: {e}")
+            return index.get('profiles', {}).get(self.profile_name, {})
+
+    def migrate_to_split(self, index):
+        """Moves the nested profiles map (or the pre-profiles layout) into per-profile documents.
+
+        Profiles that already have a document are left alone, so a partly finished
+        migration can simply be run again. The nested copy is only removed once every
+        profile has been written.
+        """
+        profiles = dict(index.get('profiles') or {})
+        if not profiles and ('transactions' in index or 'settings' in index):
+            profiles['Default'] = {
+                'transactions': index.get('transactions', []),
+                'settings': index.get('settings', {}),
+                'last_updated': dt_now_iso()
+            }
 
-                    if data is None: 
-                        data = {}
+        existing = {snap.id for snap in self.doc_ref.collection('profiles').select([]).stream()}
+        for name, profile_data in profiles.items():
+            if profile_doc_id(name) not in existing:
+                self.profile_ref(name).set({**profile_data, 'name': name})
+
+        names = set(profiles) | {unquote(doc_id) for doc_id in existing} | set(index.get('profile_names', []))
+        self.doc_ref.set({
+            'profile_names': sorted(names),
+            'profiles': DELETE_FIELD,
+            'transactions': DELETE_FIELD,
+            'settings': DELETE_FIELD
+        }, merge=True)
+        self._user_doc = None
+        self._profile_doc = None
+        print(f"Migrated {len(profiles)} profiles for user {self.user_id} to per-profile documents")
+        return profiles
 
+    def get_data(self):
+        transactions, settings = [], self.get_default_settings()
+        # Nothing stored yet means nothing to check.
+        schema_version = SCHEMA_VERSION
+        if self.doc_ref and PROFILE_LAYOUT == 'split':
+            try:
+                profile_data = self.read_profile_doc()
+                transactions = profile_data.get('transactions', [])
+                settings.update(profile_data.get('settings', {}))
+                self.checkpoints = profile_data.get('checkpoints', [])
+                if profile_data:
+                    schema_version = profile_data.get('schema_version', 0)
+            except Exception as e:
+                print(f"Firebase load error for user {self.user_id}: {e}")
+        elif self.doc_ref:
+            try:
+                data = self.read_user_doc()
+                if data:
                     if 'profiles' in data:
                         profile_data = data.get('profiles', {}).get(self.profile_name, {})
                         transactions = profile_data.get('transactions', [])
                         settings.update(profile_data.get('settings', {}))
+                        self.checkpoints = profile_data.get('checkpoints', [])
+                        if profile_data:
+                            schema_version = profile_data.get('schema_version', 0)
                     
                     elif 'transactions' in data or 'settings' in data:
                         print(f"NOTE: Found old data structure for user {self.user_id}. Reading data...")
                         transactions = data.get('transactions', [])
                         settings.update(data.get('settings', {}))
+                        schema_version = 0
                     
             except Exception as e: 
                 print(f"Firebase load error for user {self.user_id}: {e}")
@@ -232,61 +499,123 @@ class WebCoinTracker:
             profile_data = session.get('profiles', {}).get(self.profile_name, {})
             transactions = profile_data.get('transactions', [])
             settings.update(profile_data.get('settings', {}))
+            self.checkpoints = profile_data.get('checkpoints', [])
+            if profile_data:
+                schema_version = profile_data.get('schema_version', 0)
+
+        if schema_version >= SCHEMA_VERSION:
+            return transactions, settings
+        return self.migrate_schema(*self.validate_data(transactions, settings))
+
+    def migrate_schema(self, transactions, settings):
+        """Writes a just-validated profile back once, stamped with SCHEMA_VERSION.
+
+        Returns the profile as stored afterwards (saving can move old months to the
+        archive). If the write fails the validated copy is served and the migration
+        is tried again on the next read.
+        """
+        print(f"Migrating profile '{self.profile_name}' of user {self.user_id} to schema version {SCHEMA_VERSION}")
+        if not self.save_data(transactions, settings):
+            return transactions, settings
+        return self.get_data()
+
+    @staticmethod
+    def matches_filters(t, filters):
+        try:
+            t_date_str = t.get('date', '')
+            if not t_date_str:
+                return False
+                
+            t_date = datetime.fromisoformat(t_date_str.replace('Z', '+00:00')).date()
+            
+            if filters.get('date_from'):
+                from_date = datetime.fromisoformat(filters['date_from']).date()
+                if t_date < from_date:
+                    return False
+            if filters.get('date_to'):
+                to_date = datetime.fromisoformat(filters['date_to']).date()
+                if t_date > to_date:
+                    return False
+        except (ValueError, TypeError) as e:
+            print(f"Skipping date filter for transaction {t.get('id')}: {e}")
+            pass 
+
+        if filters.get('source') and filters['source'] != t.get('source'):
+            return False
         
-        return self.validate_data(transactions, settings)
+        search_term = filters.get('search', '').lower()
+        if search_term:
+            source_match = t.get('source', '').lower().find(search_term) != -1
+            amount_match = str(t.get('amount', '')).find(search_term) != -1
+            if not source_match and not amount_match:
+                return False
+        return True
 
     def get_transactions_paginated(self, page=1, limit=20, filters=None):
         if filters is None:
             filters = {}
             
         transactions, _ = self.get_data()
+
+        checkpoints = self.checkpoints
+        last_archived = checkpoints[-1]['month'] if checkpoints else ''
+        if any(compaction.month_of(t) and compaction.month_of(t) <= last_archived for t in transactions):
+            # Live rows dated inside archived months (compaction was turned off since): merge everything.
+            transactions = transactions + [t for cp in checkpoints for t in self.load_archived(cp)]
+            checkpoints = []
+        opening = compaction.archived_balance(checkpoints)
         
-        filtered_transactions = []
-        for t in transactions:
-            try:
-                t_date_str = t.get('date', '')
-                if not t_date_str:
-                    continue 
-                    
-                t_date = datetime.fromisoformat(t_date_str.replace('Z', '+00:00')).date()
-                
-                if filters.get('date_from'):
-                    from_date = datetime.fromisoformat(filters['date_from']).date()
-                    if t_date < from_date:
-                        continue
-                if filters.get('date_to'):
-                    to_date = datetime.fromisoformat(filters['date_to']).date()
-                    if t_date > to_date:
-                        continue
-            except (ValueError, TypeError) as e:
-                print(f"Skipping date filter for transaction {t.get('id')}: {e}")
-                pass 
-
-            if filters.get('source') and filters['source'] != t.get('source'):
-                continue
-            
-            search_term = filters.get('search', '').lower()
-            if search_term:
-                source_match = t.get('source', '').lower().find(search_term) != -1
-                amount_match = str(t.get('amount', '')).find(search_term) != -1
-                if not source_match and not amount_match:
-                    continue
+        start_index = (page - 1) * limit
+        end_index = start_index + limit
+
+        if filters.get('search') or filters.get('source'):
+            filtered_transactions = [t for t in transactions if self.matches_filters(t, filters)]
+
+            sorted_transactions = sorted(filtered_transactions, key=lambda x: x.get('date', ''), reverse=True)
             
-            filtered_transactions.append(t)
+            total_earned_in_range = sum(t['amount'] for t in filtered_transactions if t['amount'] > 0)
+            total_spent_in_range = sum(t['amount'] for t in filtered_transactions if t['amount'] < 0)
 
-        sorted_transactions = sorted(filtered_transactions, key=lambda x: x.get('date', ''), reverse=True)
-        
-        total_earned_in_range = sum(t['amount'] for t in filtered_transactions if t['amount'] > 0)
-        total_spent_in_range = sum(t['amount'] for t in filtered_transactions if t['amount'] < 0)
+            total_transactions = len(sorted_transactions)
+            
+            paginated_txns = sorted_transactions[start_index:end_index]
+            if paginated_txns:
+                balances = balances_before(transactions, opening)
+                paginated_txns = [{**t, 'previous_balance': balances.get(t.get('id'), 0)} for t in paginated_txns]
+        else:
+            # A date window is a contiguous run of the date-ordered rows: the totals come
+            # from the range index and the page is sliced out directly.
+            index = self.range_index(transactions) if checkpoints is self.checkpoints else RangeIndex(transactions)
+            date_from, date_to = self.window_bounds(filters)
+            lo, hi = index.window(date_from, date_to)
+            total_earned_in_range, total_spent_in_range, total_transactions = index.totals(date_from, date_to)
+            first, last = max(lo, hi - end_index), max(lo, hi - start_index)
+            paginated_txns = [{**index.rows[i], 'previous_balance': opening + index.balance_before_position(i)}
+                              for i in range(last - 1, first - 1, -1)]
+
+        # Archived months are older than every live row, so they continue the list. Their
+        # counts come from the checkpoints; rows are loaded only for months on this page or
+        # when a search / partial-month date range needs them.
+        offset = total_transactions
+        for checkpoint in reversed(checkpoints):
+            stats = compaction.checkpoint_stats(checkpoint, filters)
+            rows = None
+            if stats is None:
+                rows = self.archived_matches(checkpoint, filters)
+                stats = (len(rows), sum(t['amount'] for t in rows if t['amount'] > 0),
+                         sum(t['amount'] for t in rows if t['amount'] < 0))
+            count, earned, spent = stats
+            total_transactions += count
+            total_earned_in_range += earned
+            total_spent_in_range += spent
+            if count and offset < end_index and offset + count > start_index:
+                if rows is None:
+                    rows = self.archived_matches(checkpoint, filters)
+                paginated_txns.extend(rows[max(0, start_index - offset):end_index - offset])
+            offset += count
 
-        total_transactions = len(sorted_transactions)
         total_pages = (total_transactions + limit - 1) // limit 
         
-        start_index = (page - 1) * limit
-        end_index = start_index + limit
-        
-        paginated_txns = sorted_transactions[start_index:end_index]
-        
         return {
             'transactions': paginated_txns,
             'total_pages': total_pages,
@@ -296,6 +625,151 @@ class WebCoinTracker:
             'total_spent': total_spent_in_range,
         }
 
+    @staticmethod
+    def window_bounds(filters):
+        """History's date_from/date_to as range index bounds (a filter that doesn't parse is ignored)."""
+        date_from, date_to = compaction.filter_date(filters.get('date_from')), compaction.filter_date(filters.get('date_to'))
+        return (date_from.isoformat() if date_from else None), (date_to.isoformat() if date_to else None)
+
+    def range_index(self, transactions=None):
+        """Range index over the live rows (those from get_data), built on first use and dropped on save."""
+        if self._range_index is None:
+            if transactions is None:
+                transactions, _ = self.get_data()
+            self._range_index = RangeIndex(transactions)
+        return self._range_index
+
+    def range_summary(self, date_from=None, date_to=None):
+        """Totals for every transaction dated in [date_from, date_to], archived months included."""
+        earned, spent, count = self.range_index().totals(date_from, date_to)
+        for checkpoint in self.checkpoints:
+            first, last = (d.isoformat() for d in compaction.month_bounds(checkpoint['month']))
+            if (date_from and date_from > last) or (date_to and date_to < first):
+                continue
+            if (date_from and date_from > first) or (date_to and date_to < last):
+                month = RangeIndex(self.load_archived(checkpoint)).totals(date_from, date_to)
+            else:
+                month = (checkpoint['earned'], -checkpoint['spent'], checkpoint['count'])
+            earned, spent, count = earned + month[0], spent + month[1], count + month[2]
+        return {
+            'total_earned': earned,
+            'total_spent': spent,
+            'net': earned + spent,
+            'count': count,
+            'opening_balance': self.balance_at(date_from, before=True) if date_from else 0,
+            'closing_balance': self.balance_at(date_to) if date_to else self.balance_at(None),
+        }
+
+    def balance_at(self, timestamp, before=False):
+        """Balance after every transaction dated at or before `timestamp` (strictly before, with `before`).
+
+        None means now. Compacted months are summed from their checkpoints; only a month
+        that contains `timestamp` is read from the archive.
+        """
+        index = self.range_index()
+        if timestamp is None:
+            return compaction.archived_balance(self.checkpoints) + index.balance_before_position(len(index))
+        query = 'balance_before' if before else 'balance_at'
+        balance = getattr(index, query)(timestamp)
+        for checkpoint in self.checkpoints:
+            if checkpoint['month'] < timestamp[:7]:
+                balance += checkpoint['earned'] - checkpoint['spent']
+            elif checkpoint['month'] == timestamp[:7]:
+                balance += getattr(RangeIndex(self.load_archived(checkpoint)), query)(timestamp)
+        return balance
+
+    def archived_matches(self, checkpoint, filters):
+        """Matching rows of an archived month, newest first, with balances counted from the month's opening balance."""
+        rows = self.load_archived(checkpoint)
+        balances = balances_before(rows, checkpoint['opening_balance'])
+        rows = [{**t, 'previous_balance': balances.get(t.get('id'), 0)} for t in rows if self.matches_filters(t, filters)]
+        return sorted(rows, key=lambda x: x.get('date', ''), reverse=True)
+
+    # --- Cold Archive ---
+    # Compacted months live outside the profile: under user_data/{uid}/archive, one
+    # document per month (more for very busy months), or in session['archive'] offline.
+    # They are only read when history, export or an edit reaches an archived month.
+
+    def archive_ref(self, month, part):
+        return self.doc_ref.collection('archive').document(f"{profile_doc_id(self.profile_name)}@{month}.{part}")
+
+    def load_archived(self, checkpoint):
+        if not self.doc_ref:
+            return list(session.get('archive', {}).get(self.profile_name, {}).get(checkpoint['month'], []))
+        rows = []
+        for part in range(checkpoint.get('segments', 1)):
+            doc = self.archive_ref(checkpoint['month'], part).get()
+            if doc.exists:
+                rows.extend((doc.to_dict() or {}).get('transactions', []))
+        return rows
+
+    def write_archived(self, month, rows, old_segments=0):
+        """Stores the rows of an archived month; returns its checkpoint, or None once the month is empty."""
+        if not self.doc_ref:
+            archive = dict(session.get('archive', {}))
+            months = dict(archive.get(self.profile_name, {}))
+            if rows:
+                months[month] = [stored_row(t) for t in sorted(rows, key=lambda x: x.get('date', ''))]
+            else:
+                months.pop(month, None)
+            archive[self.profile_name] = months
+            session['archive'] = archive
+        else:
+            parts = compaction.segments([stored_row(t) for t in rows]) if rows else []
+            for part, chunk in enumerate(parts):
+                self.archive_ref(month, part).set({'profile': self.profile_name, 'month': month, 'transactions': chunk})
+            for part in range(len(parts), old_segments):
+                self.archive_ref(month, part).delete()
+        return compaction.summarize_month(month, rows) if rows else None
+
+    def compact(self, transactions):
+        """Moves live rows from months before the horizon into the archive and updates the checkpoints."""
+        if not COMPACTION_HORIZON_DAYS:
+            return transactions
+        old, live = compaction.split_for_archive(transactions, compaction.cutoff_month(COMPACTION_HORIZON_DAYS))
+        if not old:
+            return transactions
+        try:
+            checkpoints = {cp['month']: cp for cp in self.checkpoints}
+            for month, rows in old.items():
+                existing = checkpoints.get(month)
+                if existing:
+                    # A late entry for a month that is already archived.
+                    rows = compaction.merge_rows(self.load_archived(existing), rows)
+                checkpoints[month] = self.write_archived(month, rows, existing['segments'] if existing else 0)
+        except Exception as e:
+            # Keep everything live; archive rows already written are merged by id next time.
+            print(f"Compaction error for user {self.user_id}: {e}")
+            return transactions
+        self.checkpoints = compaction.chain(checkpoints.values())
+        print(f"Compacted {len(transactions) - len(live)} transactions into {len(old)} monthly checkpoints for user {self.user_id}")
+        return live
+
+    def take_archived(self, transaction_id):
+        """Removes one row from the archive (to edit or delete it) and returns it, or None if it isn't archived."""
+        for checkpoint in reversed(self.checkpoints):
+            rows = self.load_archived(checkpoint)
+            match = next((t for t in rows if t.get('id') == transaction_id), None)
+            if match is None:
+                continue
+            rows.remove(match)
+            updated = self.write_archived(checkpoint['month'], rows, checkpoint['segments'])
+            others = [cp for cp in self.checkpoints if cp is not checkpoint]
+            self.checkpoints = compaction.chain(others + ([updated] if updated else []))
+            return match
+        return None
+
+    def clear_archive(self):
+        for checkpoint in self.checkpoints:
+            self.write_archived(checkpoint['month'], [], checkpoint['segments'])
+        self.checkpoints = []
+
+    def get_all_transactions(self):
+        """Live and archived transactions, oldest first (for export)."""
+        transactions, settings = self.get_data()
+        archived = [t for cp in self.checkpoints for t in self.load_archived(cp)]
+        return sorted(archived + transactions, key=lambda x: x.get('date', '')), settings
+
 
     def validate_data(self, transactions, settings):
         for t in transactions:
@@ -304,9 +778,27 @@ class WebCoinTracker:
             settings['quick_actions'] = self.get_default_settings()['quick_actions']
         return transactions, settings
 
+    def profile_record(self, transactions, settings):
+        # Written even when empty: the nested layout saves with merge=True, which would
+        # otherwise keep the checkpoints of months an import or delete just cleared.
+        return {'transactions': transactions, 'settings': settings, 'checkpoints': self.checkpoints,
+                'last_updated': dt_now_iso(), 'schema_version': SCHEMA_VERSION}
+
     def save_data(self, transactions, settings):
-        transactions = self.recalculate_balances(transactions)
-        if self.doc_ref:
+        self._range_index = None
+        self._profile_doc = None
+        transactions = self.storage_rows(self.compact(transactions))
+        if self.doc_ref and PROFILE_LAYOUT == 'split':
+            try:
+                record = {'name': self.profile_name, **self.profile_record(transactions, settings)}
+                self.profile_ref().set(record)
+                # set() replaces the whole document, so the record is what a re-read would return.
+                self._profile_doc = record
+                return True
+            except Exception as e:
+                print(f"Firebase save error: {e}")
+                return False
+        elif self.doc_ref:
             try:
                 doc = self.doc_ref.get()
                 data_to_save = {}
@@ -315,31 +807,33 @@ class WebCoinTracker:
 
                 profiles_data = data_to_save.get('profiles', {})
                 
-                profiles_data[self.profile_name] = {
-                    'transactions': transactions, 
-                    'settings': settings, 
-                    'last_updated': dt_now_iso()
-                }
+                profiles_data[self.profile_name] = self.profile_record(transactions, settings)
                 
                 final_data = {
                     'profiles': profiles_data,
+                    'profile_names': sorted(profiles_data),
                     'last_active_profile': self.profile_name
                 }
                 
                 if 'transactions' in data_to_save:
-                    final_data['transactions'] = firestore.DELETE_FIELD
+                    final_data['transactions'] = DELETE_FIELD
                 if 'settings' in data_to_save:
-                    final_data['settings'] = firestore.DELETE_FIELD
+                    final_data['settings'] = DELETE_FIELD
                 
                 self.doc_ref.set(final_data, merge=True) 
+                self._user_doc = None
                 
                 return True
             except Exception as e:
                 print(f"Firebase save error: {e}")
                 return False
         else:
-            profiles = session.get('profiles', {})
-            profiles[self.profile_name] = {'transactions': transactions, 'settings': settings, 'last_updated': dt_now_iso()}
+            profiles = dict(session.get('profiles', {}))
+            profiles[self.profile_name] = self.profile_record(transactions, settings)
+            size = session_payload_size(app, {**session, 'profiles': profiles})
+            if size > session_byte_limit(app):
+                print(f"Session save refused for user {self.user_id}: {size} bytes exceeds {session_byte_limit(app)}")
+                return False
             session['profiles'] = profiles
             session.modified = True
             return True
@@ -350,23 +844,36 @@ class WebCoinTracker:
         settings = data.get('settings', self.get_default_settings())
         
         valid_transactions, valid_settings = self.validate_data(transactions, settings)
+        # The import replaces the whole profile, archived months included.
+        self.get_data()
+        if self.checkpoints:
+            try:
+                self.clear_archive()
+            except Exception as e:
+                print(f"Error clearing archive for user {self.user_id}: {e}")
+                return False
         return self.save_data(valid_transactions, valid_settings)
 
-    def recalculate_balances(self, transactions):
-        sorted_transactions = sorted(transactions, key=lambda x: x.get('date', ''))
-        balance = 0
-        for t in sorted_transactions:
-            t['previous_balance'] = balance
-            balance += t.get('amount', 0)
-        return sorted_transactions
+    def storage_rows(self, transactions):
+        """Rows as saved: sorted by date, without derived fields (this also strips them from old data)."""
+        return [stored_row(t) for t in sorted(transactions, key=lambda x: x.get('date', ''))]
 
     def add_transaction(self, amount, source, date):
+        return self.add_transactions([make_transaction(amount, source, date)])
+
+    def add_transactions(self, new_transactions):
+        """Appends already-built transaction rows with a single read-modify-write."""
         transactions, settings = self.get_data()
-        transactions.append({"id": str(uuid.uuid4()), "date": date or dt_now_iso(), "amount": int(amount), "source": source})
+        transactions.extend(new_transactions)
         return self.save_data(transactions, settings)
 
     def update_transaction(self, transaction_id, new_data):
         transactions, settings = self.get_data()
+        if not any(t.get('id') == transaction_id for t in transactions):
+            # Bring an archived row back; save_data re-archives it under its (new) month.
+            archived = self.take_archived(transaction_id)
+            if archived:
+                transactions.append(archived)
         for t in transactions:
             if t.get('id') == transaction_id:
                 t.update({'amount': int(new_data['amount']), 'source': new_data['source'], 'date': new_data['date']})
@@ -377,7 +884,7 @@ class WebCoinTracker:
         transactions, settings = self.get_data()
         initial_len = len(transactions)
         transactions = [t for t in transactions if t.get('id') != transaction_id]
-        if len(transactions) < initial_len:
+        if len(transactions) < initial_len or self.take_archived(transaction_id):
             return self.save_data(transactions, settings)
         return False
 
@@ -385,9 +892,7 @@ class WebCoinTracker:
         profiles = ['Default']
         if self.doc_ref:
             try:
-                doc = self.doc_ref.get()
-                if doc.exists and doc.to_dict() is not None: 
-                    profiles.extend([p for p in doc.to_dict().get('profiles', {}).keys() if p != 'Default'])
+                profiles.extend(self.read_metadata().get('profile_names', []))
             except Exception as e: print(f"Firebase profiles error: {e}")
         profiles.extend([p for p in session.get('profiles', {}).keys() if p not in profiles])
         return sorted(list(set(profiles)))
@@ -450,12 +955,13 @@ def handle_login():
     user_data = user_doc.to_dict()
     
     if check_password_hash(user_data.get('password_hash'), password):
+        regenerate_session(session)
         session.permanent = True
         session['user_id'] = user_doc.id
         session['username'] = user_data.get('username')
         session['role'] = user_data.get('role', 'user')
         
-        user_data_doc = db.collection('user_data').document(user_doc.id).get()
+        user_data_doc = db.collection('user_data').document(user_doc.id).get(field_paths=['last_active_profile'])
         last_profile = 'Default'
         
         if user_data_doc.exists and user_data_doc.to_dict() is not None:
@@ -494,22 +1000,21 @@ def index():
 
 # --- Main Data API Routes ---
 
-@app.route('/api/data')
-@login_required
-def get_all_data():
-    profile_name = session.get('current_profile', 'Default')
-    user_id = session.get('user_id')
-    tracker = WebCoinTracker(profile_name, user_id)
-    
+def build_dashboard_data(tracker):
+    profile_name = tracker.profile_name
     transactions, settings = tracker.get_data()
+    # Compacted months only contribute their checkpoint totals; they are all older than
+    # the previous month, so the today/week/month figures come from live rows alone.
+    checkpoints = tracker.checkpoints
     
-    balance = sum(t.get('amount', 0) for t in transactions)
+    balance = compaction.archived_balance(checkpoints) + sum(t.get('amount', 0) for t in transactions)
     goal = settings.get('goal', 13500)
     today, week_start, month_start = datetime.now().date(), datetime.now().date() - timedelta(days=datetime.now().weekday()), datetime.now().date().replace(day=1)
     
     today_earn, week_earn, month_earn = 0, 0, 0
-    total_earnings = 0
-    first_earning_date = None
+    total_earnings = sum(cp['earned'] for cp in checkpoints)
+    first_earning_date = min((compaction.parse_date(cp['first_earning_date']) for cp in checkpoints
+                              if cp.get('first_earning_date')), default=None)
     
     for t in transactions:
         if t.get('amount', 0) > 0:
@@ -546,26 +1051,36 @@ def get_all_data():
         elif avg_daily_earnings > 0:
             estimated_days = int(amount_remaining / avg_daily_earnings)
             
-    total_spending = abs(sum(t['amount'] for t in transactions if t['amount'] < 0))
+    total_spending = sum(cp['spent'] for cp in checkpoints) + abs(sum(t['amount'] for t in transactions if t['amount'] < 0))
     
     earnings_breakdown = defaultdict(int)
+    spending_breakdown = defaultdict(int)
+    for cp in checkpoints:
+        for source, totals in cp['by_source'].items():
+            if totals['earned']: earnings_breakdown[source] += totals['earned']
+            if totals['spent']: spending_breakdown[source] += totals['spent']
+
     for t in transactions:
         if t['amount'] > 0: earnings_breakdown[t['source']] += t['amount']
         
-    spending_breakdown = defaultdict(int)
     for t in transactions:
         if t['amount'] < 0: spending_breakdown[t['source']] += abs(t['amount'])
         
-    timeline = [{'date': t['date'], 'balance': t.get('previous_balance', 0) + t.get('amount', 0)} for t in sorted(transactions, key=lambda x: x.get('date', ''))]
-
-    settings['firebase_available'] = FIREBASE_AVAILABLE and db is not None
+    # One point per compacted month (its closing balance), then one per live transaction.
+    timeline = [{'date': cp['last_date'], 'balance': cp['closing_balance']} for cp in checkpoints]
+    running = compaction.archived_balance(checkpoints)
+    for t in sorted(transactions, key=lambda x: x.get('date', '')):
+        running += t.get('amount', 0)
+        timeline.append({'date': t['date'], 'balance': running})
+
+    settings['firebase_available'] = bool(db)
     
-    all_sources = sorted(list(set(t['source'] for t in transactions)))
+    all_sources = sorted(set(t['source'] for t in transactions).union(*(cp['by_source'] for cp in checkpoints)))
     settings['all_sources'] = all_sources
 
-    achievements = calculate_achievements(transactions, balance, goal)
+    achievements = calculate_achievements(transactions, balance, goal, checkpoints)
 
-    return jsonify({
+    return {
         'profile': profile_name, 
         'transactions': transactions, 
         'settings': settings, 
@@ -584,15 +1099,16 @@ def get_all_data():
         },
         'achievements': achievements,
         'success': True
-    })
-    
-@app.route('/api/history')
+    }
+
+@app.route('/api/data')
 @login_required
-def get_history_paginated():
-    profile_name = session.get('current_profile', 'Default')
-    user_id = session.get('user_id')
-    tracker = WebCoinTracker(profile_name, user_id)
-    
+def get_all_data(tracker=None):
+    """Dashboard response; pass the tracker that just saved to answer without re-reading."""
+    tracker = tracker or WebCoinTracker(session.get('current_profile', 'Default'), session.get('user_id'))
+    return jsonify(build_dashboard_data(tracker))
+
+def history_request_args():
     try:
         page = int(request.args.get('page', 1))
         limit = int(request.args.get('limit', 20))
@@ -607,25 +1123,157 @@ def get_history_paginated():
         'source': request.args.get('source')
     }
     filters = {k: v for k, v in filters.items() if v}
-        
+    return page, limit, filters
+    
+@app.route('/api/history')
+@login_required
+def get_history_paginated():
+    profile_name = session.get('current_profile', 'Default')
+    user_id = session.get('user_id')
+    tracker = WebCoinTracker(profile_name, user_id)
+    
+    page, limit, filters = history_request_args()
     data = tracker.get_transactions_paginated(page, limit, filters)
     return jsonify(data)
 
+def timestamp_args(*names):
+    """Query args as ISO dates/timestamps; raises ValueError for one that doesn't parse."""
+    values = []
+    for name in names:
+        value = request.args.get(name) or None
+        if value:
+            compaction.parse_date(value)
+        values.append(value)
+    return values
+
+@app.route('/api/balance-at')
+@login_required
+def get_balance_at():
+    """Balance after every transaction up to `at` (an ISO timestamp, or a date for the end of that day)."""
+    try:
+        at, = timestamp_args('at')
+    except ValueError:
+        at = None
+    if not at:
+        return jsonify({'success': False, 'error': 'at must be an ISO date or timestamp'}), 400
+    tracker = WebCoinTracker(session.get('current_profile', 'Default'), session.get('user_id'))
+    return jsonify({'at': at, 'balance': tracker.balance_at(at), 'success': True})
+
+@app.route('/api/range-summary')
+@login_required
+def get_range_summary():
+    """Earned, spent and count between date_from and date_to (both optional and inclusive), with opening/closing balances."""
+    try:
+        date_from, date_to = timestamp_args('date_from', 'date_to')
+    except ValueError:
+        return jsonify({'success': False, 'error': 'date_from and date_to must be ISO dates or timestamps'}), 400
+    tracker = WebCoinTracker(session.get('current_profile', 'Default'), session.get('user_id'))
+    summary = tracker.range_summary(date_from, date_to)
+    return jsonify({**summary, 'date_from': date_from, 'date_to': date_to, 'success': True})
+
+@app.route('/api/bootstrap')
+@login_required
+def get_bootstrap():
+    """Everything the dashboard needs for first render in one round-trip.
+
+    The user_data document is read once and shared by the dashboard, profile list and
+    first history page; the broadcast is fetched concurrently.
+    """
+    profile_name = session.get('current_profile', 'Default')
+    tracker = WebCoinTracker(profile_name, session.get('user_id'))
+    broadcast_future = io_pool.submit(contextvars.copy_context().run, app_config.get, 'broadcast', {'message': ''})
+
+    page, limit, filters = history_request_args()
+    data = build_dashboard_data(tracker)
+    history = tracker.get_transactions_paginated(page, limit, filters)
+    profiles = tracker.get_profiles()
+    broadcast, _ = broadcast_future.result()
+
+    return jsonify({
+        'data': data,
+        'profiles': {'profiles': profiles, 'current_profile': profile_name},
+        'user': {'username': session.get('username'), 'role': session.get('role', 'user')},
+        'broadcast': broadcast,
+        'history': history,
+        'success': True
+    })
+
+# --- Write Coalescing ---
+# With WRITE_COALESCE_MS > 0, appends for the same user and profile that arrive within
+# the window share one document write. Each request still waits for that write.
+MAX_BATCH_TRANSACTIONS = 500
+
+def flush_appends(key, rows):
+    user_id, profile_name = key
+    if not WebCoinTracker(profile_name, user_id).add_transactions(rows):
+        raise RuntimeError(f"Failed to save {len(rows)} transactions for user {user_id}")
+    return True
+
+coalesce_ms = int(os.environ.get('WRITE_COALESCE_MS', 0))
+append_coalescer = AppendCoalescer(flush_appends, window=coalesce_ms / 1000) if FIREBASE_AVAILABLE and coalesce_ms > 0 else None
+
+def batch_transaction(item):
+    """One /api/add-transactions item as a row; raises for a missing or malformed field."""
+    date = item.get('date')
+    if date is not None:
+        # Rows are sorted by date when saved, so a number here would break every later save.
+        if not isinstance(date, str):
+            raise TypeError('date must be an ISO date string')
+        compaction.parse_date(date)
+    return make_transaction(item['amount'], item['source'], date)
+
+def append_transactions(rows):
+    """Stores new rows in the current profile.
+
+    Returns the tracker to answer from once they have been written, else None. Without
+    coalescing that is the tracker that saved; a coalesced flush ran on another request,
+    so the caller gets a fresh one.
+    """
+    user_id, profile_name = session.get('user_id'), session.get('current_profile', 'Default')
+    tracker = WebCoinTracker(profile_name, user_id)
+    if append_coalescer is None:
+        return tracker if tracker.add_transactions(rows) else None
+    try:
+        append_coalescer.append((user_id, profile_name), rows)
+        return tracker
+    except Exception as e:
+        print(f"Coalesced save error for user {user_id}: {e}")
+        return None
+
 @app.route('/api/add-transaction', methods=['POST'])
 @login_required
 def handle_add_transaction():
-    tracker = WebCoinTracker(session.get('current_profile', 'Default'), session.get('user_id'))
     data = request.json
-    if tracker.add_transaction(data['amount'], data['source'], data['date']):
-        return get_all_data()
+    tracker = append_transactions([make_transaction(data['amount'], data['source'], data['date'])])
+    if tracker:
+        return get_all_data(tracker)
     return jsonify({'success': False, 'error': 'Failed to save transaction'}), 500
 
+@app.route('/api/add-transactions', methods=['POST'])
+@login_required
+def handle_add_transactions():
+    body = request.json
+    items = body.get('transactions') if isinstance(body, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({'success': False, 'error': 'transactions must be a non-empty list'}), 400
+    if len(items) > MAX_BATCH_TRANSACTIONS:
+        return jsonify({'success': False, 'error': f'At most {MAX_BATCH_TRANSACTIONS} transactions per request'}), 400
+    try:
+        rows = [batch_transaction(item) for item in items]
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Each transaction needs a numeric amount, a source and an optional ISO date'}), 400
+
+    tracker = append_transactions(rows)
+    if tracker:
+        return get_all_data(tracker)
+    return jsonify({'success': False, 'error': 'Failed to save transactions'}), 500
+
 @app.route('/api/update-transaction/<transaction_id>', methods=['POST'])
 @login_required
 def handle_update_transaction(transaction_id):
     tracker = WebCoinTracker(session.get('current_profile', 'Default'), session.get('user_id'))
     if tracker.update_transaction(transaction_id, request.json):
-        return get_all_data()
+        return get_all_data(tracker)
     return jsonify({'success': False, 'error': 'Failed to update'}), 404
 
 @app.route('/api/delete-transaction/<transaction_id>', methods=['POST'])
@@ -633,7 +1281,7 @@ def handle_update_transaction(transaction_id):
 def handle_delete_transaction(transaction_id):
     tracker = WebCoinTracker(session.get('current_profile', 'Default'), session.get('user_id'))
     if tracker.delete_transaction(transaction_id):
-        return get_all_data()
+        return get_all_data(tracker)
     return jsonify({'success': False, 'error': 'Failed to delete'}), 404
 
 @app.route('/api/update-settings', methods=['POST'])
@@ -645,7 +1293,7 @@ def update_settings():
     settings.update(request.json)
     
     if tracker.save_data(transactions, settings):
-        return get_all_data()
+        return get_all_data(tracker)
     return jsonify({'success': False, 'error': 'Failed to save settings'}), 500
     
 @app.route('/api/import-data', methods=['POST'])
@@ -654,9 +1302,17 @@ def handle_import_data():
     tracker = WebCoinTracker(session.get('current_profile', 'Default'), session.get('user_id'))
     data = request.json
     if tracker.import_data(data):
-        return get_all_data()
+        return get_all_data(tracker)
     return jsonify({'success': False, 'error': 'Failed to import data'}), 500
 
+@app.route('/api/export')
+@login_required
+def export_data():
+    """The current profile with its archived months, in the format /api/import-data accepts."""
+    tracker = WebCoinTracker(session.get('current_profile', 'Default'), session.get('user_id'))
+    transactions, settings = tracker.get_all_transactions()
+    return jsonify({'profile': tracker.profile_name, 'settings': settings, 'transactions': transactions, 'success': True})
+
 @app.route('/api/add-quick-action', methods=['POST'])
 @login_required
 def add_quick_action():
@@ -667,7 +1323,7 @@ def add_quick_action():
     if 'text' in new_action and 'value' in new_action and 'is_positive' in new_action:
         settings['quick_actions'].append(new_action)
         if tracker.save_data(transactions, settings):
-            return get_all_data()
+            return get_all_data(tracker)
     
     return jsonify({'success': False, 'error': 'Invalid action data'}), 400
 
@@ -685,7 +1341,7 @@ def delete_quick_action():
         if 0 <= index_to_delete < len(settings['quick_actions']):
             settings['quick_actions'].pop(index_to_delete)
             if tracker.save_data(transactions, settings):
-                return get_all_data()
+                return get_all_data(tracker)
     except (TypeError, ValueError):
         pass 
     
@@ -722,6 +1378,21 @@ def create_profile():
     if profile_name in tracker.get_profiles():
         return jsonify({'success': False, 'error': 'Profile already exists'}), 409
         
+    if PROFILE_LAYOUT == 'split' and tracker.doc_ref:
+        # The profile's document is created by its first save; only the index changes here.
+        try:
+            names = [p for p in tracker.get_profiles() if p != 'Default'] + [profile_name]
+            tracker.doc_ref.set({'profile_names': sorted(names), 'last_active_profile': profile_name}, merge=True)
+        except Exception as e:
+            print(f"Error creating profile: {e}")
+            return jsonify({'success': False, 'error': 'Failed to create profile'}), 500
+        session['current_profile'] = profile_name
+        return jsonify({
+            'success': True,
+            'profiles': sorted(names + ['Default']),
+            'current_profile': profile_name
+        })
+
     if tracker.save_data([], tracker.get_default_settings()):
         session['current_profile'] = profile_name
         if db and FIREBASE_AVAILABLE:
@@ -738,6 +1409,23 @@ def create_profile():
 
 # --- Admin Routes ---
 
+def user_data_group(collection_id):
+    """Streams a collection group, keeping only the documents under user_data/{uid}.
+
+    The desktop app syncs to users/{uid}/profiles, which a 'profiles' group query
+    matches as well.
+    """
+    for doc in db.collection_group(collection_id).stream():
+        if doc.reference.path.startswith('user_data/'):
+            yield doc
+
+def split_profile_docs():
+    """Yields (user_id, profile data) for every per-profile document (split layout only)."""
+    if PROFILE_LAYOUT != 'split':
+        return
+    for doc in user_data_group('profiles'):
+        yield doc.reference.parent.parent.id, doc.to_dict() or {}
+
 @app.route('/admin')
 @login_required
 def admin_panel():
@@ -787,15 +1475,18 @@ def get_admin_stats():
         
         if profiles:
             for profile in profiles.values():
-                txns = profile.get('transactions', [])
-                total_transactions += len(txns)
-                for t in txns:
-                    total_coins += t.get('amount', 0)
+                count, coins = profile_totals(profile)
+                total_transactions += count
+                total_coins += coins
         elif 'transactions' in doc_data:
-             txns = doc_data.get('transactions', [])
-             total_transactions += len(txns)
-             for t in txns:
-                total_coins += t.get('amount', 0)
+             count, coins = profile_totals(doc_data)
+             total_transactions += count
+             total_coins += coins
+
+    for _, profile in split_profile_docs():
+        count, coins = profile_totals(profile)
+        total_transactions += count
+        total_coins += coins
                 
     return jsonify({
         'stats': {
@@ -844,10 +1535,9 @@ def get_admin_users():
             if 'profiles' in doc_data:
                 profiles = doc_data.get('profiles', {})
                 for profile in profiles.values():
-                    txns = profile.get('transactions', [])
-                    user_txn_count += len(txns)
-                    for t in txns:
-                        user_balance += t.get('amount', 0)
+                    count, coins = profile_totals(profile)
+                    user_txn_count += count
+                    user_balance += coins
                     
                     profile_last_updated = profile.get('last_updated')
                     if profile_last_updated:
@@ -855,15 +1545,23 @@ def get_admin_users():
                             last_updated = profile_last_updated
             
             elif 'transactions' in doc_data:
-                txns = doc_data.get('transactions', [])
-                user_txn_count = len(txns)
-                for t in txns:
-                    user_balance += t.get('amount', 0)
+                user_txn_count, user_balance = profile_totals(doc_data)
 
             users_dict[user_id]['balance'] = user_balance
             users_dict[user_id]['txn_count'] = user_txn_count
             users_dict[user_id]['last_updated'] = last_updated
 
+    for user_id, profile in split_profile_docs():
+        if user_id not in users_dict:
+            continue
+        entry = users_dict[user_id]
+        count, coins = profile_totals(profile)
+        entry['txn_count'] += count
+        entry['balance'] += coins
+        profile_last_updated = profile.get('last_updated')
+        if profile_last_updated and (entry['last_updated'] == 'N/A' or profile_last_updated > entry['last_updated']):
+            entry['last_updated'] = profile_last_updated
+
     return jsonify({'users': list(users_dict.values()), 'success': True})
 
 
@@ -876,30 +1574,77 @@ def delete_admin_user():
     
     try:
         db.collection('users').document(user_id).delete()
-        db.collection('user_data').document(user_id).delete()
+        user_data_ref = db.collection('user_data').document(user_id)
+        for subcollection in ('profiles', 'archive'):
+            for child in user_data_ref.collection(subcollection).select([]).stream():
+                user_data_ref.collection(subcollection).document(child.id).delete()
+        user_data_ref.delete()
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/admin/strip-stored-balances', methods=['POST'])
+@admin_required
+def strip_stored_balances():
+    """One-off migration: removes previous_balance from every stored transaction.
+
+    Profiles are also cleaned the next time they are saved; this covers idle users.
+    """
+    def strip(rows):
+        return [stored_row(t) for t in rows], any(field in t for t in rows for field in DERIVED_FIELDS)
+
+    updated = 0
+    for doc in db.collection('user_data').stream():
+        data = doc.to_dict() or {}
+        changes = {}
+        profiles = data.get('profiles') or {}
+        for profile in profiles.values():
+            rows, changed = strip(profile.get('transactions', []))
+            if changed:
+                profile['transactions'] = rows
+                changes['profiles'] = profiles
+        rows, changed = strip(data.get('transactions', []))
+        if changed:
+            changes['transactions'] = rows
+        if changes:
+            db.collection('user_data').document(doc.id).set(changes, merge=True)
+            updated += 1
+
+    for collection_id in ('profiles', 'archive'):
+        for doc in user_data_group(collection_id):
+            rows, changed = strip((doc.to_dict() or {}).get('transactions', []))
+            if changed:
+                doc.reference.update({'transactions': rows})
+                updated += 1
+    return jsonify({'success': True, 'documents_updated': updated})
+
+@app.route('/api/admin/metrics')
+@admin_required
+def get_admin_metrics():
+    """Per-route latency, status and Firestore cost for this worker, as JSON or Prometheus text."""
+    wants_prometheus = (request.args.get('format') == 'prometheus' or
+                        request.accept_mimetypes.best_match(['application/json', 'text/plain']) == 'text/plain')
+    if wants_prometheus:
+        return Response(metrics_registry.prometheus_text(), mimetype='text/plain; version=0.0.4')
+    return jsonify({**metrics_registry.snapshot(), 'success': True})
+
 # --- Broadcast Routes ---
 
 @app.route('/api/broadcast')
 @login_required 
 def get_broadcast():
-    try:
-        doc = db.collection('app_config').document('broadcast').get()
-        if doc.exists:
-            return jsonify(doc.to_dict())
-        return jsonify({'message': ''})
-    except Exception:
-        return jsonify({'message': ''})
+    data, etag = app_config.get('broadcast', default={'message': ''})
+    response = jsonify(data)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
 
 @app.route('/api/admin/broadcast', methods=['POST'])
 @admin_required
 def set_broadcast():
     message = request.json.get('message', '')
     try:
-        db.collection('app_config').document('broadcast').set({
+        app_config.set('broadcast', {
             'message': message,
             'set_by': session.get('username'),
             'set_at': dt_now_iso()
@@ -909,6 +1654,66 @@ def set_broadcast():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+# --- Health & Warm-up ---
+# /healthz only says the process is serving and never touches Firestore, so it is safe
+# for frequent liveness probes. /readyz builds the client if needed and times one small
+# read; it answers 503 until the backend (and the warm-up, if enabled) is usable.
+# WARMUP=1 starts a background thread at import that connects to Firestore, fills the
+# app_config cache and compiles the page templates, so the first real request
+# doesn't pay for them.
+WARMUP = os.environ.get('WARMUP', '').lower() in ('1', 'true', 'yes')
+warmup_done = threading.Event()
+
+
+def warm_up():
+    started = time.perf_counter()
+    try:
+        if db:
+            app_config.get('broadcast', default={'message': ''})
+        for name in ('login.html', 'index.html', 'admin.html'):
+            app.jinja_env.get_template(name)
+        print(f"🔥 Warm-up finished in {(time.perf_counter() - started) * 1000:.0f} ms")
+    except Exception as e:
+        print(f"⚠️ Warm-up error: {e}")
+    finally:
+        warmup_done.set()
+
+
+@app.route('/healthz')
+def healthz():
+    return jsonify({'status': 'ok'})
+
+
+@app.route('/readyz')
+def readyz():
+    body = {'status': 'ready', 'firestore_backend': FIRESTORE_BACKEND if FIREBASE_AVAILABLE else 'none'}
+    if WARMUP and not warmup_done.is_set():
+        body['status'] = 'warming'
+        return jsonify(body), 503
+
+    client = db.get()
+    if db.init_seconds is not None:
+        body['firestore_init_ms'] = round(db.init_seconds * 1000, 2)
+    if client is None:
+        if FIRESTORE_BACKEND == 'firebase' and FIREBASE_LIBRARY_FOUND and firebase_configured():
+            body['status'] = 'firestore unavailable'
+            return jsonify(body), 503
+        return jsonify(body)
+
+    started = time.perf_counter()
+    try:
+        client.collection('app_config').document('broadcast').get(field_paths=['message'])
+    except Exception as e:
+        body.update({'status': 'firestore unavailable', 'error': str(e)})
+        return jsonify(body), 503
+    body['firestore_latency_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return jsonify(body)
+
+
+if WARMUP:
+    threading.Thread(target=warm_up, name='warmup', daemon=True).start()
+
+
 # --- Main Entry Point ---
 
 if __name__ == '__main__':
@@ -0,0 +1,449 @@
+"""Latency, allocations and storage operations of the main API routes for heavy users.
+
+Run from web/:
+    python benchmarks/bench_api.py [--backend memory|sqlite] [--sizes 100,1000,10000,50000,200000]
+    python benchmarks/bench_api.py --compare results/before.json results/after.json
+
+One synthetic user is seeded per size, with that many transactions spread over
+three profiles and a few dozen sources, next to `--users` light background users.
+Every scenario is then driven through the Flask test client. The `memory` backend
+runs the Firestore code paths against fake_firestore (set `--latency-ms` to add a
+simulated round trip). The `sqlite` backend runs offline mode, with profiles held
+in the server-side session store. Results go to benchmarks/results/ as JSON, and
+`--compare` prints the p50/p95 change between two result files.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+
+WEB_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+sys.path.insert(0, WEB_DIR)
+
+DEFAULT_SIZES = '100,1000,10000,50000,200000'
+
+# Share of a user's transactions in each profile; the first is the active one.
+PROFILE_SHARES = {'Default': 0.7, 'Grinding': 0.2, 'Events': 0.1}
+
+SOURCES = [
+    'Ads', 'Login', 'Daily Games', 'Event Reward', 'Campaign Reward', 'Weekly Chest',
+    'Referral', 'Tournament', 'Season Pass', 'Achievement', 'Streak Bonus', 'Gift',
+] + [f'Quest {i}' for i in range(1, 21)]
+SPEND_SOURCES = ['Box Draw (Single)', 'Box Draw (10)', 'Shop', 'Skin Upgrade', 'Revive', 'Energy Refill']
+
+BROWSER_HEADERS = {
+    'X-Requested-With': 'XMLHttpRequest',
+    'Accept': 'application/json',
+    'Accept-Encoding': 'gzip, deflate, br',
+}
+
+
+# --- Synthetic data ---
+
+def make_transactions(rng, count, days=3 * 365):
+    """`count` transactions, oldest first, spread evenly over the last `days` days."""
+    start = datetime.now(timezone.utc) - timedelta(days=days)
+    step = days * 86400 / max(count, 1)
+    transactions = []
+    for i in range(count):
+        if rng.random() < 0.7:
+            amount, source = rng.choice((10, 50, 100, 150, 200)), rng.choice(SOURCES)
+        else:
+            amount, source = -rng.choice((100, 250, 500, 900)), rng.choice(SPEND_SOURCES)
+        transactions.append({
+            'id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'date': (start + timedelta(seconds=i * step + rng.random() * step)).isoformat(),
+            'amount': amount,
+            'source': source,
+        })
+    return transactions
+
+
+def make_profiles(rng, total):
+    profiles = {}
+    for name, share in PROFILE_SHARES.items():
+        profiles[name] = {
+            'transactions': make_transactions(rng, int(total * share)),
+            'settings': {'goal': 13500, 'dark_mode': False},
+            'last_updated': datetime.now(timezone.utc).isoformat(),
+        }
+    return profiles
+
+
+# --- Backends ---
+
+class Backend:
+    """Seeds users and reports the storage operations each request performed."""
+
+    name = None
+
+    def __init__(self, web_app, rng):
+        self.web_app = web_app
+        self.rng = rng
+
+    def seed_background_users(self, count):
+        pass
+
+    def login(self, client, user_id, profiles, role='user'):
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+            sess['username'] = user_id
+            sess['role'] = role
+            sess['current_profile'] = 'Default'
+            self.seed_user(sess, user_id, profiles)
+
+    def supports(self, scenario):
+        return True
+
+    def begin_request(self):
+        pass
+
+    def end_request(self):
+        return {}
+
+    def stored_bytes(self, user_id):
+        return 0
+
+
+class MemoryBackend(Backend):
+    name = 'memory'
+
+    def __init__(self, web_app, rng):
+        super().__init__(web_app, rng)
+        self.fake = web_app.db.get()._client
+        # Heavy users are the point of the exercise; report the limit instead of enforcing it.
+        self.fake.max_document_bytes = None
+        self.captured = []
+
+        @web_app.app.after_request
+        def capture_firestore_stats(response):
+            # Registered after init_metrics, so it runs before the stats are popped.
+            from flask import g
+            stats = g.get('firestore_stats')
+            if stats is not None:
+                self.captured.append(stats.as_dict())
+            return response
+
+    def seed_user(self, sess, user_id, profiles):
+        self.fake.collection('users').document(user_id).set({
+            'username': user_id, 'username_lower': user_id.lower(), 'password_hash': '',
+            'created_at': datetime.now(timezone.utc).isoformat(), 'role': 'user',
+        })
+        self.fake.collection('user_data').document(user_id).set({
+            'profiles': profiles, 'last_active_profile': 'Default',
+        })
+
+    def seed_background_users(self, count):
+        for i in range(count):
+            user_id = f'background-{i:03d}'
+            self.seed_user(None, user_id, make_profiles(self.rng, self.rng.randint(100, 1000)))
+
+    def begin_request(self):
+        self.captured.clear()
+
+    def end_request(self):
+        return self.captured[-1] if self.captured else {}
+
+    def stored_bytes(self, user_id):
+        return self.fake.document_bytes(f'user_data/{user_id}')
+
+
+class SQLiteBackend(Backend):
+    name = 'sqlite'
+
+    def __init__(self, web_app, rng):
+        super().__init__(web_app, rng)
+        from session_store import SQLiteSessionInterface, session_serializer
+
+        backend = self
+
+        class CountingSessionInterface(SQLiteSessionInterface):
+            def load(self, sid):
+                data = super().load(sid)
+                backend.events.append(('read', data))
+                return data
+
+            def store(self, sid, data, expires_at):
+                super().store(sid, data, expires_at)
+                backend.events.append(('write', data))
+
+            def touch(self, sid, expires_at):
+                super().touch(sid, expires_at)
+                backend.events.append(('write', None))
+
+        self.serializer = session_serializer
+        self.events = []
+        self.interface = CountingSessionInterface(
+            os.path.join(web_app.app.instance_path, 'bench-sessions.sqlite3'), max_bytes=1 << 31
+        )
+        web_app.app.session_interface = self.interface
+        self.last_session = None
+
+    def seed_user(self, sess, user_id, profiles):
+        sess['profiles'] = profiles
+        self.last_session = sess
+
+    def supports(self, scenario):
+        # The admin routes require Firestore.
+        return not scenario.admin
+
+    def begin_request(self):
+        self.events.clear()
+
+    def end_request(self):
+        # Sizes are computed after timing so the accounting doesn't inflate latency.
+        stats = {'reads': 0, 'writes': 0, 'deletes': 0, 'bytes_read': 0, 'bytes_written': 0}
+        for kind, data in self.events:
+            size = len(self.serializer.dumps(data)) if data is not None else 0
+            stats[kind + 's'] += 1
+            stats['bytes_read' if kind == 'read' else 'bytes_written'] += size
+        return stats
+
+    def stored_bytes(self, user_id):
+        if self.last_session is None:
+            return 0
+        return len(self.serializer.dumps(dict(self.last_session)))
+
+
+BACKENDS = {'memory': MemoryBackend, 'sqlite': SQLiteBackend}
+
+
+# --- Scenarios ---
+
+class Scenario:
+    def __init__(self, name, method, path, body=None, admin=False):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+        self.admin = admin
+
+
+def build_scenarios(rng, active):
+    """Scenarios for a user whose active profile holds `active` transactions."""
+    last_page = max(1, (len(active) + 19) // 20)
+    middle = datetime.fromisoformat(active[len(active) // 2]['date']).date() if active else datetime.now().date()
+    import_body = json.dumps({'transactions': active, 'settings': {'goal': 13500}}).encode()
+
+    def add_body():
+        return json.dumps({
+            'amount': rng.choice((10, 50, 100)),
+            'source': rng.choice(SOURCES),
+            'date': datetime.now(timezone.utc).isoformat(),
+        }).encode()
+
+    return [
+        Scenario('data', 'GET', '/api/data'),
+        Scenario('history_first_page', 'GET', '/api/history?page=1&limit=20'),
+        Scenario('history_deep_page', 'GET', f'/api/history?page={last_page}&limit=20'),
+        Scenario('history_search', 'GET', '/api/history?page=1&limit=20&search=quest 1'),
+        Scenario('history_date_range', 'GET',
+                 f'/api/history?page=1&limit=20&date_from={middle - timedelta(days=15)}&date_to={middle + timedelta(days=15)}'),
+        Scenario('admin_stats', 'GET', '/api/admin/stats', admin=True),
+        Scenario('admin_users', 'GET', '/api/admin/users', admin=True),
+        # Writes last so the reads above see the seeded state.
+        Scenario('add_transaction', 'POST', '/api/add-transaction', add_body),
+        Scenario('import_data', 'POST', '/api/import-data', lambda: import_body),
+    ]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def send(client, scenario):
+    kwargs = {'headers': BROWSER_HEADERS}
+    if scenario.body is not None:
+        kwargs['data'] = scenario.body()
+        kwargs['content_type'] = 'application/json'
+    started = time.perf_counter()
+    response = client.open(scenario.path, method=scenario.method, **kwargs)
+    body = response.get_data()
+    return time.perf_counter() - started, response.status_code, len(body)
+
+
+def run_scenario(backend, client, scenario, requests, warmup, alloc_requests, max_seconds):
+    for _ in range(warmup):
+        send(client, scenario)
+
+    timings, statuses, storage = [], set(), []
+    response_bytes = 0
+    deadline = time.perf_counter() + max_seconds
+    for i in range(requests):
+        # Big profiles take seconds per request; stop early once the budget is spent.
+        if i >= 3 and time.perf_counter() > deadline:
+            break
+        backend.begin_request()
+        seconds, status, response_bytes = send(client, scenario)
+        storage.append(backend.end_request())
+        timings.append(seconds * 1000)
+        statuses.add(status)
+
+    peaks, nets = [], []
+    tracemalloc.start()
+    for _ in range(alloc_requests):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        send(client, scenario)
+        after, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+        nets.append(after - before)
+    tracemalloc.stop()
+
+    timings.sort()
+    fields = ('reads', 'writes', 'deletes', 'bytes_read', 'bytes_written')
+    return {
+        'scenario': scenario.name,
+        'method': scenario.method,
+        'path': scenario.path,
+        'statuses': sorted(statuses),
+        'requests': len(timings),
+        'p50_ms': round(percentile(timings, 0.50), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'response_bytes': response_bytes,
+        'alloc_peak_kb': round(sum(peaks) / len(peaks) / 1024, 1) if peaks else None,
+        'alloc_retained_kb': round(sum(nets) / len(nets) / 1024, 1) if nets else None,
+        'storage_per_request': {
+            field: round(sum(s.get(field, 0) for s in storage) / len(storage), 1) for field in fields
+        },
+    }
+
+
+# --- Reporting ---
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=WEB_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_row(size, row):
+    s = row['storage_per_request']
+    status = ','.join(str(code) for code in row['statuses'])
+    print(f"{size:>7} {row['scenario']:<20} {status:>7} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} "
+          f"{row['alloc_peak_kb']:>10,.0f} {s['reads']:>6.1f} {s['writes']:>6.1f} "
+          f"{s['bytes_read'] / 1024:>9,.0f} {s['bytes_written'] / 1024:>9,.0f}")
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    before = {(r['size'], r['scenario']): r for r in old['results']}
+    print(f"{old_path} ({old['meta'].get('git_revision')}) -> {new_path} ({new['meta'].get('git_revision')})")
+    print(f"{'size':>7} {'scenario':<20} {'p50 ms':>17} {'p95 ms':>17} {'change':>8}")
+    for row in new['results']:
+        prev = before.get((row['size'], row['scenario']))
+        if prev is None:
+            continue
+        change = (row['p50_ms'] / prev['p50_ms'] - 1) * 100 if prev['p50_ms'] else 0.0
+        print(f"{row['size']:>7} {row['scenario']:<20} {prev['p50_ms']:>8.2f}→{row['p50_ms']:<8.2f} "
+              f"{prev['p95_ms']:>8.2f}→{row['p95_ms']:<8.2f} {change:>+7.1f}%")
+
+
+# --- Main ---
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='memory')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='comma-separated transaction counts per heavy user')
+    parser.add_argument('--users', type=int, default=20, help='light background users (memory backend)')
+    parser.add_argument('--requests', type=int, default=20, help='timed requests per scenario')
+    parser.add_argument('--max-seconds', type=float, default=20.0,
+                        help='stop a scenario after this long (at least 3 requests are always timed)')
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--alloc-requests', type=int, default=3, help='requests per scenario traced with tracemalloc')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='simulated Firestore round trip (memory backend)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true', help="show the app's own log output")
+    parser.add_argument('--output', help='result file (default: results/bench_api-<backend>-<timestamp>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two result files and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    # The app picks its storage at import time.
+    tmp = tempfile.TemporaryDirectory()
+    os.environ['FIRESTORE_BACKEND'] = 'memory' if args.backend == 'memory' else 'none'
+    os.environ['FIRESTORE_FAKE_LATENCY_MS'] = str(args.latency_ms)
+    os.environ['FIRESTORE_METRICS_BYTES'] = '1'
+    os.environ['SESSION_BACKEND'] = 'cookie' if args.backend == 'memory' else 'sqlite'
+    os.environ['SESSION_DB_PATH'] = os.path.join(tmp.name, 'sessions.sqlite3')
+    import app as web_app
+    web_app.app.instance_path = tmp.name
+
+    rng = random.Random(args.seed)
+    backend = BACKENDS[args.backend](web_app, rng)
+    if args.backend == 'memory':
+        backend.seed_background_users(args.users)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    results = []
+    print(f"backend={args.backend} latency={args.latency_ms}ms requests={args.requests}")
+    print(f"{'txns':>7} {'scenario':<20} {'status':>7} {'p50 ms':>9} {'p95 ms':>9} {'alloc KB':>10} "
+          f"{'reads':>6} {'writes':>6} {'KB read':>9} {'KB write':>9}")
+    for size in sizes:
+        user_id = f'heavy-{size}'
+        profiles = make_profiles(rng, size)
+        client = web_app.app.test_client()
+        backend.login(client, user_id, profiles, role='admin')
+        stored = backend.stored_bytes(user_id)
+        note = ' (over the 1 MiB Firestore document limit)' if args.backend == 'memory' and stored > 1 << 20 else ''
+        print(f"-- {user_id}: {stored / 1024:,.0f} KB stored{note}")
+
+        for scenario in build_scenarios(rng, profiles['Default']['transactions']):
+            if not backend.supports(scenario):
+                continue
+            app_output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+            with app_output:
+                row = run_scenario(backend, client, scenario, args.requests, args.warmup,
+                                   args.alloc_requests, args.max_seconds)
+            row['size'] = size
+            row['stored_bytes'] = stored
+            results.append(row)
+            print_row(size, row)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"bench_api-{args.backend}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'meta': {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'git_revision': git_revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'backend': args.backend,
+                'latency_ms': args.latency_ms,
+                'requests': args.requests,
+                'background_users': args.users if args.backend == 'memory' else 0,
+                'seed': args.seed,
+            },
+            'results': results,
+        }, f, indent=2)
+    print(f"Saved {output}")
+    tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
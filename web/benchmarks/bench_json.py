@@ -0,0 +1,78 @@
+"""Encode time and bytes on the wire for realistic /api/data and /api/history payloads.
+
+Run from web/:  python benchmarks/bench_json.py [--repeat 5]
+
+Payloads come from the real routes (offline mode, server-side session) for
+profiles of increasing size. Each is encoded with the standard library and, if
+installed, orjson; then gzip and brotli sizes and compression times are shown.
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as web_app  # noqa: E402
+from bench_session import make_transactions  # noqa: E402
+from compression import brotli  # noqa: E402
+from json_provider import orjson  # noqa: E402
+from session_store import SQLiteSessionInterface  # noqa: E402
+
+PROFILE_SIZES = [100, 1000, 10000, 50000]
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings), result
+
+
+def fetch_payloads(client, transactions):
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'bench-user'
+        sess['current_profile'] = 'Default'
+        sess['profiles'] = {'Default': {'transactions': transactions, 'settings': {}}}
+    return {
+        '/api/data': client.get('/api/data').get_json(),
+        '/api/history': client.get('/api/history?page=1&limit=20').get_json(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        web_app.app.session_interface = SQLiteSessionInterface(
+            os.path.join(tmp, 'sessions.sqlite3'), max_bytes=1 << 30
+        )
+        client = web_app.app.test_client()
+
+        print(f"{'txns':>6} {'route':<13} {'raw bytes':>11} {'json ms':>8} {'orjson ms':>10} "
+              f"{'gzip bytes':>11} {'gzip ms':>8} {'br bytes':>10} {'br ms':>7}")
+        for size in PROFILE_SIZES:
+            payloads = fetch_payloads(client, make_transactions(size))
+            for route, payload in payloads.items():
+                json_ms, raw = best_of(args.repeat, lambda: json.dumps(payload, separators=(',', ':')).encode())
+                orjson_ms = best_of(args.repeat, lambda: orjson.dumps(payload))[0] if orjson else None
+                gzip_ms, gzipped = best_of(args.repeat, lambda: gzip.compress(raw, compresslevel=6, mtime=0))
+                if brotli:
+                    br_ms, brotlied = best_of(args.repeat, lambda: brotli.compress(raw, quality=4))
+                    br_cols = f"{len(brotlied):>10,} {br_ms:>7.2f}"
+                else:
+                    br_cols = f"{'n/a':>10} {'n/a':>7}"
+                orjson_col = f"{orjson_ms:>10.2f}" if orjson_ms is not None else f"{'n/a':>10}"
+                print(f"{size:>6} {route:<13} {len(raw):>11,} {json_ms:>8.2f} {orjson_col} "
+                      f"{len(gzipped):>11,} {gzip_ms:>8.2f} {br_cols}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Request overhead of the session backends as the offline history grows.
+
+Run from web/:  python benchmarks/bench_session.py [--requests 50]
+
+For each history size the same offline profile is loaded into a cookie session
+and a server-side SQLite session, then `/api/data` is requested repeatedly. The
+report shows the Cookie header each request carries and the mean server time.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+import warnings
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask.sessions import SecureCookieSessionInterface  # noqa: E402
+
+import app as web_app  # noqa: E402
+from session_store import COOKIE_SESSION_LIMIT, SQLiteSessionInterface  # noqa: E402
+
+HISTORY_SIZES = [0, 10, 50, 200, 1000, 5000]
+
+
+def make_transactions(count):
+    start = datetime.now(timezone.utc) - timedelta(days=count)
+    sources = ['Ads', 'Login', 'Daily Games', 'Event Reward', 'Box Draw']
+    return [
+        {
+            'id': str(uuid.uuid4()),
+            'date': (start + timedelta(hours=i)).isoformat(),
+            'amount': -100 if i % 7 == 0 else 50,
+            'source': sources[i % len(sources)],
+        }
+        for i in range(count)
+    ]
+
+
+def run(interface, transactions, requests):
+    web_app.app.session_interface = interface
+    client = web_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 'bench-user'
+        sess['current_profile'] = 'Default'
+        sess['profiles'] = {'Default': {'transactions': transactions, 'settings': {}}}
+
+    cookie = client.get_cookie(web_app.app.config['SESSION_COOKIE_NAME'])
+    cookie_bytes = len(cookie.key) + len(cookie.value) if cookie else 0
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = client.get('/api/data')
+        assert response.status_code == 200, response.status_code
+    elapsed_ms = (time.perf_counter() - started) * 1000 / requests
+    return cookie_bytes, elapsed_ms
+
+
+def main():
+    warnings.filterwarnings('ignore', message="The 'session' cookie is too large")
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {
+            'cookie': SecureCookieSessionInterface(),
+            'sqlite': SQLiteSessionInterface(os.path.join(tmp, 'sessions.sqlite3')),
+        }
+        print(f"{'history':>8} {'backend':>8} {'cookie bytes':>13} {'ms/request':>11}")
+        for size in HISTORY_SIZES:
+            transactions = make_transactions(size)
+            for name, interface in backends.items():
+                cookie_bytes, ms = run(interface, transactions, args.requests)
+                note = '  (over browser limit)' if cookie_bytes > COOKIE_SESSION_LIMIT else ''
+                print(f"{size:>8} {name:>8} {cookie_bytes:>13,} {ms:>11.2f}{note}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Time from process start to the first useful response.
+
+Run from web/:  python benchmarks/bench_startup.py [--runs 5] [--server werkzeug]
+
+Each run starts a fresh server process and polls it. The report shows when the
+first /healthz answered (process is serving), when /readyz first returned 200
+(backend usable), and how long the first page request after that took. Use
+`--env WARMUP=1` to compare against a warmed start.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+WEB_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WERKZEUG_SERVER = (
+    "import sys; from werkzeug.serving import run_simple; from app import app; "
+    "run_simple('127.0.0.1', int(sys.argv[1]), app, threaded=True)"
+)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(server, port):
+    if server == 'gunicorn':
+        return [sys.executable, '-m', 'gunicorn', 'app:app', '--bind', f'127.0.0.1:{port}', '--workers', '1']
+    return [sys.executable, '-c', WERKZEUG_SERVER, str(port)]
+
+
+def fetch(url):
+    """Returns (status, seconds) for one GET, or (None, seconds) if nothing is listening yet."""
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=10) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, ConnectionError):
+        status = None
+    return status, time.perf_counter() - started
+
+
+def wait_for(url, started, deadline, poll):
+    while time.perf_counter() < deadline:
+        status, _ = fetch(url)
+        if status == 200:
+            return time.perf_counter() - started
+        time.sleep(poll)
+    raise TimeoutError(f"{url} did not return 200 in time")
+
+
+def run_once(args, env):
+    port = free_port()
+    base = f'http://127.0.0.1:{port}'
+    output = None if args.verbose else subprocess.DEVNULL
+    started = time.perf_counter()
+    process = subprocess.Popen(server_command(args.server, port), cwd=WEB_DIR, env=env,
+                               stdout=output, stderr=output)
+    try:
+        deadline = started + args.timeout
+        healthy = wait_for(base + '/healthz', started, deadline, args.poll)
+        ready = wait_for(base + '/readyz', started, deadline, args.poll)
+        status, first_page = fetch(base + args.path)
+        if status is None or status >= 500:
+            raise RuntimeError(f"{args.path} returned {status}")
+        return {'healthz': healthy, 'readyz': ready, 'first_page': first_page}
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--server', choices=['werkzeug', 'gunicorn'], default='werkzeug')
+    parser.add_argument('--path', default='/login', help='page requested once the server is ready')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='extra environment for the server (repeatable)')
+    parser.add_argument('--timeout', type=float, default=60.0, help='seconds to wait for each server')
+    parser.add_argument('--poll', type=float, default=0.005, help='seconds between polls')
+    parser.add_argument('--verbose', action='store_true', help="show the server's own log output")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('FIRESTORE_BACKEND', 'memory')
+    for item in args.env:
+        key, _, value = item.partition('=')
+        env[key] = value
+
+    runs = [run_once(args, env) for _ in range(args.runs)]
+
+    print(f"{args.server}, FIRESTORE_BACKEND={env['FIRESTORE_BACKEND']}, {args.runs} runs (median / max ms)")
+    for name, label in (('healthz', 'first /healthz 200'), ('readyz', 'first /readyz 200'),
+                        ('first_page', f'first {args.path} request')):
+        values = [run[name] * 1000 for run in runs]
+        print(f"  {label:<24} {statistics.median(values):>9.1f} {max(values):>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
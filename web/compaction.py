@@ -0,0 +1,141 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+
+# Rows per archive document; keeps a busy month well under Firestore's 1 MiB limit.
+ARCHIVE_SEGMENT_ROWS = 5000
+
+
+def month_of(transaction):
+    """'YYYY-MM' from the transaction's ISO date, or '' when it has no usable date."""
+    value = transaction.get('date') or ''
+    return value[:7] if len(value) >= 10 and value[4] == '-' else ''
+
+
+def parse_date(value):
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def month_bounds(month):
+    year, number = int(month[:4]), int(month[5:7])
+    first = date(year, number, 1)
+    next_first = date(year + number // 12, number % 12 + 1, 1)
+    return first, next_first - timedelta(days=1)
+
+
+def cutoff_month(horizon_days, today=None):
+    """Months before the returned one are compacted.
+
+    The current and previous month always stay live, so the dashboard's today,
+    week and month figures never need the archive.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    previous = (today.replace(day=1) - timedelta(days=1)).strftime('%Y-%m')
+    return min((today - timedelta(days=horizon_days)).strftime('%Y-%m'), previous)
+
+
+def split_for_archive(transactions, cutoff):
+    """Returns ({month: rows} older than `cutoff`, rows that stay live)."""
+    old, live = defaultdict(list), []
+    for t in transactions:
+        month = month_of(t)
+        if month and month < cutoff:
+            old[month].append(t)
+        else:
+            live.append(t)
+    return dict(old), live
+
+
+def summarize_month(month, rows):
+    """Checkpoint for one archived month: totals, per-source totals and what achievements need."""
+    by_source = defaultdict(lambda: {'count': 0, 'earned': 0, 'spent': 0})
+    earned = spent = 0
+    first_earning = last_spend = None
+    login_days = set()
+    for t in rows:
+        amount = t.get('amount', 0)
+        source = by_source[t.get('source', '')]
+        source['count'] += 1
+        if amount > 0:
+            earned += amount
+            source['earned'] += amount
+            if first_earning is None or parse_date(t['date']) < parse_date(first_earning):
+                first_earning = t['date']
+            if t.get('source', '').lower() == 'login':
+                login_days.add(parse_date(t['date']).date().isoformat())
+        elif amount < 0:
+            spent += -amount
+            source['spent'] += -amount
+            if last_spend is None or t['date'] > last_spend:
+                last_spend = t['date']
+    dates = sorted(t['date'] for t in rows)
+    return {
+        'month': month,
+        'count': len(rows),
+        'earned': earned,
+        'spent': spent,
+        'by_source': dict(by_source),
+        'first_date': dates[0] if dates else None,
+        'last_date': dates[-1] if dates else None,
+        'first_earning_date': first_earning,
+        'last_spend_date': last_spend,
+        'login_days': sorted(login_days),
+        'segments': max(1, -(-len(rows) // ARCHIVE_SEGMENT_ROWS)),
+    }
+
+
+def chain(checkpoints):
+    """Sorts checkpoints by month and fills in opening and closing balances."""
+    balance = 0
+    ordered = sorted(checkpoints, key=lambda cp: cp['month'])
+    for cp in ordered:
+        cp['opening_balance'] = balance
+        balance += cp['earned'] - cp['spent']
+        cp['closing_balance'] = balance
+    return ordered
+
+
+def archived_balance(checkpoints):
+    return sum(cp['earned'] - cp['spent'] for cp in checkpoints)
+
+
+def segments(rows):
+    rows = sorted(rows, key=lambda x: x.get('date', ''))
+    return [rows[i:i + ARCHIVE_SEGMENT_ROWS] for i in range(0, len(rows), ARCHIVE_SEGMENT_ROWS)] or [[]]
+
+
+def merge_rows(existing, new):
+    """Archived rows plus newly folded ones; a row already archived (same id) is replaced, not duplicated."""
+    merged = {t.get('id'): t for t in existing}
+    merged.update({t.get('id'): t for t in new})
+    return list(merged.values())
+
+
+def filter_date(value):
+    # History ignores a date filter it can't parse.
+    try:
+        return datetime.fromisoformat(value).date() if value else None
+    except (ValueError, TypeError):
+        return None
+
+
+def checkpoint_stats(checkpoint, filters):
+    """(count, earned, spent) of the rows in an archived month that match the history filters.
+
+    Returns None when the checkpoint can't answer on its own (a text search, or a date
+    range that cuts through the month), in which case the rows have to be loaded.
+    """
+    if filters.get('search'):
+        return None
+    first, last = month_bounds(checkpoint['month'])
+    date_from, date_to = filter_date(filters.get('date_from')), filter_date(filters.get('date_to'))
+    if (date_from and date_from > last) or (date_to and date_to < first):
+        return 0, 0, 0
+    if (date_from and date_from > first) or (date_to and date_to < last):
+        return None
+    if filters.get('source'):
+        source = checkpoint['by_source'].get(filters['source'])
+        if source is None:
+            return 0, 0, 0
+        return source['count'], source['earned'], -source['spent']
+    return checkpoint['count'], checkpoint['earned'], -checkpoint['spent']
@@ -0,0 +1,79 @@
+import copy
+import hashlib
+import json
+import threading
+import time
+
+
+class AppConfigCache:
+    """Per-process TTL cache for small documents in the `app_config` collection.
+
+    `client_factory` returns the Firestore client (or None when offline). Writes made
+    through `set` update the local entry immediately; other worker processes pick the
+    change up once their entry expires.
+    """
+
+    collection = 'app_config'
+
+    def __init__(self, client_factory, ttl=300):
+        self.client_factory = client_factory
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_etag(data):
+        encoded = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str).encode()
+        return hashlib.sha1(encoded).hexdigest()
+
+    def _store(self, name, data):
+        entry = (copy.deepcopy(data), self.make_etag(data), time.monotonic() + self.ttl)
+        with self._lock:
+            self._entries[name] = entry
+        return entry
+
+    def get(self, name, default=None):
+        """Returns `(data, etag)` for `app_config/{name}`, or `default` if the document is missing."""
+        default = {} if default is None else default
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry and entry[2] > time.monotonic():
+            self.hits += 1
+            return copy.deepcopy(entry[0]), entry[1]
+
+        self.misses += 1
+        client = self.client_factory()
+        if client is None:
+            return copy.deepcopy(default), self.make_etag(default)
+        try:
+            doc = client.collection(self.collection).document(name).get()
+            data = doc.to_dict() if doc.exists else None
+        except Exception as e:
+            print(f"App config load error for '{name}': {e}")
+            if entry:
+                return copy.deepcopy(entry[0]), entry[1]
+            return copy.deepcopy(default), self.make_etag(default)
+
+        data, etag, _ = self._store(name, data if data is not None else default)
+        return copy.deepcopy(data), etag
+
+    def set(self, name, data):
+        """Writes `app_config/{name}` and refreshes this process's entry without a re-read."""
+        client = self.client_factory()
+        if client is None:
+            raise RuntimeError('Database not available')
+        client.collection(self.collection).document(name).set(data)
+        return self._store(name, data)[1]
+
+    def invalidate(self, name=None):
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,94 @@
+import json
+import os
+from collections import Counter, defaultdict
+
+from flask import g, request, session
+
+TRACE_HEADER = 'X-Firestore-Trace'
+
+# Distinct documents fetched one by one from the same collection before it looks like N+1.
+N_PLUS_ONE_THRESHOLD = 5
+
+# Header values over this size are cut down to the summary and warnings.
+MAX_HEADER_BYTES = 6000
+
+
+def analyze(ops, route):
+    """Returns warnings for wasteful access patterns in one request's Firestore trace."""
+    warnings = []
+
+    gets = Counter(op['path'] for op in ops if op['op'] == 'get')
+    for path, n in gets.items():
+        if n > 1:
+            warnings.append({'type': 'redundant_read', 'path': path, 'count': n,
+                             'message': f"{path} read {n} times in one request"})
+
+    by_collection = defaultdict(set)
+    for path in gets:
+        collection, _, doc_id = path.rpartition('/')
+        by_collection[collection].add(doc_id)
+    for collection, doc_ids in by_collection.items():
+        if len(doc_ids) >= N_PLUS_ONE_THRESHOLD:
+            warnings.append({'type': 'n_plus_one', 'path': collection, 'count': len(doc_ids),
+                             'message': f"{len(doc_ids)} separate document reads from {collection}; batch them with get_all()"})
+
+    if not route.startswith('/api/admin'):
+        for op in ops:
+            if op['scan']:
+                warnings.append({'type': 'collection_scan', 'path': op['path'], 'count': op['docs'],
+                                 'message': f"Unfiltered scan of {op['path']} ({op['docs']} docs) on a user-facing route"})
+    return warnings
+
+
+def summarize(stats, route):
+    ops = stats.ops or []
+    return {
+        'route': route,
+        'totals': {**stats.as_dict(), 'ms': round(sum(op['ms'] for op in ops), 2), 'ops': len(ops)},
+        'warnings': analyze(ops, route),
+        'ops': ops,
+    }
+
+
+def init_firestore_trace(app):
+    """Collects a per-request Firestore trace when asked to.
+
+    FIRESTORE_TRACE=1 traces every request and logs the ones with warnings. Admins (or
+    anyone, while FIRESTORE_TRACE is on) can send `X-Firestore-Trace: 1` to get the
+    trace back in the response header of the same name. Must be installed after
+    `init_metrics`, which creates the per-request stats object.
+    """
+    trace_all = os.environ.get('FIRESTORE_TRACE', '').lower() in ('1', 'true', 'yes')
+
+    def header_requested():
+        if request.headers.get(TRACE_HEADER) != '1':
+            return False
+        return trace_all or app.debug or session.get('role') == 'admin'
+
+    @app.before_request
+    def start_firestore_trace():
+        g.firestore_trace_header = header_requested()
+        if trace_all or g.firestore_trace_header:
+            g.firestore_stats.enable_trace()
+
+    @app.after_request
+    def finish_firestore_trace(response):
+        stats = g.get('firestore_stats')
+        if stats is None or stats.ops is None:
+            return response
+        route = request.url_rule.rule if request.url_rule else '<unmatched>'
+        trace = summarize(stats, route)
+
+        if trace_all and trace['warnings']:
+            for warning in trace['warnings']:
+                print(f"⚠️ Firestore {warning['type']} in {request.method} {route}: {warning['message']}")
+
+        if g.get('firestore_trace_header'):
+            encoded = json.dumps(trace, separators=(',', ':'), ensure_ascii=True)
+            if len(encoded) > MAX_HEADER_BYTES:
+                trace['ops'] = trace['ops'][:10]
+                trace['truncated'] = True
+                encoded = json.dumps(trace, separators=(',', ':'), ensure_ascii=True)
+            response.headers[TRACE_HEADER] = encoded
+            response.headers['Server-Timing'] = f"firestore;dur={trace['totals']['ms']};desc=\"{trace['totals']['ops']} ops\""
+        return response
@@ -0,0 +1,231 @@
+import contextvars
+import json
+import threading
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Stats object for the request currently being served (None outside requests).
+current_stats = contextvars.ContextVar('firestore_stats', default=None)
+
+
+def document_size(data):
+    """Approximate stored size of a document: the length of its compact JSON encoding."""
+    if data is None:
+        return 0
+    if orjson is not None:
+        try:
+            return len(orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS))
+        except TypeError:
+            pass
+    return len(json.dumps(data, default=str, separators=(',', ':')))
+
+
+class FirestoreStats:
+    """Firestore operations performed while serving one request.
+
+    Counters are always kept; the per-operation trace is only collected after
+    `enable_trace()` because it holds one entry per call. Byte counts need every
+    document encoded, so they are only measured with `measure_bytes` or a trace.
+    """
+
+    def __init__(self, measure_bytes=False):
+        self.measure_bytes = measure_bytes
+        self.reads = 0
+        self.writes = 0
+        self.deletes = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.ops = None
+        self._lock = threading.Lock()
+
+    def enable_trace(self):
+        if self.ops is None:
+            self.ops = []
+
+    @property
+    def measures_bytes(self):
+        return self.measure_bytes or self.ops is not None
+
+    def record(self, kind, op, path, seconds=0.0, nbytes=0, count=1, scan=False):
+        with self._lock:
+            if kind == 'read':
+                self.reads += count
+                self.bytes_read += nbytes
+            elif kind == 'write':
+                self.writes += count
+                self.bytes_written += nbytes
+            elif kind == 'delete':
+                self.deletes += count
+            if self.ops is not None:
+                self.ops.append({
+                    'op': op,
+                    'path': path,
+                    'ms': round(seconds * 1000, 2),
+                    'bytes': nbytes,
+                    'docs': count,
+                    'scan': scan,
+                })
+
+    def as_dict(self):
+        return {
+            'reads': self.reads,
+            'writes': self.writes,
+            'deletes': self.deletes,
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+        }
+
+
+def record(kind, op, path, seconds=0.0, nbytes=0, count=1, scan=False):
+    stats = current_stats.get()
+    if stats is not None:
+        stats.record(kind, op, path, seconds, nbytes, count, scan)
+
+
+def measured_size(data):
+    """document_size(data) if the current request measures bytes, else 0."""
+    stats = current_stats.get()
+    return document_size(data) if stats is not None and stats.measures_bytes else 0
+
+
+# --- Wrappers ---
+# Each wrapper mirrors the slice of the google-cloud-firestore API the app uses and
+# delegates everything else to the wrapped object.
+
+class InstrumentedSnapshot:
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+        self._data = snapshot.to_dict() if snapshot.exists else None
+
+    def to_dict(self):
+        return self._data
+
+    def __getattr__(self, name):
+        return getattr(self._snapshot, name)
+
+
+def _describe(args, kwargs):
+    parts = [repr(a) for a in args] + [f"{k}={v!r}" for k, v in kwargs.items()]
+    return ', '.join(parts)
+
+
+class InstrumentedQuery:
+    def __init__(self, query, path, clauses=(), filtered=False):
+        self._query = query
+        self._path = path
+        self._clauses = clauses
+        # A query with neither a filter nor a limit reads the whole collection.
+        self._filtered = filtered
+
+    def _chain(self, query, clause, filtered=False):
+        return InstrumentedQuery(query, self._path, self._clauses + (clause,), self._filtered or filtered)
+
+    def where(self, *args, **kwargs):
+        return self._chain(self._query.where(*args, **kwargs), f"where({_describe(args, kwargs)})", True)
+
+    def order_by(self, *args, **kwargs):
+        return self._chain(self._query.order_by(*args, **kwargs), f"order_by({_describe(args, kwargs)})")
+
+    def limit(self, *args, **kwargs):
+        return self._chain(self._query.limit(*args, **kwargs), f"limit({_describe(args, kwargs)})", True)
+
+    def select(self, *args, **kwargs):
+        return self._chain(self._query.select(*args, **kwargs), f"select({_describe(args, kwargs)})")
+
+    def stream(self, *args, **kwargs):
+        returned = 0
+        nbytes = 0
+        seconds = 0.0
+        iterator = iter(self._query.stream(*args, **kwargs))
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    snapshot = next(iterator)
+                finally:
+                    seconds += time.perf_counter() - started
+                wrapped = InstrumentedSnapshot(snapshot)
+                returned += 1
+                nbytes += measured_size(wrapped.to_dict())
+                yield wrapped
+        except StopIteration:
+            pass
+        finally:
+            description = '.'.join((self._path,) + self._clauses)
+            # An empty query is still billed as one read.
+            record('read', 'query', description, seconds, nbytes, max(returned, 1), scan=not self._filtered)
+
+    def get(self, *args, **kwargs):
+        return list(self.stream(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._query, name)
+
+
+class InstrumentedDocument:
+    def __init__(self, ref):
+        self._ref = ref
+
+    @property
+    def path(self):
+        return self._ref.path
+
+    def get(self, *args, **kwargs):
+        started = time.perf_counter()
+        wrapped = InstrumentedSnapshot(self._ref.get(*args, **kwargs))
+        record('read', 'get', self.path, time.perf_counter() - started, measured_size(wrapped.to_dict()))
+        return wrapped
+
+    def set(self, document_data, *args, **kwargs):
+        started = time.perf_counter()
+        result = self._ref.set(document_data, *args, **kwargs)
+        record('write', 'set', self.path, time.perf_counter() - started, measured_size(document_data))
+        return result
+
+    def update(self, field_updates, *args, **kwargs):
+        started = time.perf_counter()
+        result = self._ref.update(field_updates, *args, **kwargs)
+        record('write', 'update', self.path, time.perf_counter() - started, measured_size(field_updates))
+        return result
+
+    def delete(self, *args, **kwargs):
+        started = time.perf_counter()
+        result = self._ref.delete(*args, **kwargs)
+        record('delete', 'delete', self.path, time.perf_counter() - started)
+        return result
+
+    def collection(self, name):
+        return InstrumentedCollection(self._ref.collection(name))
+
+    def __getattr__(self, name):
+        return getattr(self._ref, name)
+
+
+class InstrumentedCollection(InstrumentedQuery):
+    def __init__(self, ref):
+        path = getattr(ref, '_path', (ref.id,))
+        # A subcollection is already scoped to its parent document, so reading all of it isn't a scan.
+        super().__init__(ref, '/'.join(path), filtered=len(path) > 1)
+
+    def document(self, *args, **kwargs):
+        return InstrumentedDocument(self._query.document(*args, **kwargs))
+
+
+class InstrumentedClient:
+    """Wraps a Firestore client so every read, write and delete is counted against the current request."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def collection(self, name):
+        return InstrumentedCollection(self._client.collection(name))
+
+    def collection_group(self, collection_id):
+        return InstrumentedQuery(self._client.collection_group(collection_id), f'**/{collection_id}')
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
@@ -0,0 +1,62 @@
+import os
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider that encodes with orjson when it is installed.
+
+    Anything orjson refuses (e.g. integers beyond 64 bits) falls back to the standard
+    library encoder, so output is always produced. Keys are not sorted: nothing in the
+    frontend depends on key order and sorting costs time on large payloads.
+    """
+
+    sort_keys = False
+
+    def __init__(self, app, encoder='auto'):
+        super().__init__(app)
+        self.use_orjson = orjson is not None and encoder in ('auto', 'orjson')
+        self.encoder_name = 'orjson' if self.use_orjson else 'json'
+
+    def _orjson_options(self, indent=False):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps_bytes(self, obj, indent=False):
+        if self.use_orjson:
+            try:
+                return orjson.dumps(obj, default=self.default, option=self._orjson_options(indent))
+            except TypeError:
+                pass
+        dump_args = {'indent': 2} if indent else {'separators': (',', ':')}
+        return super().dumps(obj, **dump_args).encode()
+
+    def dumps(self, obj, **kwargs):
+        if not self.use_orjson or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent) + b"\n", mimetype=self.mimetype)
+
+
+def init_json_provider(app):
+    """Installs FastJSONProvider; JSON_ENCODER=stdlib forces the standard library encoder."""
+    app.json = FastJSONProvider(app, encoder=os.environ.get('JSON_ENCODER', 'auto'))
+    print(f"JSON encoder: {app.json.encoder_name}")
@@ -0,0 +1,45 @@
+import threading
+import time
+
+
+class LazyClient:
+    """Builds a client on first use instead of at import time.
+
+    `factory` returns the client, or None when the service is unavailable; either
+    result is kept, so a failed setup is not retried on every request. Setup runs
+    once even when several threads ask at the same time. The proxy is falsy while the
+    client is None, and attribute access is forwarded, so `if db:` and
+    `db.collection(...)` keep working as with a plain client.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.init_seconds = None
+        self._client = None
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self):
+        return self._initialized
+
+    def get(self):
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    started = time.perf_counter()
+                    try:
+                        self._client = self.factory()
+                    finally:
+                        self.init_seconds = time.perf_counter() - started
+                        self._initialized = True
+        return self._client
+
+    def __bool__(self):
+        return self.get() is not None
+
+    def __getattr__(self, name):
+        client = self.get()
+        if client is None:
+            raise AttributeError(f"{name!r}: client is not available")
+        return getattr(client, name)
@@ -0,0 +1,157 @@
+import bisect
+import os
+import threading
+import time
+from collections import Counter
+
+from flask import g, request
+
+from instrumented_firestore import FirestoreStats, current_stats
+
+# Upper bounds in seconds, Prometheus-style; the last bucket is +Inf.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+FIRESTORE_FIELDS = ('reads', 'writes', 'deletes', 'bytes_read', 'bytes_written')
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.count = 0
+        self.latency_sum = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.statuses = Counter()
+        self.firestore = Counter()
+
+    def observe(self, seconds, status, firestore_stats):
+        self.count += 1
+        self.latency_sum += seconds
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.statuses[status] += 1
+        for field, value in firestore_stats.items():
+            self.firestore[field] += value
+
+    def quantile(self, q):
+        """Estimates a latency quantile by linear interpolation within histogram buckets."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, bucket_count in enumerate(self.buckets):
+            upper = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else LATENCY_BUCKETS[-1]
+            if bucket_count and seen + bucket_count >= target:
+                return lower + (upper - lower) * (target - seen) / bucket_count
+            seen += bucket_count
+            lower = upper
+        return LATENCY_BUCKETS[-1]
+
+
+class MetricsRegistry:
+    """In-process request metrics. Each gunicorn worker keeps its own registry."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.routes = {}
+        self.caches = {}
+        self._lock = threading.Lock()
+
+    def register_cache(self, name, cache):
+        """`cache` must expose integer `hits` and `misses` attributes."""
+        self.caches[name] = cache
+
+    def observe(self, method, route, status, seconds, firestore_stats):
+        with self._lock:
+            metrics = self.routes.get((method, route))
+            if metrics is None:
+                metrics = self.routes[(method, route)] = RouteMetrics()
+            metrics.observe(seconds, status, firestore_stats)
+
+    def snapshot(self):
+        with self._lock:
+            routes = []
+            for (method, route), m in sorted(self.routes.items(), key=lambda item: item[0][1]):
+                per_request = {field: m.firestore[field] / m.count for field in FIRESTORE_FIELDS}
+                routes.append({
+                    'method': method,
+                    'route': route,
+                    'count': m.count,
+                    'latency_avg_ms': m.latency_sum / m.count * 1000,
+                    'latency_p50_ms': m.quantile(0.5) * 1000,
+                    'latency_p95_ms': m.quantile(0.95) * 1000,
+                    'statuses': {str(status): n for status, n in m.statuses.items()},
+                    'firestore_total': {field: m.firestore[field] for field in FIRESTORE_FIELDS},
+                    'firestore_per_request': per_request,
+                })
+        caches = []
+        for name, cache in sorted(self.caches.items()):
+            total = cache.hits + cache.misses
+            caches.append({
+                'name': name,
+                'hits': cache.hits,
+                'misses': cache.misses,
+                'hit_ratio': cache.hits / total if total else 0.0,
+            })
+        return {'uptime_seconds': time.time() - self.started_at, 'routes': routes, 'caches': caches}
+
+    def prometheus_text(self):
+        lines = [
+            '# HELP cointracker_request_duration_seconds Request latency by route.',
+            '# TYPE cointracker_request_duration_seconds histogram',
+        ]
+        with self._lock:
+            items = sorted(self.routes.items(), key=lambda item: item[0][1])
+            for (method, route), m in items:
+                labels = f'method="{method}",route="{route}"'
+                cumulative = 0
+                for bound, bucket_count in zip(LATENCY_BUCKETS + ('+Inf',), m.buckets):
+                    cumulative += bucket_count
+                    lines.append(f'cointracker_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'cointracker_request_duration_seconds_sum{{{labels}}} {m.latency_sum:.6f}')
+                lines.append(f'cointracker_request_duration_seconds_count{{{labels}}} {m.count}')
+
+            lines.append('# HELP cointracker_responses_total Responses by route and status code.')
+            lines.append('# TYPE cointracker_responses_total counter')
+            for (method, route), m in items:
+                for status, n in sorted(m.statuses.items()):
+                    lines.append(f'cointracker_responses_total{{method="{method}",route="{route}",status="{status}"}} {n}')
+
+            for field in FIRESTORE_FIELDS:
+                metric = f'cointracker_firestore_{field}_total'
+                lines.append(f'# HELP {metric} Firestore {field.replace("_", " ")} by route.')
+                lines.append(f'# TYPE {metric} counter')
+                for (method, route), m in items:
+                    lines.append(f'{metric}{{method="{method}",route="{route}"}} {m.firestore[field]}')
+
+        lines.append('# HELP cointracker_cache_requests_total Cache lookups by result.')
+        lines.append('# TYPE cointracker_cache_requests_total counter')
+        for name, cache in sorted(self.caches.items()):
+            lines.append(f'cointracker_cache_requests_total{{cache="{name}",result="hit"}} {cache.hits}')
+            lines.append(f'cointracker_cache_requests_total{{cache="{name}",result="miss"}} {cache.misses}')
+        return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app, registry):
+    """Times every request and attributes its Firestore operations to the matched route.
+
+    FIRESTORE_METRICS_BYTES=1 also counts bytes read and written on every request;
+    otherwise only traced requests (see firestore_trace) measure them.
+    """
+    measure_bytes = os.environ.get('FIRESTORE_METRICS_BYTES', '').lower() in ('1', 'true', 'yes')
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        g.firestore_stats = FirestoreStats(measure_bytes=measure_bytes)
+        g.firestore_stats_token = current_stats.set(g.firestore_stats)
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        stats = g.pop('firestore_stats')
+        current_stats.reset(g.pop('firestore_stats_token'))
+        route = request.url_rule.rule if request.url_rule else '<unmatched>'
+        registry.observe(request.method, route, response.status_code,
+                         time.perf_counter() - started, stats.as_dict())
+        return response
@@ -0,0 +1,243 @@
+import contextlib
+import os
+import sqlite3
+import secrets
+import threading
+import time
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+# Browsers drop cookies larger than ~4 KB (name + value + attributes), which
+# is where the default signed-cookie session silently stops working.
+COOKIE_SESSION_LIMIT = 4093
+
+# Upper bound for one server-side session record. Offline profiles live in the
+# session, so this is effectively the offline storage quota per browser.
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+
+session_serializer = TaggedJSONSerializer()
+
+
+class SessionTooLarge(Exception):
+    pass
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session dict whose contents live in the store; the cookie only holds `sid`."""
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.accessed = False
+        # Set by regenerate(); the stored row under the old id is deleted on save.
+        self.previous_sid = None
+
+    def regenerate(self):
+        """Moves the session to a fresh id, keeping its contents."""
+        if not self.new and self.previous_sid is None:
+            self.previous_sid = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.modified = True
+
+
+class SQLiteSessionInterface(SessionInterface):
+    """Stores sessions in a SQLite table keyed by a random, signed session id.
+
+    Expired rows are swept at most once every `sweep_interval` seconds, piggybacking
+    on normal session writes so no background thread is needed.
+    """
+
+    salt = 'server-session'
+    session_class = ServerSideSession
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, sweep_interval=3600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS sessions ('
+                ' sid TEXT PRIMARY KEY,'
+                ' data BLOB NOT NULL,'
+                ' expires_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)')
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """A connection for one unit of work: committed (or rolled back) and then closed."""
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt=self.salt)
+
+    def _lifetime(self, app):
+        return app.permanent_session_lifetime.total_seconds()
+
+    # --- Storage ---
+
+    def load(self, sid):
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT data, expires_at FROM sessions WHERE sid = ?', (sid,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return session_serializer.loads(row[0])
+
+    def store(self, sid, data, expires_at):
+        payload = session_serializer.dumps(data)
+        if len(payload) > self.max_bytes:
+            raise SessionTooLarge(f"Session {len(payload)} bytes exceeds limit of {self.max_bytes}")
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO sessions (sid, data, expires_at) VALUES (?, ?, ?) '
+                'ON CONFLICT(sid) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at',
+                (sid, payload, expires_at)
+            )
+        self.maybe_sweep()
+
+    def touch(self, sid, expires_at):
+        with self._connect() as conn:
+            conn.execute('UPDATE sessions SET expires_at = ? WHERE sid = ?', (expires_at, sid))
+
+    def delete(self, sid):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+    def sweep(self):
+        """Deletes every expired session and returns how many were removed."""
+        with self._connect() as conn:
+            cursor = conn.execute('DELETE FROM sessions WHERE expires_at < ?', (time.time(),))
+            return cursor.rowcount
+
+    def maybe_sweep(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep < self.sweep_interval:
+                return
+            self._last_sweep = now
+        try:
+            removed = self.sweep()
+            if removed:
+                print(f"Session sweep removed {removed} expired sessions")
+        except sqlite3.Error as e:
+            print(f"Session sweep error: {e}")
+
+    # --- Flask SessionInterface ---
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+                data = self.load(sid)
+                if data is not None:
+                    return self.session_class(data, sid=sid)
+            except BadSignature:
+                pass
+            except sqlite3.Error as e:
+                print(f"Session load error: {e}")
+        return self.session_class(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        if not isinstance(session, ServerSideSession):
+            # Opened by the cookie backend before the app switched to this one.
+            return
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if not session:
+            if session.modified and not session.new:
+                self.delete(session.previous_sid or session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if not self.should_set_cookie(app, session):
+            return
+
+        expires_at = time.time() + self._lifetime(app)
+        try:
+            if session.modified or session.new:
+                self.store(session.sid, dict(session), expires_at)
+                if session.previous_sid:
+                    self.delete(session.previous_sid)
+            else:
+                self.touch(session.sid, expires_at)
+        except (SessionTooLarge, sqlite3.Error) as e:
+            print(f"Session save error: {e}")
+            return
+
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid).decode(),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+def regenerate_session(session):
+    """Issues a new session id on login, so an id planted before login can't be used to ride it.
+
+    Cookie sessions carry their contents in the cookie itself and need nothing here.
+    """
+    if isinstance(session, ServerSideSession):
+        session.regenerate()
+
+
+def session_byte_limit(app):
+    """Largest session payload the active session backend can hold."""
+    interface = app.session_interface
+    if isinstance(interface, SQLiteSessionInterface):
+        return interface.max_bytes
+    return COOKIE_SESSION_LIMIT
+
+
+def session_payload_size(app, data):
+    """Bytes `data` would occupy in the active session backend (the cookie value for cookie sessions)."""
+    interface = app.session_interface
+    if isinstance(interface, SQLiteSessionInterface):
+        return len(session_serializer.dumps(dict(data)))
+    serializer = interface.get_signing_serializer(app)
+    if serializer is None:
+        return len(session_serializer.dumps(dict(data)))
+    return len(app.config['SESSION_COOKIE_NAME']) + len(serializer.dumps(dict(data)))
+
+
+def init_session_store(app, backend):
+    """Installs the session backend named by `backend` ('sqlite' or 'cookie')."""
+    if backend != 'sqlite':
+        print("Using signed-cookie sessions")
+        return
+    path = os.environ.get('SESSION_DB_PATH') or os.path.join(app.instance_path, 'sessions.sqlite3')
+    max_bytes = int(os.environ.get('SESSION_MAX_BYTES', DEFAULT_MAX_BYTES))
+    app.session_interface = SQLiteSessionInterface(path, max_bytes=max_bytes)
+    print(f"Using server-side sessions at {path}")
@@ -19,6 +19,7 @@ document.addEventListener("DOMContentLoaded", () => {
         // User is an admin, load all data
         loadAdminStats();
         loadUsers();
+        loadMetrics();
       }
     });
 
@@ -29,6 +30,9 @@ document.addEventListener("DOMContentLoaded", () => {
   document
     .getElementById("userSearch")
     .addEventListener("input", filterUserTable);
+  document
+    .getElementById("refreshMetricsBtn")
+    .addEventListener("click", loadMetrics);
 });
 
 // --- API Call Helper ---
@@ -91,6 +95,46 @@ async function loadUsers() {
   // --- END MODIFICATION ---
 }
 
+async function loadMetrics() {
+  const data = await apiCall("/api/admin/metrics");
+  if (!data) return;
+
+  const cacheText = data.caches
+    .map(
+      (c) =>
+        `${c.name} cache: ${(c.hit_ratio * 100).toFixed(1)}% hits (${
+          c.hits
+        }/${c.hits + c.misses})`
+    )
+    .join(" · ");
+  document.getElementById("metricsSummary").textContent = `Uptime ${Math.round(
+    data.uptime_seconds / 60
+  )} min${cacheText ? " · " + cacheText : ""}`;
+
+  const tableBody = document.getElementById("metricsTableBody");
+  tableBody.innerHTML = "";
+  data.routes
+    .sort((a, b) => b.count - a.count)
+    .forEach((r) => {
+      const errors = Object.entries(r.statuses)
+        .filter(([status]) => Number(status) >= 400)
+        .reduce((sum, [, n]) => sum + n, 0);
+      const perReq = r.firestore_per_request;
+      const tr = document.createElement("tr");
+      tr.innerHTML = `
+        <td>${r.method} ${r.route}</td>
+        <td>${r.count.toLocaleString()}</td>
+        <td>${r.latency_p50_ms.toFixed(1)}</td>
+        <td>${r.latency_p95_ms.toFixed(1)}</td>
+        <td class="${errors ? "amount-negative" : ""}">${errors}</td>
+        <td>${perReq.reads.toFixed(1)}</td>
+        <td>${perReq.writes.toFixed(1)}</td>
+        <td>${(perReq.bytes_read / 1024).toFixed(1)}</td>
+      `;
+      tableBody.appendChild(tr);
+    });
+}
+
 // --- MODIFICATION: New function to render a page of the table ---
 function renderTablePage() {
   const tableBody = document.getElementById("userTableBody");
@@ -14,6 +14,11 @@ class CoinTrackerApp {
       currentPage: 1,
       totalPages: 1,
     };
+
+    // Quick-action taps within this window are sent as one /api/add-transactions call
+    this.quickActionQueue = [];
+    this.quickActionTimer = null;
+    this.quickActionDelay = 400;
   }
 
   async init() {
@@ -200,11 +205,13 @@ class CoinTrackerApp {
       this.showToast("Data imported successfully!", "success");
     }
   }
-  exportData() {
+  async exportData() {
     try {
+      // Older months may be archived on the server, so ask for the complete profile.
+      const full = await this.apiCall("/api/export");
       const dataToExport = {
-        settings: this.data.settings,
-        transactions: this.data.transactions,
+        settings: full ? full.settings : this.data.settings,
+        transactions: full ? full.transactions : this.data.transactions,
       };
 
       const dataStr = JSON.stringify(dataToExport, null, 2);
@@ -278,21 +285,25 @@ class CoinTrackerApp {
   }
 
   async loadInitialData() {
-    const data = await this.apiCall("/api/data");
-    if (data) {
-      this.data = data;
+    // One round-trip for dashboard data, profiles, user, broadcast and history page 1
+    this.historyPage.currentPage = 1;
+    const bootstrap = await this.apiCall(
+      `/api/bootstrap${this.buildHistoryQuery(1)}`
+    );
+    if (bootstrap) {
+      this.data = bootstrap.data;
     } else {
       return;
     }
 
-    const profilesData = await this.apiCall("/api/profiles");
+    const profilesData = bootstrap.profiles;
     if (profilesData)
       this.updateProfileDropdown(
         profilesData.profiles,
         profilesData.current_profile
       );
 
-    const userData = await this.apiCall("/api/user");
+    const userData = bootstrap.user;
     const usernameDisplay = document.getElementById("usernameDisplay");
     if (userData && userData.username && usernameDisplay) {
       usernameDisplay.textContent = userData.username;
@@ -302,13 +313,13 @@ class CoinTrackerApp {
       if (adminBtn) adminBtn.style.display = "block";
     }
 
-    const broadcastData = await this.apiCall("/api/broadcast");
+    const broadcastData = bootstrap.broadcast;
     if (broadcastData && broadcastData.message) {
       this.showToast(broadcastData.message, "broadcast");
     }
 
     this.updateAllUI();
-    this.loadHistoryPage(1);
+    this.renderHistoryPage(bootstrap.history);
   }
 
   updateAllUI() {
@@ -413,32 +424,64 @@ class CoinTrackerApp {
         action.value
       }</div>`;
 
-      btn.onclick = async () => {
-        btn.classList.add("is-processing");
-        const amount = action.is_positive ? action.value : -action.value;
-        const result = await this.apiCall("/api/add-transaction", "POST", {
-          amount,
-          source: action.text,
-          date: new Date().toISOString(),
-        });
-        btn.classList.remove("is-processing");
-
-        if (result && result.success) {
-          this.showToast(`Quick action '${action.text}' recorded.`, "success");
-          this.data = result;
-          this.updateAllUI();
-
-          if (document.getElementById("history").classList.contains("active")) {
-            this.loadHistoryPage(this.historyPage.currentPage);
-          }
-        }
-      };
+      btn.onclick = () => this.queueQuickAction(action, btn);
       grid.appendChild(btn);
     });
   }
 
+  queueQuickAction(action, btn) {
+    btn.classList.add("is-processing");
+    this.quickActionQueue.push({
+      transaction: {
+        amount: action.is_positive ? action.value : -action.value,
+        source: action.text,
+        date: new Date().toISOString(),
+      },
+      btn,
+    });
+    clearTimeout(this.quickActionTimer);
+    this.quickActionTimer = setTimeout(
+      () => this.flushQuickActions(),
+      this.quickActionDelay
+    );
+  }
+
+  async flushQuickActions() {
+    const queued = this.quickActionQueue;
+    this.quickActionQueue = [];
+    if (!queued.length) return;
+
+    const result = await this.apiCall("/api/add-transactions", "POST", {
+      transactions: queued.map((item) => item.transaction),
+    });
+    queued.forEach((item) => item.btn.classList.remove("is-processing"));
+
+    if (result && result.success) {
+      const message =
+        queued.length === 1
+          ? `Quick action '${queued[0].transaction.source}' recorded.`
+          : `${queued.length} quick actions recorded.`;
+      this.showToast(message, "success");
+      this.data = result;
+      this.updateAllUI();
+
+      if (document.getElementById("history").classList.contains("active")) {
+        this.loadHistoryPage(this.historyPage.currentPage);
+      }
+    }
+  }
+
+  // Rows on the current history page may be archived and missing from this.data.
+  findTransaction(transactionId) {
+    return (
+      this.data.transactions.find((t) => t.id === transactionId) ||
+      (this.historyRows || []).find((t) => t.id === transactionId)
+    );
+  }
+
   updateHistoryTableUI(transactions) {
     if (!transactions) return;
+    this.historyRows = transactions;
     const tbody = document.getElementById("historyTableBody");
     tbody.innerHTML = ""; // Clear table
 
@@ -472,9 +515,7 @@ class CoinTrackerApp {
       // --- MODIFICATION: Add listeners for new buttons ---
       tr.querySelector(".btn-edit").addEventListener("click", (e) => {
         const transactionId = e.currentTarget.dataset.id;
-        const transaction = this.data.transactions.find(
-          (t) => t.id === transactionId
-        );
+        const transaction = this.findTransaction(transactionId);
         if (transaction) {
           this.showTransactionModal(transaction.amount > 0, transactionId);
         }
@@ -565,10 +606,7 @@ class CoinTrackerApp {
 
   // --- History Pagination Functions ---
 
-  async loadHistoryPage(page) {
-    if (page < 1) page = 1;
-    this.historyPage.currentPage = page;
-
+  buildHistoryQuery(page) {
     const fromDate = document.getElementById("dateFrom").value;
     const toDate = document.getElementById("dateTo").value;
     const searchTerm = document.getElementById("historySearch").value;
@@ -578,11 +616,22 @@ class CoinTrackerApp {
     if (fromDate) query += `&date_from=${fromDate}`;
     if (toDate) query += `&date_to=${toDate}`;
     if (searchTerm) query += `&search=${encodeURIComponent(searchTerm)}`;
-    if (sourceFilter !== "all")
+    if (sourceFilter && sourceFilter !== "all")
       query += `&source=${encodeURIComponent(sourceFilter)}`;
+    return query;
+  }
 
-    const data = await this.apiCall(`/api/history${query}`);
+  async loadHistoryPage(page) {
+    if (page < 1) page = 1;
+    this.historyPage.currentPage = page;
 
+    const data = await this.apiCall(
+      `/api/history${this.buildHistoryQuery(page)}`
+    );
+    this.renderHistoryPage(data);
+  }
+
+  renderHistoryPage(data) {
     if (data) {
       this.historyPage.totalPages = data.total_pages;
       this.updateHistoryTableUI(data.transactions);
@@ -873,7 +922,7 @@ class CoinTrackerApp {
   showTransactionModal(isIncome, transactionId = null) {
     const modal = document.getElementById("transactionModal");
     const transaction = transactionId
-      ? this.data.transactions.find((t) => t.id === transactionId)
+      ? this.findTransaction(transactionId)
       : null;
     modal.querySelector(".modal-title").textContent = transaction
       ? "Edit Transaction"
@@ -915,9 +964,7 @@ class CoinTrackerApp {
 
     let isIncome = isIncomeDefault;
     if (id) {
-      const originalTransaction = this.data.transactions.find(
-        (t) => t.id === id
-      );
+      const originalTransaction = this.findTransaction(id);
       if (originalTransaction) {
         isIncome = originalTransaction.amount > 0;
       }
@@ -0,0 +1,29 @@
+import os
+import sys
+
+# The app reads its configuration at import time; run the suite against the in-memory fake.
+os.environ.setdefault('FIRESTORE_BACKEND', 'memory')
+os.environ.setdefault('SESSION_BACKEND', 'cookie')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture
+def app_module(monkeypatch):
+    import app
+    app.db.clear()
+    app.app_config.invalidate()
+    monkeypatch.setattr(app, 'COMPACTION_HORIZON_DAYS', 0)
+    return app
+
+
+@pytest.fixture
+def login(app_module):
+    """Returns a test client whose session is logged in as `user_id` with `role`."""
+    def logged_in(user_id='u1', role='user'):
+        client = app_module.app.test_client()
+        with client.session_transaction() as sess:
+            sess.update(user_id=user_id, username=user_id, role=role, current_profile='Default')
+        return client
+    return logged_in
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+
+def rows(*amounts_by_age):
+    """Transactions `(days_ago, amount)`, ids t0, t1, ..."""
+    now = datetime.now(timezone.utc)
+    return [{'id': f't{i}', 'date': (now - timedelta(days=days)).isoformat(), 'amount': amount, 'source': 'Ads'}
+            for i, (days, amount) in enumerate(amounts_by_age)]
+
+
+@pytest.fixture(params=['nested', 'split'])
+def tracker(request, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'PROFILE_LAYOUT', request.param)
+    monkeypatch.setattr(app_module, 'COMPACTION_HORIZON_DAYS', 90)
+    with app_module.app.test_request_context():
+        yield lambda: app_module.WebCoinTracker('Default', 'u1')
+
+
+def balance(tracker):
+    return tracker.balance_at(None)
+
+
+def test_import_after_compaction_drops_old_checkpoints(tracker):
+    first = tracker()
+    assert first.save_data(rows((400, 5000), (200, 7), (1, 3)), first.get_default_settings())
+    assert len(tracker().get_data()[0]) == 1
+    assert balance(tracker()) == 5010
+
+    assert tracker().import_data({'transactions': rows((1, 7)), 'settings': {}})
+    imported = tracker()
+    transactions, _ = imported.get_data()
+    assert imported.checkpoints == []
+    assert [t['amount'] for t in transactions] == [7]
+    assert balance(tracker()) == 7
+
+
+def test_deleting_last_archived_row_removes_its_checkpoint(tracker):
+    first = tracker()
+    assert first.save_data(rows((400, 5000), (1, 3)), first.get_default_settings())
+    assert tracker().delete_transaction('t0')
+    after = tracker()
+    after.get_data()
+    assert after.checkpoints == []
+    assert balance(after) == 3
+
+
+def history_rows(count=240, days=300):
+    """Deterministic rows spread over the last `days` days, several per month and source."""
+    now = datetime.now(timezone.utc)
+    return [{'id': f'h{i}', 'date': (now - timedelta(days=days * i / count, hours=i % 7)).isoformat(),
+             'amount': (i % 9 + 1) * (-5 if i % 4 == 0 else 3), 'source': ['Ads', 'Shop', 'Login'][i % 3]}
+            for i in range(count)]
+
+
+@pytest.fixture(params=['nested', 'split'])
+def pair(request, app_module, monkeypatch):
+    """(plain, compacted): the same history saved without and with compaction."""
+    monkeypatch.setattr(app_module, 'PROFILE_LAYOUT', request.param)
+
+    def save(user_id, horizon, rows):
+        monkeypatch.setattr(app_module, 'COMPACTION_HORIZON_DAYS', horizon)
+        tracker = app_module.WebCoinTracker('Default', user_id)
+        assert tracker.save_data(rows, tracker.get_default_settings())
+
+    with app_module.app.test_request_context():
+        rows = history_rows()
+        save('plain', 0, [dict(t) for t in rows])
+        save('compacted', 60, [dict(t) for t in rows])
+        monkeypatch.setattr(app_module, 'COMPACTION_HORIZON_DAYS', 0)
+        yield lambda user_id: app_module.WebCoinTracker('Default', user_id)
+
+
+def compare(pair, method, *args, **kwargs):
+    plain = getattr(pair('plain'), method)(*args, **kwargs)
+    assert getattr(pair('compacted'), method)(*args, **kwargs) == plain
+    return plain
+
+
+def test_compaction_archives_old_months(pair):
+    compacted = pair('compacted')
+    live, _ = compacted.get_data()
+    assert compacted.checkpoints and len(live) < 240
+    assert sum(cp['count'] for cp in compacted.checkpoints) + len(live) == 240
+    assert compare(pair, 'get_all_transactions')[0]
+
+
+def test_window_totals_and_balances_match_uncompacted(pair):
+    now = datetime.now(timezone.utc)
+    days = [(now - timedelta(days=d)).date().isoformat() for d in (290, 200, 150, 100, 61, 30, 0)]
+    assert compare(pair, 'balance_at', None) == sum(t['amount'] for t in history_rows())
+    for day in days:
+        compare(pair, 'balance_at', day)
+        compare(pair, 'balance_at', day + 'T12:00:00', before=True)
+    for start, end in [(None, None), (days[0], days[2]), (days[1], days[5]), (days[3], None), (None, days[4])]:
+        compare(pair, 'range_summary', start, end)
+
+
+def test_history_pages_match_uncompacted(pair):
+    now = datetime.now(timezone.utc)
+    filters = [{}, {'source': 'Shop'}, {'search': '27'},
+               {'date_from': (now - timedelta(days=200)).date().isoformat(),
+                'date_to': (now - timedelta(days=90)).date().isoformat()}]
+    for f in filters:
+        first = compare(pair, 'get_transactions_paginated', 1, 25, dict(f))
+        for page in range(2, first['total_pages'] + 1):
+            compare(pair, 'get_transactions_paginated', page, 25, dict(f))
+
+
+def test_editing_an_archived_row_matches_uncompacted(pair):
+    old = history_rows()[-1]
+    edit = {'amount': 999, 'source': 'Event Reward', 'date': old['date']}
+    assert pair('plain').update_transaction(old['id'], dict(edit))
+    assert pair('compacted').update_transaction(old['id'], dict(edit))
+    compare(pair, 'balance_at', None)
+    compare(pair, 'get_all_transactions')
+    compare(pair, 'get_transactions_paginated', 1, 25, {'source': 'Event Reward'})
@@ -0,0 +1,55 @@
+import gzip
+import json
+from datetime import date, datetime, timezone
+
+import pytest
+from flask import Flask, jsonify
+
+from compression import init_compression
+from json_provider import FastJSONProvider, init_json_provider
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    init_json_provider(app)
+    init_compression(app)
+
+    @app.route('/big')
+    def big():
+        response = jsonify(rows=[{'id': i, 'source': 'Ads'} for i in range(200)])
+        response.set_etag('v1')
+        return response
+
+    @app.route('/small')
+    def small():
+        return jsonify(ok=True)
+
+    return app.test_client()
+
+
+def test_large_json_is_gzipped_and_its_etag_weakened(client):
+    response = client.get('/big', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert response.headers['ETag'] == 'W/"v1"'
+    assert len(json.loads(gzip.decompress(response.data))['rows']) == 200
+
+
+def test_small_or_unaccepted_responses_are_sent_as_is(client):
+    assert 'Content-Encoding' not in client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers
+    plain = client.get('/big')
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['ETag'] == '"v1"'
+    assert len(plain.get_json()['rows']) == 200
+
+
+@pytest.mark.parametrize('encoder', ['auto', 'stdlib'])
+def test_json_provider_encodes_like_the_standard_provider(encoder):
+    app = Flask(__name__)
+    provider = FastJSONProvider(app, encoder=encoder)
+    payload = {'when': datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc), 'day': date(2024, 1, 2),
+               'big': 2 ** 70, 'text': 'ü'}
+    expected = json.loads(Flask(__name__).json.dumps(payload))
+    assert json.loads(provider.dumps(payload)) == expected
+    assert json.loads(provider.dumps_bytes(payload)) == expected
@@ -0,0 +1,58 @@
+from config_cache import AppConfigCache
+from fake_firestore import FakeFirestore
+
+
+class CountingClient:
+    """Hands out a FakeFirestore and counts how often the cache asks for the client."""
+
+    def __init__(self):
+        self.db = FakeFirestore()
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.db
+
+
+def test_reads_are_cached_until_the_ttl_expires(monkeypatch):
+    client = CountingClient()
+    client.db.collection('app_config').document('broadcast').set({'message': 'hi'})
+    cache = AppConfigCache(client, ttl=60)
+
+    first = cache.get('broadcast')
+    assert cache.get('broadcast') == first == ({'message': 'hi'}, first[1])
+    assert (client.calls, cache.hits, cache.misses) == (1, 1, 1)
+
+    # Returned copies don't alias the cached entry.
+    first[0]['message'] = 'changed'
+    assert cache.get('broadcast')[0] == {'message': 'hi'}
+
+    clock = [1e6]
+    monkeypatch.setattr('config_cache.time.monotonic', lambda: clock[0])
+    client.db.collection('app_config').document('broadcast').set({'message': 'new'})
+    clock[0] += 61
+    assert cache.get('broadcast')[0] == {'message': 'new'}
+
+
+def test_set_refreshes_the_entry_and_missing_documents_use_the_default():
+    client = CountingClient()
+    cache = AppConfigCache(client, ttl=60)
+    assert cache.get('broadcast', {'message': ''})[0] == {'message': ''}
+
+    etag = cache.set('broadcast', {'message': 'hello'})
+    assert cache.get('broadcast') == ({'message': 'hello'}, etag)
+    assert client.db.collection('app_config').document('broadcast').get().to_dict() == {'message': 'hello'}
+
+
+def test_broadcast_answers_304_for_a_matching_etag(login):
+    client = login(role='admin')
+    assert client.post('/api/admin/broadcast', json={'message': 'maintenance'}).get_json()['success']
+
+    response = client.get('/api/broadcast')
+    assert response.status_code == 200
+    assert response.get_json()['message'] == 'maintenance'
+    etag = response.headers['ETag']
+
+    assert client.get('/api/broadcast', headers={'If-None-Match': etag}).status_code == 304
+    client.post('/api/admin/broadcast', json={'message': 'done'})
+    assert client.get('/api/broadcast', headers={'If-None-Match': etag}).status_code == 200
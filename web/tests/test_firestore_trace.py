@@ -0,0 +1,40 @@
+import json
+
+from firestore_trace import TRACE_HEADER, analyze
+
+
+def op(name, path, docs=1, scan=False):
+    return {'op': name, 'path': path, 'ms': 1.0, 'bytes': 0, 'docs': docs, 'scan': scan}
+
+
+def warning_types(ops, route='/api/data'):
+    return sorted(w['type'] for w in analyze(ops, route))
+
+
+def test_repeated_get_is_a_redundant_read():
+    assert warning_types([op('get', 'user_data/u1'), op('get', 'user_data/u1')]) == ['redundant_read']
+    assert warning_types([op('get', 'user_data/u1'), op('get', 'users/u1')]) == []
+
+
+def test_many_single_reads_from_one_collection_are_n_plus_one():
+    ops = [op('get', f'users/u{i}') for i in range(5)]
+    assert warning_types(ops) == ['n_plus_one']
+    assert warning_types(ops[:4]) == []
+
+
+def test_unfiltered_scans_are_flagged_only_on_user_routes():
+    ops = [op('query', 'users', docs=40, scan=True), op('query', 'users.where(...)', docs=1)]
+    assert warning_types(ops) == ['collection_scan']
+    assert warning_types(ops, route='/api/admin/users') == []
+
+
+def test_trace_header_is_returned_to_admins_only(login):
+    admin = login('admin1', role='admin')
+    response = admin.get('/api/profiles', headers={TRACE_HEADER: '1'})
+    trace = json.loads(response.headers[TRACE_HEADER])
+    assert trace['route'] == '/api/profiles'
+    assert trace['totals']['reads'] == len(trace['ops']) >= 1
+    assert 'Server-Timing' in response.headers
+
+    user = login('u1')
+    assert TRACE_HEADER not in user.get('/api/profiles', headers={TRACE_HEADER: '1'}).headers
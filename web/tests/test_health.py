@@ -0,0 +1,48 @@
+import threading
+
+from lazy_client import LazyClient
+
+
+def test_healthz_never_touches_firestore(app_module, monkeypatch):
+    def factory():
+        raise AssertionError('/healthz built the Firestore client')
+
+    monkeypatch.setattr(app_module, 'db', LazyClient(factory))
+    response = app_module.app.test_client().get('/healthz')
+    assert response.status_code == 200
+    assert not app_module.db.initialized
+
+
+def test_readyz_waits_for_the_warm_up(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'WARMUP', True)
+    monkeypatch.setattr(app_module, 'warmup_done', threading.Event())
+    client = app_module.app.test_client()
+
+    warming = client.get('/readyz')
+    assert warming.status_code == 503
+    assert warming.get_json()['status'] == 'warming'
+
+    app_module.warmup_done.set()
+    assert client.get('/readyz').status_code == 200
+
+
+def test_readyz_is_503_while_a_configured_firestore_is_unavailable(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'db', LazyClient(lambda: None))
+    monkeypatch.setattr(app_module, 'FIRESTORE_BACKEND', 'firebase')
+    monkeypatch.setattr(app_module, 'FIREBASE_LIBRARY_FOUND', True)
+    monkeypatch.setattr(app_module, 'firebase_configured', lambda: True)
+
+    response = app_module.app.test_client().get('/readyz')
+    assert response.status_code == 503
+    assert response.get_json()['status'] == 'firestore unavailable'
+
+
+def test_readyz_is_200_after_a_masked_read(app_module):
+    reads = app_module.db.ops['read']
+    response = app_module.app.test_client().get('/readyz')
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['status'] == 'ready'
+    assert body['firestore_latency_ms'] >= 0
+    assert app_module.db.ops['read'] == reads + 1
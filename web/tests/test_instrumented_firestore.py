@@ -0,0 +1,46 @@
+import pytest
+
+import instrumented_firestore
+from fake_firestore import FakeFirestore
+from instrumented_firestore import FirestoreStats, InstrumentedClient, current_stats
+
+
+@pytest.fixture
+def client():
+    db = InstrumentedClient(FakeFirestore())
+    db.collection('users').document('u1').set({'username': 'ann', 'history': list(range(100))})
+    return db
+
+
+def run(stats, action):
+    token = current_stats.set(stats)
+    try:
+        action()
+    finally:
+        current_stats.reset(token)
+    return stats
+
+
+def read_twice(db):
+    db.collection('users').document('u1').get()
+    db.collection('users').where('username', '==', 'ann').get()
+
+
+def test_untraced_reads_are_counted_without_encoding(client, monkeypatch):
+    def fail(data):
+        raise AssertionError("document encoded on an untraced request")
+
+    monkeypatch.setattr(instrumented_firestore, 'document_size', fail)
+    stats = run(FirestoreStats(), lambda: read_twice(client))
+    assert stats.as_dict() == {'reads': 2, 'writes': 0, 'deletes': 0, 'bytes_read': 0, 'bytes_written': 0}
+
+
+@pytest.mark.parametrize('traced', [True, False])
+def test_bytes_measured_when_traced_or_enabled(client, traced):
+    stats = FirestoreStats(measure_bytes=not traced)
+    if traced:
+        stats.enable_trace()
+    run(stats, lambda: read_twice(client))
+    assert stats.reads == 2
+    assert stats.bytes_read > 2 * len('"history"')
+    assert (stats.ops is not None) == traced
@@ -0,0 +1,39 @@
+import threading
+import time
+
+from lazy_client import LazyClient
+
+
+def test_client_is_built_once_under_concurrent_access():
+    built = []
+
+    def factory():
+        time.sleep(0.05)
+        built.append(object())
+        return built[-1]
+
+    lazy = LazyClient(factory)
+    start = threading.Barrier(8)
+    results = []
+
+    def use():
+        start.wait()
+        results.append(lazy.get())
+
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+
+    assert len(built) == 1
+    assert results == built * 8
+    assert lazy.initialized and lazy.init_seconds >= 0.05
+
+
+def test_unavailable_client_is_falsy_and_not_retried():
+    calls = []
+    lazy = LazyClient(lambda: calls.append(1))
+    assert not lazy
+    assert not lazy
+    assert calls == [1]
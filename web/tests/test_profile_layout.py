@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+import fake_firestore
+from firestore_trace import TRACE_HEADER
+
+
+@pytest.fixture
+def split(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'PROFILE_LAYOUT', 'split')
+    return app_module
+
+
+def traced(response):
+    trace = json.loads(response.headers[TRACE_HEADER])
+    return [(o['op'], o['path']) for o in trace['ops']], [w['type'] for w in trace['warnings']]
+
+
+def test_split_layout_reads_the_profile_document_once_per_request(split, login):
+    admin = login('u1', role='admin')
+    add = admin.post('/api/add-transaction', headers={TRACE_HEADER: '1'},
+                     json={'amount': 5, 'source': 'Ads', 'date': '2024-01-01T10:00:00'})
+    assert add.status_code == 200
+    bootstrap = admin.get('/api/bootstrap', headers={TRACE_HEADER: '1'})
+    assert bootstrap.status_code == 200
+
+    for response in (add, bootstrap):
+        ops, warnings = traced(response)
+        assert ops.count(('get', 'user_data/u1/profiles/Default')) == 1
+        assert 'redundant_read' not in warnings
+    assert [t['amount'] for t in bootstrap.get_json()['history']['transactions']] == [5]
+
+
+def test_interrupted_migration_serves_the_nested_copy_and_finishes_on_the_next_read(split, monkeypatch):
+    user = split.db.collection('user_data').document('u1')
+    user.set({'profiles': {
+        'Default': {'transactions': [{'id': 'a', 'date': '2024-01-01T10:00:00', 'amount': 3, 'source': 'Ads'}],
+                    'settings': {}, 'schema_version': split.SCHEMA_VERSION},
+        'Side': {'transactions': [{'id': 'b', 'date': '2024-01-02T10:00:00', 'amount': 4, 'source': 'Ads'}],
+                 'settings': {}, 'schema_version': split.SCHEMA_VERSION},
+    }})
+    original_set = fake_firestore.FakeDocument.set
+
+    def failing_set(doc, data, merge=False):
+        if doc.path == 'user_data/u1/profiles/Side':
+            raise RuntimeError('write failed')
+        return original_set(doc, data, merge=merge)
+
+    with split.app.test_request_context():
+        monkeypatch.setattr(fake_firestore.FakeDocument, 'set', failing_set)
+        transactions, _ = split.WebCoinTracker('Default', 'u1').get_data()
+        assert [t['amount'] for t in transactions] == [3]
+        # Default made it across, but the nested copy stays until every profile has.
+        assert 'profiles' in user.get().to_dict()
+
+        monkeypatch.setattr(fake_firestore.FakeDocument, 'set', original_set)
+        transactions, _ = split.WebCoinTracker('Side', 'u1').get_data()
+        assert [t['amount'] for t in transactions] == [4]
+
+        index = user.get().to_dict()
+        assert 'profiles' not in index
+        assert index['profile_names'] == ['Default', 'Side']
+        docs = {snap.id: snap.to_dict() for snap in user.collection('profiles').stream()}
+        assert sorted(docs) == ['Default', 'Side']
+        assert [t['amount'] for t in docs['Default']['transactions']] == [3]
+
+
+def test_admin_totals_skip_the_desktop_sync_profiles(split, login):
+    with split.app.test_request_context():
+        tracker = split.WebCoinTracker('Default', 'u1')
+        assert tracker.save_data([{'id': 'a', 'date': '2024-01-01T10:00:00', 'amount': 3, 'source': 'Ads'}],
+                                 tracker.get_default_settings())
+    split.db.collection('users').document('u1').set({'username': 'u1', 'username_lower': 'u1'})
+    # The desktop app's sync documents share the 'profiles' collection id.
+    split.db.collection('users').document('u1').collection('profiles').document('Default').set(
+        {'transactions': [{'id': 'd', 'date': '2024-01-01T10:00:00', 'amount': 1000, 'source': 'Ads'}]})
+    admin = login('admin1', role='admin')
+
+    stats = admin.get('/api/admin/stats').get_json()['stats']
+    assert (stats['total_transactions'], stats['total_coins']) == (1, 3)
+    users = {u['user_id']: u for u in admin.get('/api/admin/users').get_json()['users']}
+    assert (users['u1']['txn_count'], users['u1']['balance']) == (1, 3)
@@ -0,0 +1,63 @@
+import pytest
+
+import fake_firestore
+
+
+@pytest.fixture
+def user_doc_reads(app_module, monkeypatch):
+    """field_paths of every read of a user_data document (None for a full read)."""
+    reads = []
+    get = fake_firestore.FakeDocument.get
+
+    def recording_get(doc, field_paths=None, transaction=None):
+        if doc.path.startswith('user_data/') and doc.path.count('/') == 1:
+            reads.append(field_paths)
+        return get(doc, field_paths=field_paths, transaction=transaction)
+
+    monkeypatch.setattr(fake_firestore.FakeDocument, 'get', recording_get)
+    return reads
+
+
+def profile(amount):
+    return {'transactions': [{'id': f't{amount}', 'date': '2024-01-01T10:00:00', 'amount': amount, 'source': 'Ads'}],
+            'settings': {}}
+
+
+def test_profile_names_are_backfilled_once(app_module, user_doc_reads):
+    client = app_module.app.test_client()
+    assert client.post('/api/register', json={'username': 'ann', 'password': 'pw'}).get_json()['success']
+    user_id = next(app_module.db.collection('users').stream()).id
+    # Saved before profile_names existed.
+    user = app_module.db.collection('user_data').document(user_id)
+    user.set({'profiles': {'Default': profile(1), 'Work': profile(2)}, 'last_active_profile': 'Work'})
+
+    assert client.post('/api/login', json={'username': 'ann', 'password': 'pw'}).get_json()['success']
+    with client.session_transaction() as sess:
+        assert sess['current_profile'] == 'Work'
+    # Login only needs last_active_profile.
+    assert user_doc_reads == [['last_active_profile']]
+
+    del user_doc_reads[:]
+    assert client.get('/api/profiles').get_json()['profiles'] == ['Default', 'Work']
+    assert user_doc_reads == [app_module.METADATA_FIELDS, None]
+    assert user.get().to_dict()['profile_names'] == ['Default', 'Work']
+
+    del user_doc_reads[:]
+    writes = app_module.db.ops['write']
+    assert client.get('/api/profiles').get_json()['profiles'] == ['Default', 'Work']
+    assert user_doc_reads == [app_module.METADATA_FIELDS]
+    assert app_module.db.ops['write'] == writes
+
+
+def test_full_read_reconciles_names_after_a_direct_map_edit(app_module, login):
+    user = app_module.db.collection('user_data').document('u1')
+    user.set({'profiles': {'Default': profile(1)}, 'profile_names': ['Default']})
+    # The Android app adds a profile to the nested map without touching profile_names.
+    user.set({'profiles': {'Phone': profile(2)}}, merge=True)
+    client = login('u1')
+
+    # The masked read trusts the stored list until a full read sees the map.
+    assert client.get('/api/profiles').get_json()['profiles'] == ['Default']
+    assert client.get('/api/data').status_code == 200
+    assert user.get().to_dict()['profile_names'] == ['Default', 'Phone']
+    assert client.get('/api/profiles').get_json()['profiles'] == ['Default', 'Phone']
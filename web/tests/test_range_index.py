@@ -0,0 +1,78 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from range_index import RangeIndex
+
+
+def make_rows(count, seed=7):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    rows = [{'id': str(i), 'date': (start + timedelta(minutes=rng.randrange(60 * 24 * 60))).isoformat(),
+             'amount': rng.choice([-1, 1]) * rng.randint(1, 500)} for i in range(count)]
+    rows.append({'id': 'undated', 'amount': 1000})
+    return rows
+
+
+def brute_totals(rows, start=None, end=None):
+    end = end + '\uffff' if end and len(end) == 10 else end
+    dated = [t for t in rows if t.get('date') and (not start or t['date'] >= start) and (not end or t['date'] <= end)]
+    return (sum(t['amount'] for t in dated if t['amount'] > 0),
+            sum(t['amount'] for t in dated if t['amount'] < 0), len(dated))
+
+
+def brute_balance(rows, timestamp, before=False):
+    upper = timestamp + '\uffff' if len(timestamp) == 10 and not before else timestamp
+    return sum(t['amount'] for t in rows
+               if (t.get('date', '') < upper if before else t.get('date', '') <= upper))
+
+
+WINDOWS = [(None, None), ('2024-01-10', None), (None, '2024-02-01'), ('2024-01-15', '2024-01-15'),
+           ('2024-01-20T12:00:00', '2024-02-10T08:30:00'), ('2025-01-01', None)]
+
+
+@pytest.mark.parametrize('start,end', WINDOWS)
+def test_totals_match_a_full_scan(start, end):
+    rows = make_rows(500)
+    assert RangeIndex(rows).totals(start, end) == brute_totals(rows, start, end)
+
+
+def test_bare_end_date_covers_the_whole_day():
+    index = RangeIndex([{'date': '2024-03-05T23:59:00', 'amount': 5}, {'date': '2024-03-06T00:00:00', 'amount': 7}])
+    assert index.totals('2024-03-05', '2024-03-05') == (5, 0, 1)
+
+
+@pytest.mark.parametrize('timestamp', ['2024-01-01', '2024-01-31T12:00:00', '2024-02-15', '2030-01-01'])
+def test_balance_as_of_matches_a_full_scan(timestamp):
+    rows = make_rows(500)
+    index = RangeIndex(rows)
+    assert index.balance_at(timestamp) == brute_balance(rows, timestamp)
+    assert index.balance_before(timestamp) == brute_balance(rows, timestamp, before=True)
+
+
+def test_appends_in_and_out_of_order_keep_the_index_exact():
+    rows = sorted(make_rows(200), key=lambda t: t.get('date', ''))
+    index = RangeIndex(rows[:100])
+    for t in rows[100:150]:
+        index.append(t)
+    index.append(dict(rows[150], date='2024-01-01T00:00:01'))
+
+    assert len(index) == 151
+    for start, end in WINDOWS:
+        assert index.totals(start, end) == brute_totals(index.rows, start, end)
+    assert index.balance_at('2024-01-20') == brute_balance(index.rows, '2024-01-20')
+
+
+def test_range_endpoints(app_module, login):
+    client = login('u1')
+    rows = [{'amount': 100, 'source': 'Ads', 'date': '2024-01-01T09:00:00'},
+            {'amount': -30, 'source': 'Shop', 'date': '2024-01-02T09:00:00'},
+            {'amount': 50, 'source': 'Ads', 'date': '2024-01-03T09:00:00'}]
+    assert client.post('/api/add-transactions', json={'transactions': rows}).status_code == 200
+
+    assert client.get('/api/balance-at?at=2024-01-02').get_json()['balance'] == 70
+    summary = client.get('/api/range-summary?date_from=2024-01-02&date_to=2024-01-03').get_json()
+    assert (summary['total_earned'], summary['total_spent'], summary['count']) == (50, -30, 2)
+    assert (summary['opening_balance'], summary['closing_balance']) == (100, 120)
+    assert client.get('/api/balance-at?at=yesterday').status_code == 400
@@ -0,0 +1,64 @@
+import pytest
+
+
+@pytest.fixture(params=['nested', 'split'])
+def layout(request, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'PROFILE_LAYOUT', request.param)
+    return request.param
+
+
+@pytest.fixture
+def validations(app_module, monkeypatch):
+    calls = []
+    check = app_module.WebCoinTracker.validate_data
+
+    def counting(self, transactions, settings):
+        calls.append(self.profile_name)
+        return check(self, transactions, settings)
+
+    monkeypatch.setattr(app_module.WebCoinTracker, 'validate_data', counting)
+    return calls
+
+
+def store_profile(app_module, layout, profile):
+    user = app_module.db.collection('user_data').document('u1')
+    if layout == 'split':
+        user.collection('profiles').document('Default').set({'name': 'Default', **profile})
+    else:
+        user.set({'profiles': {'Default': profile}, 'profile_names': ['Default']})
+
+
+def load(app_module):
+    with app_module.app.test_request_context():
+        return app_module.WebCoinTracker('Default', 'u1').get_data()
+
+
+def test_stamped_profile_is_read_without_a_check_or_a_write(app_module, layout, validations):
+    # No id: the check would add one, so an id-less row coming back means it was skipped.
+    store_profile(app_module, layout, {'transactions': [{'date': '2024-01-01T10:00:00', 'amount': 5, 'source': 'Ads'}],
+                                       'settings': {}, 'schema_version': app_module.SCHEMA_VERSION})
+    writes = app_module.db.ops['write']
+
+    transactions, _ = load(app_module)
+    assert validations == []
+    assert app_module.db.ops['write'] == writes
+    assert 'id' not in transactions[0]
+
+
+@pytest.mark.parametrize('stamp', [None, 0])
+def test_unstamped_profile_is_checked_and_written_once(app_module, layout, validations, stamp):
+    profile = {'transactions': [{'date': '2024-01-01T10:00:00', 'amount': 5, 'source': 'Ads'}], 'settings': {}}
+    if stamp is not None:
+        profile['schema_version'] = stamp
+    store_profile(app_module, layout, profile)
+    writes = app_module.db.ops['write']
+
+    transactions, settings = load(app_module)
+    assert validations == ['Default']
+    assert app_module.db.ops['write'] == writes + 1
+    assert transactions[0]['id'] and settings['quick_actions']
+
+    again, _ = load(app_module)
+    assert validations == ['Default']
+    assert app_module.db.ops['write'] == writes + 1
+    assert again[0]['id'] == transactions[0]['id']
@@ -0,0 +1,65 @@
+import sqlite3
+import sys
+
+import pytest
+
+from session_store import SQLiteSessionInterface
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    return SQLiteSessionInterface(str(tmp_path / 'sessions.sqlite3'))
+
+
+def test_connections_are_closed(sessions, monkeypatch):
+    opened = []
+    connect = sqlite3.connect
+
+    def tracking_connect(*args, **kwargs):
+        opened.append(connect(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(sqlite3, 'connect', tracking_connect)
+    sessions.store('s1', {'a': 1}, expires_at=2e9)
+    assert sessions.load('s1') == {'a': 1}
+    sessions.touch('s1', 3e9)
+    sessions.delete('s1')
+    sessions.sweep()
+
+    assert opened
+    for conn in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute('SELECT 1')
+
+
+def test_login_issues_a_new_session_id(app_module, sessions, monkeypatch):
+    app = app_module.app
+    monkeypatch.setattr(app, 'session_interface', sessions)
+    client = app.test_client()
+    assert client.post('/api/register', json={'username': 'ann', 'password': 'pw'}).get_json()['success']
+
+    # A session that exists before login, e.g. one planted by someone else.
+    with client.session_transaction() as sess:
+        sess['current_profile'] = 'Default'
+        planted = sess.sid
+    assert sessions.load(planted) is not None
+
+    response = client.post('/api/login', json={'username': 'ann', 'password': 'pw'})
+    assert response.get_json()['success']
+    with client.session_transaction() as sess:
+        assert sess.sid != planted
+        assert sess['user_id']
+    assert sessions.load(planted) is None
+
+
+def test_failed_firestore_connect_keeps_the_session_backend(app_module, monkeypatch):
+    # Requests in flight hold sessions opened by the current interface; swapping it would drop them.
+    interface = app_module.app.session_interface
+    monkeypatch.setattr(app_module, 'SESSION_BACKEND', None)
+    monkeypatch.setattr(app_module, 'FIRESTORE_BACKEND', 'firebase')
+    monkeypatch.setattr(app_module, 'FIREBASE_AVAILABLE', True)
+    # Configured, but the client can't be built.
+    monkeypatch.setitem(sys.modules, 'firebase_admin', None)
+
+    assert app_module.connect_firestore() is None
+    assert app_module.app.session_interface is interface
@@ -0,0 +1,61 @@
+import pytest
+
+URL = '/api/admin/strip-stored-balances'
+
+
+def rows(*amounts):
+    """Rows as older versions stored them, with the running balance in each."""
+    balance, result = 0, []
+    for i, amount in enumerate(amounts):
+        result.append({'id': f't{i}', 'date': f'2024-01-0{i + 1}T10:00:00', 'amount': amount, 'source': 'Ads',
+                       'previous_balance': balance})
+        balance += amount
+    return result
+
+
+def stripped(stored):
+    return [{k: v for k, v in t.items() if k != 'previous_balance'} for t in stored]
+
+
+@pytest.fixture
+def user_data(app_module):
+    return app_module.db.collection('user_data')
+
+
+def test_nested_and_legacy_documents_are_stripped(app_module, login, user_data):
+    user_data.document('u1').set({'profiles': {'Default': {'transactions': rows(5, 3), 'settings': {'goal': 9}},
+                                               'Clean': {'transactions': stripped(rows(1))}}})
+    user_data.document('u2').set({'transactions': rows(7), 'settings': {}})
+    admin = login('admin1', role='admin')
+
+    assert admin.post(URL).get_json() == {'success': True, 'documents_updated': 2}
+    u1 = user_data.document('u1').get().to_dict()
+    assert u1['profiles']['Default'] == {'transactions': stripped(rows(5, 3)), 'settings': {'goal': 9}}
+    assert u1['profiles']['Clean']['transactions'] == stripped(rows(1))
+    assert user_data.document('u2').get().to_dict()['transactions'] == stripped(rows(7))
+
+    assert admin.post(URL).get_json()['documents_updated'] == 0
+
+
+def test_split_profile_and_archive_documents_are_stripped(app_module, login, user_data):
+    user = user_data.document('u1')
+    user.set({'profile_names': ['Default']})
+    user.collection('profiles').document('Default').set({'name': 'Default', 'transactions': rows(5)})
+    archive = user.collection('archive').document('Default@2023-01.0')
+    archive.set({'transactions': rows(2, 2)})
+    # The desktop app's sync document shares the 'profiles' collection id and is left alone.
+    desktop = app_module.db.collection('users').document('u1').collection('profiles').document('Default')
+    desktop.set({'transactions': rows(4)})
+
+    assert login('admin1', role='admin').post(URL).get_json()['documents_updated'] == 2
+    assert user.collection('profiles').document('Default').get().to_dict()['transactions'] == stripped(rows(5))
+    assert archive.get().to_dict()['transactions'] == stripped(rows(2, 2))
+    assert desktop.get().to_dict()['transactions'] == rows(4)
+
+
+def test_only_admins_may_strip(app_module, login, user_data):
+    user_data.document('u1').set({'transactions': rows(5)})
+
+    assert app_module.app.test_client().post(URL).status_code == 401
+    assert login('u1').post(URL).status_code == 403
+    assert user_data.document('u1').get().to_dict()['transactions'] == rows(5)
@@ -0,0 +1,83 @@
+import threading
+
+import pytest
+
+from write_coalescer import AppendCoalescer
+
+
+def run_concurrently(count, target):
+    """Runs target(i) on `count` threads started together; returns results (or exceptions) by i."""
+    results = [None] * count
+    start = threading.Barrier(count)
+
+    def worker(i):
+        start.wait()
+        try:
+            results[i] = target(i)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    return results
+
+
+def test_concurrent_appends_for_one_key_share_a_flush():
+    flushed = []
+    # The batch closes as soon as max_rows arrive, so the long window is never waited out.
+    coalescer = AppendCoalescer(lambda key, rows: flushed.append((key, sorted(rows))) or 'ok', window=5, max_rows=4)
+
+    results = run_concurrently(4, lambda i: coalescer.append('k', [i]))
+
+    assert results == ['ok'] * 4
+    assert flushed == [('k', [0, 1, 2, 3])]
+    assert coalescer.appends_per_flush() == 4
+
+
+def test_keys_are_flushed_separately():
+    flushed = []
+    coalescer = AppendCoalescer(lambda key, rows: flushed.append((key, rows)), window=0)
+    coalescer.append('a', [1])
+    coalescer.append('b', [2])
+    assert flushed == [('a', [1]), ('b', [2])]
+
+
+def test_a_failed_flush_fails_every_request_in_the_batch():
+    def flush(key, rows):
+        raise RuntimeError('write failed')
+
+    coalescer = AppendCoalescer(flush, window=5, max_rows=3)
+    results = run_concurrently(3, lambda i: coalescer.append('k', [i]))
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert coalescer.flushes == 1
+
+
+def test_coalesced_endpoint_stores_every_row(app_module, login, monkeypatch):
+    coalescer = AppendCoalescer(app_module.flush_appends, window=5, max_rows=4)
+    monkeypatch.setattr(app_module, 'append_coalescer', coalescer)
+    clients = [login('u1') for _ in range(4)]
+
+    responses = run_concurrently(4, lambda i: clients[i].post(
+        '/api/add-transaction', json={'amount': i + 1, 'source': 'Ads', 'date': f'2024-01-0{i + 1}T10:00:00'}))
+
+    assert [r.status_code for r in responses] == [200] * 4
+    assert coalescer.flushes == 1
+    with app_module.app.test_request_context():
+        transactions, _ = app_module.WebCoinTracker('Default', 'u1').get_data()
+    assert sorted(t['amount'] for t in transactions) == [1, 2, 3, 4]
+
+
+@pytest.mark.parametrize('body', [
+    [{'amount': 1, 'source': 'Ads'}],
+    {'transactions': [{'amount': 1, 'source': 'Ads', 'date': 12345}]},
+    {'transactions': [{'amount': 1, 'source': 'Ads', 'date': 'yesterday'}]},
+    {'transactions': ['not a row']},
+])
+def test_malformed_batches_are_rejected_without_a_write(app_module, login, body):
+    response = login('u1').post('/api/add-transactions', json=body)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+    assert app_module.db.ops['write'] == 0
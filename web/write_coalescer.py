@@ -0,0 +1,74 @@
+import threading
+
+
+class CoalescerTimeout(Exception):
+    pass
+
+
+class _Batch:
+    def __init__(self):
+        self.rows = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class AppendCoalescer:
+    """Group commit for appends that target the same key, e.g. (user_id, profile).
+
+    The first request to append for a key becomes the batch leader: it waits up to
+    `window` seconds for other requests to add rows, then calls `flush(key, rows)` once
+    for all of them. Every request blocks until that write has finished, and the
+    outcome is the same for all of them. If `flush` raises, every request in the
+    batch gets the error, so a success is only reported once the rows are stored.
+
+    Batching only happens across concurrent requests in one process, so it needs a
+    threaded server (e.g. `gunicorn --threads 4`).
+    """
+
+    def __init__(self, flush, window=0.05, max_rows=500, timeout=30):
+        self.flush = flush
+        self.window = window
+        self.max_rows = max_rows
+        self.timeout = timeout
+        self.flushes = 0
+        self.appends = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def append(self, key, rows):
+        """Adds `rows` to the open batch for `key` and returns `flush`'s result once it is written."""
+        with self._lock:
+            self.appends += 1
+            batch = self._pending.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._pending[key] = _Batch()
+            batch.rows.extend(rows)
+            if len(batch.rows) >= self.max_rows:
+                # Close the batch now; later appends start a new one.
+                self._pending.pop(key, None)
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._pending.get(key) is batch:
+                    del self._pending[key]
+                self.flushes += 1
+            try:
+                batch.result = self.flush(key, batch.rows)
+            except Exception as e:
+                batch.error = e
+            finally:
+                batch.done.set()
+        elif not batch.done.wait(self.timeout):
+            raise CoalescerTimeout(f"Write for {key} did not complete within {self.timeout}s")
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.result
+
+    def appends_per_flush(self):
+        return self.appends / self.flushes if self.flushes else 0.0